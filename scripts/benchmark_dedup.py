@@ -0,0 +1,187 @@
+"""
+Benchmark detekcji duplikatów - lokalny detektor (n-gramy + kosinus, MinHash) vs ścieżka LLM.
+
+Listy podzadań: wbudowane przykłady dla zadań z tests/ oraz rodzeństwo z zapisanych
+wyników (results/task_*/hierarchy.json).
+
+Użycie:
+    python scripts/benchmark_dedup.py              # tylko detektor lokalny
+    python scripts/benchmark_dedup.py --llm        # porównanie z LLM (config/.env)
+    python scripts/benchmark_dedup.py --llm --fake # porównanie z fałszywym serwerem
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Set, Tuple
+
+from dotenv import load_dotenv
+from colorama import Fore, Style, init
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from cad_ai.dedup import LocalDeduplicator
+
+init(autoreset=True)
+
+# Podzadania typowe dla zadań testowych (tests/test_duplication.py, tests/test_intelligent.py)
+SAMPLE_LISTS = {
+    "Przygotuj prosty raport o wydatkach firmy za ostatni kwartał.": [
+        "Zbierz dane o wydatkach firmy za ostatni kwartał",
+        "Zbierz dane o wydatkach firmy za ostatni kwartał z systemu księgowego",
+        "Przeanalizuj główne kategorie wydatków",
+        "Porównaj wydatki z poprzednim kwartałem",
+        "Przygotuj podsumowanie raportu z wnioskami",
+    ],
+    "Przygotuj prosty przewodnik jak założyć blog.": [
+        "Wybierz platformę blogową",
+        "Wybierz i zarejestruj domenę oraz hosting",
+        "Skonfiguruj wygląd bloga i motyw graficzny",
+        "Napisz i opublikuj pierwszy wpis",
+        "Napisz i opublikuj pierwszy wpis na blogu",
+    ],
+    "Opisz historię Polski.": [
+        "Opisz historię Polski w średniowieczu",
+        "Opisz historię Polski w okresie nowożytnym",
+        "Opisz historię Polski w XX wieku",
+    ],
+    "Przygotuj analizę rynku.": [
+        "Przeanalizuj przychody firmy",
+        "Przeanalizuj koszty firmy",
+        "Zidentyfikuj głównych konkurentów na rynku",
+        "Określ trendy rynkowe na najbliższe lata",
+    ],
+}
+
+
+def load_result_lists(results_dir: Path) -> dict:
+    """Listy rodzeństwa z zapisanych hierarchii zadań"""
+    lists = {}
+
+    def walk(node: dict):
+        children = node.get("subtasks", [])
+        if len(children) > 1:
+            lists[node["description"]] = [child["description"] for child in children]
+        for child in children:
+            walk(child)
+
+    for path in sorted(results_dir.glob("task_*/hierarchy.json")):
+        with open(path, encoding="utf-8") as f:
+            walk(json.load(f)["hierarchy"])
+    return lists
+
+
+def synthetic_list(size: int, duplicates: int, seed: int = 7) -> Tuple[List[str], Set[str]]:
+    """Długa lista (tryb MinHash) z wariantami istniejących zadań; zwraca też dodane warianty"""
+    rng = random.Random(seed)
+    verbs = ["Opisz", "Przeanalizuj", "Porównaj", "Zbierz dane o", "Oceń", "Podsumuj"]
+    topics = ["sprzedaży", "kosztach", "klientach", "konkurencji", "logistyce", "marketingu",
+              "budżecie", "zatrudnieniu", "inwestycjach", "ryzyku", "produktach", "cenach"]
+    regions = ["w Polsce", "w Niemczech", "we Francji", "w Czechach", "na Słowacji", "w Austrii"]
+    periods = ["w 2021 roku", "w 2022 roku", "w 2023 roku", "w pierwszym kwartale", "w drugim półroczu"]
+    tasks = sorted({f"{v} {t} {r} {p}" for v in verbs for t in topics for r in regions for p in periods})
+    items = rng.sample(tasks, size)
+    # Połowa wariantów różni się tylko zapisem, połowa dopiskiem
+    variants = [f"{n}. {item.lower()}." if n % 2 else f"{item} firmy"
+                for n, item in enumerate(rng.sample(items, duplicates))]
+    items += variants
+    rng.shuffle(items)
+    return items, set(variants)
+
+
+def run_local(engine: LocalDeduplicator, subtasks: List[str]) -> dict:
+    """Pomiar detektora lokalnego dla jednej listy"""
+    started = time.perf_counter()
+    decision = engine.deduplicate(subtasks)
+    return {
+        "seconds": time.perf_counter() - started,
+        "unique": len(decision["unique"]),
+        "ambiguous": len(decision["ambiguous"]),
+        "llm_calls": 1 if decision["ambiguous"] else 0
+    }
+
+
+def run_llm(parent: str, subtasks: List[str], local_engine=None) -> dict:
+    """Pomiar ścieżki LLM (pełnej lub tylko dla niejednoznacznych par)"""
+    from cad_ai.agents import DuplicationDetectorAgent
+    from cad_ai.task_manager import TaskManager, TaskType
+
+    detector = DuplicationDetectorAgent()
+    detector.local_engine = local_engine
+    parent_task = TaskManager().create_task(parent, TaskType.MAIN)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        unique = detector.detect_and_eliminate_duplicates(subtasks, parent_task)
+    return {"seconds": time.perf_counter() - started, "unique": len(unique)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lokalnej detekcji duplikatów")
+    parser.add_argument("--llm", action="store_true", help="porównaj ze ścieżką LLM")
+    parser.add_argument("--fake", action="store_true", help="użyj fałszywego serwera OpenAI")
+    parser.add_argument("--fake-delay", type=float, default=0.5, help="opóźnienie fałszywego serwera (s)")
+    parser.add_argument("--results", default=str(ROOT / "results"), help="katalog z wynikami")
+    parser.add_argument("--large", type=int, default=500, help="rozmiar syntetycznej listy (MinHash)")
+    args = parser.parse_args()
+
+    load_dotenv(dotenv_path=ROOT / "config" / ".env")
+    if args.fake:
+        from fake_openai_server import start_fake_server
+        server, _, base_url = start_fake_server(delay=args.fake_delay)
+        os.environ.update({"AI_PROVIDER": "ollama", "OLLAMA_BASE_URL": base_url, "MODEL": "fake"})
+
+    lists = dict(SAMPLE_LISTS)
+    lists.update(load_result_lists(Path(args.results)))
+    engine = LocalDeduplicator()
+
+    print(f"{Fore.CYAN}{'='*80}")
+    print(f"{Fore.CYAN}  Benchmark detekcji duplikatów ({len(lists)} list podzadań)")
+    print(f"{Fore.CYAN}{'='*80}{Style.RESET_ALL}\n")
+
+    totals = {"local_s": 0.0, "local_calls": 0, "llm_s": 0.0, "llm_calls": 0, "hybrid_s": 0.0}
+    for parent, subtasks in lists.items():
+        local = run_local(engine, subtasks)
+        totals["local_s"] += local["seconds"]
+        totals["local_calls"] += local["llm_calls"]
+        line = (f"{parent[:50]:<50} | {len(subtasks)} → {local['unique']} lokalnie "
+                f"({local['seconds'] * 1000:.1f} ms, niejednoznaczne pary: {local['ambiguous']})")
+        if args.llm:
+            llm = run_llm(parent, subtasks)
+            hybrid = run_llm(parent, subtasks, engine)
+            totals["llm_s"] += llm["seconds"]
+            totals["llm_calls"] += 1
+            totals["hybrid_s"] += hybrid["seconds"]
+            line += (f" | LLM: {llm['unique']} ({llm['seconds']:.2f} s)"
+                     f" | hybryda: {hybrid['unique']} ({hybrid['seconds']:.2f} s)")
+        print(f"{Fore.WHITE}{line}{Style.RESET_ALL}")
+
+    large, variants = synthetic_list(args.large, duplicates=max(1, args.large // 20))
+    started = time.perf_counter()
+    decision = engine.deduplicate(large)
+    elapsed = time.perf_counter() - started
+    flagged = {large[drop] for drop, _, _ in decision["removed"]}
+    flagged |= {large[idx] for i, j, _ in decision["ambiguous"] for idx in (i, j)}
+    print(f"\n{Fore.WHITE}Lista syntetyczna ({len(large)} zadań, MinHash/LSH): {len(large)} → "
+          f"{len(decision['unique'])} w {elapsed * 1000:.1f} ms, niejednoznaczne pary: "
+          f"{len(decision['ambiguous'])}, wykryte warianty: {len(variants & flagged)}/{len(variants)}"
+          f"{Style.RESET_ALL}")
+
+    print(f"\n{Fore.GREEN}Detektor lokalny: {totals['local_s'] * 1000:.1f} ms, "
+          f"wywołania LLM: {totals['local_calls']}/{len(lists)}{Style.RESET_ALL}")
+    if args.llm:
+        print(f"{Fore.GREEN}Ścieżka LLM: {totals['llm_s']:.2f} s, wywołania LLM: {totals['llm_calls']}")
+        print(f"Hybryda (lokalnie + LLM dla niejednoznacznych): {totals['hybrid_s']:.2f} s{Style.RESET_ALL}")
+    if args.fake:
+        server.shutdown()
+    print()
+
+
+if __name__ == "__main__":
+    main()
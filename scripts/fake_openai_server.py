@@ -0,0 +1,206 @@
+"""
+Lokalny, fałszywy serwer zgodny z OpenAI (/v1/chat/completions) do testów bez API.
+Odpowiada w formatach oczekiwanych przez agentów i potrafi symulować limity (HTTP 429).
+
+Użycie:
+    python scripts/fake_openai_server.py --port 8765 --rpm 30 --retry-after 1
+    AI_PROVIDER=ollama OLLAMA_BASE_URL=http://127.0.0.1:8765/v1 python scripts/test_run.py
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class FakeOpenAIState:
+    """Konfiguracja i liczniki fałszywego serwera"""
+
+    def __init__(self, delay: float = 0.0, rpm: Optional[int] = None,
+                 retry_after: Optional[float] = None, max_level: int = 1):
+        self.delay = delay
+        self.rpm = rpm
+        self.retry_after = retry_after
+        # Poziom, do którego analizator odpowiada "PODZIAŁ: TAK"
+        self.max_level = max_level
+        self.lock = threading.Lock()
+        self.request_times: deque = deque()
+        self.counters = {"requests": 0, "rate_limited": 0, "in_flight": 0, "max_in_flight": 0}
+
+    def admit(self) -> bool:
+        """Sprawdza limit RPM (okno przesuwne 60 s)"""
+        with self.lock:
+            self.counters["requests"] += 1
+            now = time.monotonic()
+            while self.request_times and now - self.request_times[0] > 60:
+                self.request_times.popleft()
+            if self.rpm is not None and len(self.request_times) >= self.rpm:
+                self.counters["rate_limited"] += 1
+                return False
+            self.request_times.append(now)
+            self.counters["in_flight"] += 1
+            self.counters["max_in_flight"] = max(self.counters["max_in_flight"],
+                                                 self.counters["in_flight"])
+            return True
+
+    def release(self):
+        """Kończy obsługę zapytania"""
+        with self.lock:
+            self.counters["in_flight"] -= 1
+
+
+def fake_answer(system_prompt: str, user_prompt: str, max_level: int) -> str:
+    """Generuje odpowiedź w formacie oczekiwanym przez danego agenta"""
+    if '"subtasks"' in system_prompt:
+        # Tryb łączony - ocena i unikalne podzadania w jednym obiekcie JSON
+        level_match = re.search(r"poziom zagnieżdżenia: (\d+)", user_prompt)
+        split = (int(level_match.group(1)) if level_match else 0) < max_level
+        description = user_prompt.split("\n")[1][:40]
+        return json.dumps({"output_size": "DŁUGI" if split else "KRÓTKI",
+                           "complexity": "WYSOKA" if split else "NISKA", "should_split": split,
+                           "reasoning": "Plan fałszywego serwera",
+                           "subtasks": [f"Aspekt {i} zadania: {description}" for i in range(1, 4)] if split else []},
+                          ensure_ascii=False)
+    if "analizie złożoności" in system_prompt:
+        level_match = re.search(r"poziom zagnieżdżenia: (\d+)", user_prompt)
+        level = int(level_match.group(1)) if level_match else 0
+        if "obiektem JSON" in system_prompt:
+            split = level < max_level
+            return json.dumps({"output_size": "DŁUGI" if split else "KRÓTKI", "should_split": split,
+                               "num_subtasks": 3 if split else 0,
+                               "complexity": "WYSOKA" if split else "NISKA",
+                               "reasoning": "Ocena fałszywego serwera"}, ensure_ascii=False)
+        if level < max_level:
+            analysis = ("POTENCJALNY_OUTPUT: DŁUGI\nPODZIAŁ: TAK\nLICZBA_PODZADAŃ: 3\n"
+                        "ZŁOŻONOŚĆ: WYSOKA\nUZASADNIENIE: Zadanie obejmuje kilka aspektów")
+        else:
+            analysis = ("POTENCJALNY_OUTPUT: KRÓTKI\nPODZIAŁ: NIE\nLICZBA_PODZADAŃ: 0\n"
+                        "ZŁOŻONOŚĆ: NISKA\nUZASADNIENIE: Zadanie jest proste")
+        # Ocena wsadowa - jeden blok "ZADANIE n:" na każde zadanie
+        numbers = re.findall(r"^ZADANIE (\d+):$", user_prompt, re.MULTILINE)
+        if numbers:
+            return "\n\n".join(f"ZADANIE {number}:\n{analysis}" for number in numbers)
+        return analysis
+    if "dekompozycji" in system_prompt:
+        description = user_prompt.split("\n")[1][:40]
+        return "\n".join(f"{i}. Aspekt {i} zadania: {description}" for i in range(1, 4))
+    if "duplikatów" in system_prompt:
+        return "\n".join(line.split(". ", 1)[1] for line in user_prompt.split("\n")
+                         if re.match(r"^\d+\. ", line))
+    if "wykonawczym" in system_prompt:
+        return f"Wynik wykonania: {user_prompt.split(chr(10))[1]}"
+    if "kontroli jakości" in system_prompt:
+        if "obiekt JSON" in system_prompt:
+            return json.dumps({"passed": True, "score": 8.5, "feedback": "Zadanie wykonane poprawnie",
+                               "issues": []}, ensure_ascii=False)
+        return "OCENA: PASS\nPUNKTACJA: 8.5\nFEEDBACK: Zadanie wykonane poprawnie\nPROBLEMY: Brak"
+    return "OK"
+
+
+def make_handler(state: FakeOpenAIState):
+    """Tworzy klasę handlera związaną ze stanem serwera"""
+
+    class FakeOpenAIHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_stream(self, body: dict, content: str):
+            """Wysyła odpowiedź jako strumień SSE (chat.completion.chunk) słowo po słowie"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            words = re.findall(r"\S+\s*", content) or [content]
+            for word in words:
+                chunk = {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]
+                }
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            if (body.get("stream_options") or {}).get("include_usage"):
+                # Jak w API OpenAI - ostatni fragment bez choices, z zużyciem tokenów
+                usage = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": body.get("model", "fake"), "choices": [],
+                         "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20}}
+                self.wfile.write(f"data: {json.dumps(usage)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def do_GET(self):
+            with state.lock:
+                self._send_json(200, dict(state.counters))
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if not state.admit():
+                headers = {"Retry-After": str(state.retry_after)} if state.retry_after is not None else {}
+                self._send_json(429, {"error": {"message": "Rate limit exceeded",
+                                                "type": "rate_limit_error"}}, headers)
+                return
+            try:
+                time.sleep(state.delay)
+                messages = body["messages"]
+                content = fake_answer(messages[0]["content"], messages[-1]["content"], state.max_level)
+                if body.get("stream"):
+                    self._send_stream(body, content)
+                    return
+                self._send_json(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20}
+                })
+            finally:
+                state.release()
+
+    return FakeOpenAIHandler
+
+
+def start_fake_server(port: int = 0, **options) -> tuple:
+    """Uruchamia serwer w wątku w tle; zwraca (serwer, stan, base_url)"""
+    state = FakeOpenAIState(**options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    return server, state, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fałszywy serwer OpenAI do testów lokalnych")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="opóźnienie odpowiedzi (s)")
+    parser.add_argument("--rpm", type=int, default=None, help="limit zapytań na minutę (429 po przekroczeniu)")
+    parser.add_argument("--retry-after", type=float, default=None, help="wartość nagłówka Retry-After (s)")
+    parser.add_argument("--max-level", type=int, default=1, help="do którego poziomu dzielić zadania")
+    args = parser.parse_args()
+
+    server, _, base_url = start_fake_server(args.port, delay=args.delay, rpm=args.rpm,
+                                            retry_after=args.retry_after, max_level=args.max_level)
+    print(f"Fałszywy serwer OpenAI: {base_url} (Ctrl+C aby zakończyć)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
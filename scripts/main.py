@@ -1,6 +1,11 @@
 """
 Główny program - System wieloagentowy z rekursywną dekompozycją zadań
+
+Użycie:
+    python scripts/main.py                      # nowe zadanie
+    python scripts/main.py --resume task_0001   # wznowienie z punktu kontrolnego
 """
+import argparse
 import os
 import sys
 from pathlib import Path
@@ -12,6 +17,15 @@ sys.path.insert(0, str(ROOT / "src"))
 
 from cad_ai.task_manager import TaskManager, TaskType, TaskStatus
 from cad_ai.agents import MasterOrchestrator
+from cad_ai.results_store import persistence_from_env
+from cad_ai.event_log import event_log_from_env, replay_event_log
+from cad_ai.llm_cache import cache_from_env
+from cad_ai.rate_limiter import scheduler_from_env
+from cad_ai.dedup import dedup_from_env
+from cad_ai.decomposition_memo import memo_from_env
+from cad_ai.context_engine import context_engine_from_env
+from cad_ai.verification_policy import verification_policy_from_env
+from cad_ai.repair import repair_policy_from_env
 
 init(autoreset=True)
 
@@ -31,11 +45,10 @@ def print_summary(task_manager: TaskManager, main_task_id: str):
     print(f"{Fore.YELLOW}{'='*80}{Style.RESET_ALL}\n")
     
     # Statystyki
-    all_tasks = list(task_manager.tasks.values())
-    total_tasks = len(all_tasks)
-    verified_tasks = len([t for t in all_tasks if t.status == TaskStatus.VERIFIED])
-    completed_tasks = len([t for t in all_tasks if t.status == TaskStatus.COMPLETED])
-    failed_tasks = len([t for t in all_tasks if t.status == TaskStatus.FAILED])
+    total_tasks = len(task_manager.tasks)
+    verified_tasks = task_manager.count_by_status(TaskStatus.VERIFIED)
+    completed_tasks = task_manager.count_by_status(TaskStatus.COMPLETED)
+    failed_tasks = task_manager.count_by_status(TaskStatus.FAILED)
     
     print(f"{Fore.WHITE}Statystyki:")
     print(f"  • Łączna liczba zadań: {total_tasks}")
@@ -61,7 +74,8 @@ def print_summary(task_manager: TaskManager, main_task_id: str):
             print(f"{Fore.MAGENTA}WERYFIKACJA:")
             print(f"{Fore.MAGENTA}{'='*80}{Style.RESET_ALL}")
             print(f"Status: {Fore.GREEN if verification['passed'] else Fore.RED}{'PASS' if verification['passed'] else 'FAIL'}{Style.RESET_ALL}")
-            print(f"Ocena: {verification['score']}/10.0")
+            if verification.get('score') is not None:
+                print(f"Ocena: {verification['score']}/10.0")
             print(f"Feedback: {verification['feedback']}")
             if verification['issues']:
                 print(f"Problemy: {', '.join(verification['issues'])}")
@@ -70,6 +84,11 @@ def print_summary(task_manager: TaskManager, main_task_id: str):
 
 def main():
     """Główna funkcja programu"""
+    parser = argparse.ArgumentParser(description="System wieloagentowy z rekursywną dekompozycją zadań")
+    parser.add_argument("--resume", metavar="TASK_ID",
+                        help="wznów przerwane zadanie z punktu kontrolnego (np. task_0001)")
+    args = parser.parse_args()
+    
     # Załaduj zmienne środowiskowe
     load_dotenv(dotenv_path=ROOT / "config" / ".env")
     
@@ -90,21 +109,39 @@ def main():
     
     print_banner()
     
-    # Przykładowe zadanie główne
-    main_goal = """Stwórz kompletny plan i wykonaj analizę dla uruchomienia małego sklepu internetowego.
+    persistence = persistence_from_env(str(ROOT / "results"))
+    if args.resume:
+        # Drzewo zadań z dziennika zdarzeń (najbardziej aktualny) lub punktu kontrolnego -
+        # zweryfikowane zadania nie są wykonywane ponownie
+        task_manager = (replay_event_log(str(ROOT / "results"), args.resume, persistence)
+                        or persistence.restore_task_manager(args.resume))
+        if task_manager is None:
+            print(f"{Fore.RED}BŁĄD: Brak punktu kontrolnego dla zadania {args.resume}{Style.RESET_ALL}")
+            sys.exit(1)
+        main_task = task_manager.get_task(args.resume)
+        verified = task_manager.count_by_status(TaskStatus.VERIFIED)
+        print(f"{Fore.WHITE}Wznawiam zadanie główne {main_task.id}:")
+        print(f"{Fore.CYAN}{main_task.description}{Style.RESET_ALL}")
+        print(f"{Fore.WHITE}Zadania z punktu kontrolnego: {len(task_manager.tasks)} "
+              f"(zweryfikowane: {Fore.GREEN}{verified}{Fore.WHITE}){Style.RESET_ALL}\n")
+    else:
+        # Przykładowe zadanie główne
+        main_goal = """Stwórz kompletny plan i wykonaj analizę dla uruchomienia małego sklepu internetowego.
 Obejmuje to: analizę rynku, wybór platformy e-commerce, strategię marketingową, logistykę 
 i obsługę klienta. Każdy aspekt powinien być szczegółowo omówiony."""
-    
-    print(f"{Fore.WHITE}Zadanie główne:")
-    print(f"{Fore.CYAN}{main_goal}{Style.RESET_ALL}\n")
-    
-    response = input(f"{Fore.YELLOW}Czy kontynuować z tym zadaniem? (t/n, lub wpisz własne): {Style.RESET_ALL}")
-    
-    if response.lower() == 'n':
-        print("Program zakończony.")
-        return
-    elif response.lower() != 't':
-        main_goal = response
+        
+        print(f"{Fore.WHITE}Zadanie główne:")
+        print(f"{Fore.CYAN}{main_goal}{Style.RESET_ALL}\n")
+        
+        response = input(f"{Fore.YELLOW}Czy kontynuować z tym zadaniem? (t/n, lub wpisz własne): {Style.RESET_ALL}")
+        
+        if response.lower() == 'n':
+            print("Program zakończony.")
+            return
+        elif response.lower() != 't':
+            main_goal = response
+        
+        task_manager = TaskManager(persistence_manager=persistence)
     
     # Konfiguracja
     MAX_RECURSION = 10  # Safety limit przeciw nieskończonej rekursji
@@ -119,22 +156,38 @@ i obsługę klienta. Każdy aspekt powinien być szczegółowo omówiony."""
     input(f"{Fore.YELLOW}Naciśnij Enter aby rozpocząć...{Style.RESET_ALL}")
     
     # Inicjalizacja systemu
-    task_manager = TaskManager()
     orchestrator = MasterOrchestrator(
         task_manager=task_manager,
         api_key=api_key,
         provider=provider,
         model=model,
         max_recursion_depth=MAX_RECURSION,
-        persistence_dir=str(ROOT / "results")
+        persistence_dir=str(ROOT / "results"),
+        max_concurrency=int(os.getenv("MAX_CONCURRENCY", "1")),
+        llm_cache=cache_from_env(str(ROOT / "results")),
+        rate_limiter=scheduler_from_env(provider),
+        batch_analysis=os.getenv("BATCH_ANALYSIS", "0").lower() in ("1", "true", "tak"),
+        structured_output=os.getenv("STRUCTURED_OUTPUT", "0").lower() in ("1", "true", "tak"),
+        fused_decomposition=os.getenv("FUSED_DECOMPOSITION", "0").lower() in ("1", "true", "tak"),
+        aggregation_token_budget=int(os.getenv("AGGREGATION_SUMMARY_TOKENS", "0")),
+        context_engine=context_engine_from_env(task_manager, model),
+        verification_policy=verification_policy_from_env(),
+        repair_policy=repair_policy_from_env(),
+        local_dedup=dedup_from_env(),
+        decomposition_memo=memo_from_env(str(ROOT / "results")),
+        checkpointing=os.getenv("CHECKPOINTS", "0").lower() in ("1", "true", "tak"),
+        checkpoint_interval=float(os.getenv("CHECKPOINT_INTERVAL", "1.0")),
+        event_log=event_log_from_env(task_manager, str(ROOT / "results")),
+        persistence=persistence
     )
     
     # Utwórz zadanie główne
-    main_task = task_manager.create_task(
-        description=main_goal,
-        task_type=TaskType.MAIN,
-        level=0
-    )
+    if not args.resume:
+        main_task = task_manager.create_task(
+            description=main_goal,
+            task_type=TaskType.MAIN,
+            level=0
+        )
     
     print(f"\n{Fore.GREEN}System uruchomiony. Rozpoczynam przetwarzanie...{Style.RESET_ALL}\n")
     
@@ -159,6 +212,10 @@ i obsługę klienta. Każdy aspekt powinien być szczegółowo omówiony."""
     except KeyboardInterrupt:
         print(f"\n{Fore.YELLOW}Program przerwany przez użytkownika.{Style.RESET_ALL}")
         print_summary(task_manager, main_task.id)
+        if orchestrator.checkpoints is not None:
+            orchestrator.checkpoints.flush()
+            print(f"{Fore.CYAN}Punkt kontrolny zapisany. Wznowienie: "
+                  f"python scripts/main.py --resume {main_task.id}{Style.RESET_ALL}")
     except Exception as e:
         print(f"\n{Fore.RED}Błąd: {e}{Style.RESET_ALL}")
         import traceback
@@ -12,7 +12,16 @@ sys.path.insert(0, str(ROOT / "src"))
 
 from cad_ai.task_manager import TaskManager, TaskType
 from cad_ai.agents import MasterOrchestrator
-from cad_ai.persistence import PersistenceManager
+from cad_ai.llm_cache import cache_from_env
+from cad_ai.rate_limiter import scheduler_from_env
+from cad_ai.dedup import dedup_from_env
+from cad_ai.decomposition_memo import memo_from_env
+from cad_ai.context_engine import context_engine_from_env
+from cad_ai.verification_policy import verification_policy_from_env
+from cad_ai.repair import repair_policy_from_env
+from cad_ai.event_log import event_log_from_env
+from cad_ai.results_store import persistence_from_env
+from cad_ai.events import stdout_event_writer
 
 init(autoreset=True)
 
@@ -27,6 +36,8 @@ print(f"{Fore.CYAN}{'='*80}{Style.RESET_ALL}\n")
 provider = os.getenv("AI_PROVIDER", "openai")
 api_key = os.getenv("API_KEY")
 model = os.getenv("MODEL", "gpt-4o-mini")
+# Zdarzenia postępu jako linie JSON na stdout - czytane na bieżąco przez serwer WWW (zlecenia w podprocesie)
+progress_events = os.getenv("PROGRESS_EVENTS", "0").lower() in ("1", "true", "tak")
 
 print(f"{Fore.WHITE}Konfiguracja:")
 print(f"  • Dostawca AI: {Fore.CYAN}{provider}{Fore.WHITE}")
@@ -43,7 +54,7 @@ print(f"{Fore.YELLOW}Zadanie testowe:{Style.RESET_ALL}")
 print(f"{test_task}\n")
 
 # Inicjalizacja
-persistence_manager = PersistenceManager(base_dir=str(ROOT / "results"))
+persistence_manager = persistence_from_env(str(ROOT / "results"))
 task_manager = TaskManager(persistence_manager=persistence_manager)
 orchestrator = MasterOrchestrator(
     task_manager=task_manager,
@@ -51,15 +62,37 @@ orchestrator = MasterOrchestrator(
     provider=provider,
     model=model,
     max_recursion_depth=10,
-    persistence_dir=str(ROOT / "results")
+    persistence_dir=str(ROOT / "results"),
+    max_concurrency=int(os.getenv("MAX_CONCURRENCY", "1")),
+    llm_cache=cache_from_env(str(ROOT / "results")),
+    rate_limiter=scheduler_from_env(provider),
+    stream=progress_events,
+    batch_analysis=os.getenv("BATCH_ANALYSIS", "0").lower() in ("1", "true", "tak"),
+    structured_output=os.getenv("STRUCTURED_OUTPUT", "0").lower() in ("1", "true", "tak"),
+    fused_decomposition=os.getenv("FUSED_DECOMPOSITION", "0").lower() in ("1", "true", "tak"),
+    aggregation_token_budget=int(os.getenv("AGGREGATION_SUMMARY_TOKENS", "0")),
+    context_engine=context_engine_from_env(task_manager, model),
+    verification_policy=verification_policy_from_env(),
+    repair_policy=repair_policy_from_env(),
+    local_dedup=dedup_from_env(),
+    decomposition_memo=memo_from_env(str(ROOT / "results")),
+    checkpointing=os.getenv("CHECKPOINTS", "0").lower() in ("1", "true", "tak"),
+    checkpoint_interval=float(os.getenv("CHECKPOINT_INTERVAL", "1.0")),
+    event_log=event_log_from_env(task_manager, str(ROOT / "results")),
+    persistence=persistence_manager
 )
 
+if progress_events:
+    orchestrator.event_bus.subscribe(stdout_event_writer(sys.stdout))
+
 # Utwórz zadanie główne
 main_task = task_manager.create_task(
     description=test_task,
     task_type=TaskType.MAIN,
     level=0
 )
+orchestrator.event_bus.publish("run_started", main_task.id, description=main_task.description)
+success = False
 
 print(f"{Fore.GREEN}Rozpoczynam przetwarzanie...{Style.RESET_ALL}\n")
 
@@ -94,3 +127,6 @@ except Exception as e:
     print(f"\n{Fore.RED}Błąd: {e}{Style.RESET_ALL}")
     import traceback
     traceback.print_exc()
+
+finally:
+    orchestrator.event_bus.publish("run_finished", main_task.id, success=success)
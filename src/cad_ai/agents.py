@@ -2,21 +2,190 @@
 Moduł agentów AI - różne typy agentów do dekompozycji, wykonania i weryfikacji zadań
 """
 import os
+import json
 import time
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+import asyncio
+import threading
+import importlib.util
+import weakref
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing, closing
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterator, AsyncIterator
+from openai import OpenAI, AsyncOpenAI, APIStatusError, APIConnectionError
 from .task_manager import Task, TaskStatus, TaskType, TaskManager
-from .persistence import PersistenceManager
+from .persistence import PersistenceManager, CheckpointWriter
+from .llm_cache import LLMResponseCache
+from .rate_limiter import Priority, ProviderScheduler, estimate_tokens
+from .events import EventBus
+from .dedup import LocalDeduplicator
+from .decomposition_memo import DecompositionMemo
+from .event_log import TaskEventLog
+from .aggregation import ResultRope, build_parent_rope
+from .context_engine import ContextEngine
+from .verification_policy import VerificationPolicy, SKIP, SUMMARY
+from .repair import RepairPolicy, failed_subtree
 from colorama import Fore, Style, init
 
 init(autoreset=True)
 
+# Domyślny limit równoległych wywołań LLM w trybie asynchronicznym
+DEFAULT_ASYNC_CONCURRENCY = 64
+
+# Rezerwa tokenów na odpowiedź przy szacowaniu zużycia TPM
+COMPLETION_TOKEN_RESERVE = 512
+
+# Kody HTTP, po których warto ponowić wywołanie
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _is_retryable_error(error: Exception) -> bool:
+    """Sprawdza czy błąd wywołania jest przejściowy (limit, przeciążenie, sieć)"""
+    if isinstance(error, APIConnectionError):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code in RETRYABLE_STATUS_CODES
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Odczytuje nagłówek Retry-After (lub retry-after-ms) z odpowiedzi błędu"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+def _load_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """Ścisłe odczytanie obiektu JSON z odpowiedzi (dopuszcza blok ```json); None gdy się nie da"""
+    text = (text or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.lower().startswith("json"):
+            text = text[4:]
+    try:
+        data = json.loads(text)
+    except ValueError:
+        # Model dopisał komentarz wokół obiektu - próbujemy wyciąć sam obiekt
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end <= start:
+            return None
+        try:
+            data = json.loads(text[start:end + 1])
+        except ValueError:
+            return None
+    return data if isinstance(data, dict) else None
+
+
+class ClientRegistry:
+    """Rejestr współdzielonych klientów OpenAI - jeden pool HTTP (keep-alive, HTTP/2)
+    na (provider, base_url, api_key) dla wszystkich agentów w procesie"""
+    
+    def __init__(self, max_connections: Optional[int] = None,
+                 max_keepalive_connections: Optional[int] = None,
+                 keepalive_expiry: Optional[float] = None,
+                 timeout: Optional[float] = None, connect_timeout: Optional[float] = None,
+                 http2: Optional[bool] = None, max_retries: int = 2):
+        self.limits = httpx.Limits(
+            max_connections=(max_connections if max_connections is not None
+                             else int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))),
+            max_keepalive_connections=(max_keepalive_connections if max_keepalive_connections is not None
+                                       else int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))),
+            keepalive_expiry=(keepalive_expiry if keepalive_expiry is not None
+                              else float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")))
+        )
+        self.timeout = httpx.Timeout(
+            timeout if timeout is not None else float(os.getenv("HTTP_TIMEOUT", "120")),
+            connect=connect_timeout if connect_timeout is not None else float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+        )
+        # HTTP/2 wymaga opcjonalnego pakietu h2 - bez niego zostajemy przy HTTP/1.1 keep-alive
+        h2_available = importlib.util.find_spec("h2") is not None
+        self.http2 = h2_available if http2 is None else (http2 and h2_available)
+        self.max_retries = max_retries
+        self._clients: Dict[Tuple[str, Optional[str], Optional[str]], OpenAI] = {}
+        # Klienci async są związani z pętlą zdarzeń - osobny zestaw na każdą pętlę
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+    
+    def get_client(self, provider: str, base_url: Optional[str], api_key: Optional[str]) -> OpenAI:
+        """Zwraca współdzielonego klienta synchronicznego"""
+        key = (provider, base_url, api_key)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = OpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    max_retries=self.max_retries,
+                    http_client=httpx.Client(limits=self.limits, timeout=self.timeout,
+                                             http2=self.http2, follow_redirects=True)
+                )
+                self._clients[key] = client
+            return client
+    
+    def get_async_client(self, provider: str, base_url: Optional[str],
+                         api_key: Optional[str]) -> AsyncOpenAI:
+        """Zwraca współdzielonego klienta async dla bieżącej pętli zdarzeń"""
+        key = (provider, base_url, api_key)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                client = AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    max_retries=self.max_retries,
+                    http_client=httpx.AsyncClient(limits=self.limits, timeout=self.timeout,
+                                                  http2=self.http2, follow_redirects=True)
+                )
+                clients[key] = client
+            return client
+    
+    def close(self):
+        """Zamyka synchroniczne pule połączeń"""
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+    
+    async def aclose(self):
+        """Zamyka pule połączeń async bieżącej pętli zdarzeń (przed jej zamknięciem)"""
+        with self._lock:
+            clients = self._async_clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.close()
+
+
+_default_client_registry: Optional[ClientRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> ClientRegistry:
+    """Zwraca domyślny, procesowy rejestr klientów"""
+    global _default_client_registry
+    with _default_registry_lock:
+        if _default_client_registry is None:
+            _default_client_registry = ClientRegistry()
+        return _default_client_registry
+
 
 class BaseAgent:
     """Bazowa klasa dla wszystkich agentów"""
     
+    # Klasa priorytetu wywołań tego agenta w harmonogramie dostawcy
+    priority = Priority.EXECUTION
+    
     def __init__(self, name: str, role: str, api_key: Optional[str] = None, 
-                 provider: Optional[str] = None, model: Optional[str] = None):
+                 provider: Optional[str] = None, model: Optional[str] = None,
+                 client_registry: Optional[ClientRegistry] = None):
         self.name = name
         self.role = role
         self.provider = provider or os.getenv("AI_PROVIDER", "openai")
@@ -24,35 +193,320 @@ class BaseAgent:
         
         # Konfiguracja klienta w zależności od providera
         if self.provider == "openai":
-            self.client = OpenAI(api_key=api_key or os.getenv("API_KEY"))
+            self.api_key = api_key or os.getenv("API_KEY")
+            self.base_url = None
         elif self.provider == "openrouter":
-            self.client = OpenAI(
-                api_key=api_key or os.getenv("API_KEY"),
-                base_url="https://openrouter.ai/api/v1"
-            )
+            self.api_key = api_key or os.getenv("API_KEY")
+            self.base_url = "https://openrouter.ai/api/v1"
         elif self.provider == "ollama":
-            self.client = OpenAI(
-                api_key="ollama",  # Ollama nie wymaga klucza
-                base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
-            )
+            self.api_key = "ollama"  # Ollama nie wymaga klucza
+            self.base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
         else:
             raise ValueError(f"Nieobsługiwany dostawca API: {self.provider}")
+        # Klient (i pula połączeń) współdzielony przez wszystkich agentów tego providera
+        self.client_registry = client_registry or get_client_registry()
+        self.client = self.client_registry.get_client(self.provider, self.base_url, self.api_key)
+        
+        self.temperature = float(os.getenv("TEMPERATURE", "0.7"))
+        # Opcjonalny cache odpowiedzi (ustawiany przez orkiestratora)
+        self.llm_cache: Optional[LLMResponseCache] = None
+        # Opcjonalny harmonogram limitów RPM/TPM z ponowieniami (ustawiany przez orkiestratora)
+        self.rate_limiter: Optional[ProviderScheduler] = None
+        
+        # Wspólny limit równoległych wywołań LLM (ustawiany przez orkiestratora)
+        self.call_slots: Optional[threading.Semaphore] = None
+        self.async_call_slots: Optional[asyncio.Semaphore] = None
+        
+        # Odpowiedzi w JSON (response_format) z awaryjnym parserem tekstowym
+        self.structured_output = False
+        self.response_format_supported = True
+        self._stats_lock = threading.Lock()
+        self.parse_stats: Dict[str, int] = {"structured": 0, "parse_failures": 0}
+    
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Zwraca współdzielonego klienta AsyncOpenAI dla bieżącej pętli zdarzeń"""
+        return self.client_registry.get_async_client(self.provider, self.base_url, self.api_key)
+    
+    def _build_messages(self, system_prompt: str, user_prompt: str) -> List[Dict[str, str]]:
+        """Buduje listę wiadomości dla modelu"""
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        
+    def _effective_temperature(self) -> float:
+        """Temperatura wywołania - 0 w deterministycznym trybie cache"""
+        if self.llm_cache is not None and self.llm_cache.deterministic:
+            return 0.0
+        return self.temperature
+    
+    def _bump(self, counters: Dict[str, int], key: str, amount: int = 1):
+        """Bezpiecznie (wątkowo) zwiększa licznik agenta"""
+        with self._stats_lock:
+            counters[key] += amount
+    
+    def _response_format(self, name: str, schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Parametr response_format dla providera (None gdy tryb JSON wyłączony/nieobsługiwany)"""
+        if not self.structured_output or not self.response_format_supported:
+            return None
+        if self.provider == "openai":
+            return {"type": "json_schema",
+                    "json_schema": {"name": name, "strict": True, "schema": schema}}
+        # OpenRouter/Ollama - tryb JSON bez wymuszania schematu (schemat opisany w prompcie)
+        return {"type": "json_object"}
+    
+    def _is_unsupported_format(self, error: Exception, response_format: Optional[Dict[str, Any]]) -> bool:
+        """Sprawdza czy model odrzucił response_format - wtedy wyłączamy go dla agenta.
         
-    def _call_llm(self, system_prompt: str, user_prompt: str) -> str:
+        Inne błędy 400/422 (długość kontekstu, nieznany model, złe parametry) nie zmieniają trybu.
+        """
+        if response_format is None or getattr(error, "status_code", None) not in (400, 422):
+            return False
+        details = f"{getattr(error, 'message', '')} {getattr(error, 'body', '')} {error}".lower()
+        if "response_format" not in details and "json_schema" not in details:
+            return False
+        self.response_format_supported = False
+        self.log(f"Model nie obsługuje response_format - JSON tylko przez prompt: {error}", Fore.YELLOW)
+        return True
+    
+    def _cache_key(self, system_prompt: str, user_prompt: str) -> Optional[str]:
+        """Klucz cache dla wywołania (None gdy cache wyłączony)"""
+        if self.llm_cache is None:
+            return None
+        return LLMResponseCache.make_key(self.provider, self.model, self._effective_temperature(),
+                                         system_prompt, user_prompt)
+        
+    def _call_llm(self, system_prompt: str, user_prompt: str,
+                  response_format: Optional[Dict[str, Any]] = None) -> str:
         """Wywołuje model językowy"""
+        cache_key = self._cache_key(system_prompt, user_prompt)
+        if cache_key is not None:
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        messages = self._build_messages(system_prompt, user_prompt)
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7
-            )
-            return response.choices[0].message.content
+            try:
+                response = self._create_completion(messages, response_format=response_format)
+            except APIStatusError as e:
+                if not self._is_unsupported_format(e, response_format):
+                    raise
+                response = self._create_completion(messages)
+            content = response.choices[0].message.content
+        except Exception as e:
+            print(f"{Fore.RED}Błąd wywołania LLM: {e}")
+            return ""
+        if cache_key is not None:
+            self.llm_cache.put(cache_key, content)
+        return content
+    
+    def _stream_llm(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        """Wywołuje model w trybie strumieniowym - zwraca kolejne fragmenty odpowiedzi"""
+        cache_key = self._cache_key(system_prompt, user_prompt)
+        if cache_key is not None:
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        chunks = []
+        try:
+            stream = self._create_completion(self._build_messages(system_prompt, user_prompt), stream=True)
+            with closing(stream):
+                for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        chunks.append(delta)
+                        yield delta
+        except Exception as e:
+            print(f"{Fore.RED}Błąd wywołania LLM: {e}")
+            return
+        if cache_key is not None:
+            self.llm_cache.put(cache_key, "".join(chunks))
+    
+    def _create_completion(self, messages: List[Dict[str, str]], stream: bool = False,
+                           response_format: Optional[Dict[str, Any]] = None):
+        """Wysyła zapytanie do modelu - przez harmonogram limitów z ponowieniami, jeśli ustawiony.
+        
+        Slot wywołania (call_slots) jest zajmowany na każdą próbę osobno, więc oczekiwanie przed
+        ponowieniem go nie blokuje; strumień zwalnia slot dopiero po ostatnim fragmencie.
+        """
+        request = self._completion_request(messages, stream, response_format)
+        scheduler = self.rate_limiter
+        # Ponowienia obsługuje harmonogram - klient nie może ponawiać poza limitami
+        client = self.client if scheduler is None else self.client.with_options(max_retries=0)
+        estimated = self._estimate_request_tokens(messages)
+        slots = self.call_slots
+        attempt = 0
+        while True:
+            if slots is not None:
+                slots.acquire()
+            held = slots
+            try:
+                if scheduler is not None:
+                    scheduler.acquire(self.priority, estimated)
+                response = client.chat.completions.create(**request)
+                if stream:
+                    held = None
+                    return self._iter_stream(response, slots, scheduler, estimated)
+                if scheduler is not None:
+                    scheduler.record_usage(estimated, response.usage.total_tokens if response.usage else None)
+                return response
+            except Exception as e:
+                delay = None if scheduler is None else self._retry_delay(scheduler, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                if held is not None:
+                    held.release()
+            time.sleep(delay)
+            attempt += 1
+    
+    def _iter_stream(self, stream, slots: Optional[threading.Semaphore],
+                     scheduler: Optional[ProviderScheduler], estimated: int) -> Iterator[Any]:
+        """Przekazuje fragmenty strumienia; po ostatnim zwalnia slot i koryguje zużycie tokenów"""
+        usage = None
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage.total_tokens
+                yield chunk
+        finally:
+            stream.close()
+            if slots is not None:
+                slots.release()
+            if scheduler is not None:
+                scheduler.record_usage(estimated, usage)
+    
+    def _completion_request(self, messages: List[Dict[str, str]], stream: bool,
+                            response_format: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Buduje parametry zapytania chat.completions"""
+        request = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self._effective_temperature()
+        }
+        if stream:
+            request["stream"] = True
+            if self.rate_limiter is not None:
+                # Ostatni fragment strumienia niesie faktyczne zużycie tokenów dla harmonogramu
+                request["stream_options"] = {"include_usage": True}
+        if response_format is not None:
+            request["response_format"] = response_format
+        return request
+    
+    def _estimate_request_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Szacuje zużycie tokenów zapytania (prompt + rezerwa na odpowiedź)"""
+        return estimate_tokens("".join(m["content"] for m in messages)) + COMPLETION_TOKEN_RESERVE
+    
+    def _retry_delay(self, scheduler: ProviderScheduler, error: Exception,
+                     attempt: int) -> Optional[float]:
+        """Zwraca czas oczekiwania przed ponowieniem lub None, gdy nie należy ponawiać"""
+        if getattr(error, "status_code", None) == 429:
+            scheduler.note_rate_limited()
+        if attempt >= scheduler.max_retries or not _is_retryable_error(error):
+            return None
+        delay = scheduler.backoff_delay(attempt, _retry_after_seconds(error))
+        self.log(f"Ponawiam wywołanie za {delay:.1f}s (próba {attempt + 1}/{scheduler.max_retries}): {error}",
+                 Fore.YELLOW)
+        return delay
+    
+    async def _acall_llm(self, system_prompt: str, user_prompt: str,
+                         response_format: Optional[Dict[str, Any]] = None) -> str:
+        """Asynchronicznie wywołuje model językowy (AsyncOpenAI)"""
+        cache_key = self._cache_key(system_prompt, user_prompt)
+        if cache_key is not None:
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        messages = self._build_messages(system_prompt, user_prompt)
+        try:
+            try:
+                response = await self._acreate_completion(messages, response_format=response_format)
+            except APIStatusError as e:
+                if not self._is_unsupported_format(e, response_format):
+                    raise
+                response = await self._acreate_completion(messages)
+            content = response.choices[0].message.content
         except Exception as e:
             print(f"{Fore.RED}Błąd wywołania LLM: {e}")
             return ""
+        if cache_key is not None:
+            self.llm_cache.put(cache_key, content)
+        return content
+    
+    async def _astream_llm(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        """Asynchroniczna wersja _stream_llm"""
+        cache_key = self._cache_key(system_prompt, user_prompt)
+        if cache_key is not None:
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        chunks = []
+        try:
+            stream = await self._acreate_completion(self._build_messages(system_prompt, user_prompt),
+                                                    stream=True)
+            async with aclosing(stream):
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        chunks.append(delta)
+                        yield delta
+        except Exception as e:
+            print(f"{Fore.RED}Błąd wywołania LLM: {e}")
+            return
+        if cache_key is not None:
+            self.llm_cache.put(cache_key, "".join(chunks))
+    
+    async def _acreate_completion(self, messages: List[Dict[str, str]], stream: bool = False,
+                                  response_format: Optional[Dict[str, Any]] = None):
+        """Asynchroniczna wersja _create_completion"""
+        request = self._completion_request(messages, stream, response_format)
+        scheduler = self.rate_limiter
+        client = self.async_client if scheduler is None else self.async_client.with_options(max_retries=0)
+        estimated = self._estimate_request_tokens(messages)
+        slots = self.async_call_slots
+        attempt = 0
+        while True:
+            if slots is not None:
+                await slots.acquire()
+            held = slots
+            try:
+                if scheduler is not None:
+                    await scheduler.aacquire(self.priority, estimated)
+                response = await client.chat.completions.create(**request)
+                if stream:
+                    held = None
+                    return self._aiter_stream(response, slots, scheduler, estimated)
+                if scheduler is not None:
+                    scheduler.record_usage(estimated, response.usage.total_tokens if response.usage else None)
+                return response
+            except Exception as e:
+                delay = None if scheduler is None else self._retry_delay(scheduler, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                if held is not None:
+                    held.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    async def _aiter_stream(self, stream, slots: Optional[asyncio.Semaphore],
+                            scheduler: Optional[ProviderScheduler], estimated: int) -> AsyncIterator[Any]:
+        """Asynchroniczna wersja _iter_stream"""
+        usage = None
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage.total_tokens
+                yield chunk
+        finally:
+            await stream.close()
+            if slots is not None:
+                slots.release()
+            if scheduler is not None:
+                scheduler.record_usage(estimated, usage)
     
     def log(self, message: str, color=Fore.WHITE):
         """Loguje wiadomość z kolorami"""
@@ -62,15 +516,9 @@ class BaseAgent:
 class ComplexityAnalyzerAgent(BaseAgent):
     """Agent analizujący złożoność - ocenia czy zadanie wymaga podziału"""
     
-    def __init__(self, api_key: Optional[str] = None, provider: Optional[str] = None,
-                 model: Optional[str] = None):
-        super().__init__("ComplexityAnalyzer", "Complexity Assessment", api_key, provider, model)
+    priority = Priority.ANALYSIS
     
-    def should_decompose(self, task: Task) -> Dict[str, Any]:
-        """Ocenia czy zadanie wymaga podziału na podzadania"""
-        self.log(f"Analizuję: {task.description[:50]}...", Fore.MAGENTA)
-        
-        system_prompt = """Jesteś ekspertem w analizie złożoności zadań. OCENIASZ POTENCJALNY OUTPUT!
+    ASSESSMENT_CRITERIA = """Jesteś ekspertem w analizie złożoności zadań. OCENIASZ POTENCJALNY OUTPUT!
 Oceniasz zadania pod kątem:
 1. POTENCJALNEJ ILOŚCI OUTPUTU - ile tekstu/danych wygeneruje to zadanie?
 2. Czy zadanie jest wystarczająco PROSTE do bezpośredniego wykonania
@@ -92,14 +540,95 @@ Kryteria ZŁOŻONEGO zadania (wymaga podziału):
 - Potencjalny output: DŁUGI lub BARDZO_DŁUGI
 - Wymaga wielu kroków lub analiz
 - Obejmuje różne aspekty/dziedziny
-- Zbyt szerokie lub wielowątkowe
-
-Odpowiedz w formacie:
-POTENCJALNY_OUTPUT: [KRÓTKI/ŚREDNI/DŁUGI/BARDZO_DŁUGI]
+- Zbyt szerokie lub wielowątkowe"""
+    
+    RESPONSE_FORMAT = """POTENCJALNY_OUTPUT: [KRÓTKI/ŚREDNI/DŁUGI/BARDZO_DŁUGI]
 PODZIAŁ: [TAK/NIE]
 LICZBA_PODZADAŃ: [2-5 jeśli TAK, 0 jeśli NIE]
 ZŁOŻONOŚĆ: [NISKA/ŚREDNIA/WYSOKA/BARDZO_WYSOKA]
 UZASADNIENIE: [wyjaśnienie potencjalnego outputu i decyzji]"""
+    
+    JSON_FORMAT = """{"output_size": "KRÓTKI" | "ŚREDNI" | "DŁUGI" | "BARDZO_DŁUGI",
+ "should_split": true | false,
+ "num_subtasks": 2-5 jeśli should_split, 0 w przeciwnym razie,
+ "complexity": "NISKA" | "ŚREDNIA" | "WYSOKA" | "BARDZO_WYSOKA",
+ "reasoning": "wyjaśnienie potencjalnego outputu i decyzji"}"""
+    
+    OUTPUT_SIZES = ["KRÓTKI", "ŚREDNI", "DŁUGI", "BARDZO_DŁUGI"]
+    COMPLEXITIES = ["NISKA", "ŚREDNIA", "WYSOKA", "BARDZO_WYSOKA"]
+    
+    JSON_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "output_size": {"type": "string", "enum": OUTPUT_SIZES},
+            "should_split": {"type": "boolean"},
+            "num_subtasks": {"type": "integer"},
+            "complexity": {"type": "string", "enum": COMPLEXITIES},
+            "reasoning": {"type": "string"}
+        },
+        "required": ["output_size", "should_split", "num_subtasks", "complexity", "reasoning"],
+        "additionalProperties": False
+    }
+    
+    def __init__(self, api_key: Optional[str] = None, provider: Optional[str] = None,
+                 model: Optional[str] = None, client_registry: Optional[ClientRegistry] = None):
+        super().__init__("ComplexityAnalyzer", "Complexity Assessment", api_key, provider, model, client_registry)
+        # Liczniki analizy wsadowej (współdzielone między wątkami rodzeństwa)
+        self.batch_stats: Dict[str, int] = {"batches": 0, "batched_tasks": 0, "fallbacks": 0}
+    
+    def should_decompose_batch(self, tasks: List[Task]) -> List[Dict[str, Any]]:
+        """Ocenia całe rodzeństwo jednym wywołaniem; nieczytelne pozycje ocenia osobno"""
+        if len(tasks) <= 1:
+            return [self.should_decompose(task) for task in tasks]
+        
+        self.log(f"Analizuję wsadowo {len(tasks)} zadań...", Fore.MAGENTA)
+        response = self._call_llm(*self._build_batch_prompts(tasks))
+        analyses = self._finish_batch_analysis(tasks, response)
+        return [analysis if analysis is not None else self.should_decompose(task)
+                for task, analysis in zip(tasks, analyses)]
+    
+    async def ashould_decompose_batch(self, tasks: List[Task]) -> List[Dict[str, Any]]:
+        """Asynchroniczna wersja should_decompose_batch (fallbacki wykonywane współbieżnie)"""
+        if len(tasks) <= 1:
+            return [await self.ashould_decompose(task) for task in tasks]
+        
+        self.log(f"Analizuję wsadowo {len(tasks)} zadań...", Fore.MAGENTA)
+        response = await self._acall_llm(*self._build_batch_prompts(tasks))
+        analyses = self._finish_batch_analysis(tasks, response)
+        
+        async def resolve(task: Task, analysis: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            return analysis if analysis is not None else await self.ashould_decompose(task)
+        
+        return list(await asyncio.gather(*(resolve(task, analysis)
+                                           for task, analysis in zip(tasks, analyses))))
+    
+    def should_decompose(self, task: Task) -> Dict[str, Any]:
+        """Ocenia czy zadanie wymaga podziału na podzadania"""
+        self.log(f"Analizuję: {task.description[:50]}...", Fore.MAGENTA)
+        response = self._call_llm(*self._build_prompts(task),
+                                  response_format=self._response_format("complexity_analysis", self.JSON_SCHEMA))
+        return self._finish_analysis(response)
+    
+    async def ashould_decompose(self, task: Task) -> Dict[str, Any]:
+        """Asynchroniczna wersja should_decompose"""
+        self.log(f"Analizuję: {task.description[:50]}...", Fore.MAGENTA)
+        response = await self._acall_llm(*self._build_prompts(task),
+                                         response_format=self._response_format("complexity_analysis",
+                                                                               self.JSON_SCHEMA))
+        return self._finish_analysis(response)
+    
+    def _build_prompts(self, task: Task) -> Tuple[str, str]:
+        """Buduje prompty oceny złożoności"""
+        if self.structured_output:
+            system_prompt = f"""{self.ASSESSMENT_CRITERIA}
+
+Odpowiedz WYŁĄCZNIE obiektem JSON (bez dodatkowego tekstu):
+{self.JSON_FORMAT}"""
+        else:
+            system_prompt = f"""{self.ASSESSMENT_CRITERIA}
+
+Odpowiedz w formacie:
+{self.RESPONSE_FORMAT}"""
 
         user_prompt = f"""Zadanie do oceny:
 {task.description}
@@ -108,19 +637,106 @@ Aktualny poziom zagnieżdżenia: {task.level}
 
 SKUPIAJ SIĘ NA POTENCJALNYM OUTPUTIE - ile tekstu/danych wygeneruje to zadanie?
 Czy to zadanie wymaga podziału na podzadania?"""
+        return system_prompt, user_prompt
+    
+    def _build_batch_prompts(self, tasks: List[Task]) -> Tuple[str, str]:
+        """Buduje prompty wsadowej oceny rodzeństwa (ponumerowane zadania)"""
+        system_prompt = f"""{self.ASSESSMENT_CRITERIA}
 
-        response = self._call_llm(system_prompt, user_prompt)
-        
-        # Parsuj odpowiedź
-        analysis = self._parse_complexity_response(response)
+Otrzymasz KILKA ponumerowanych zadań. Oceń KAŻDE z nich NIEZALEŻNIE.
+Dla każdego zadania odpowiedz osobnym blokiem w formacie:
+ZADANIE [numer]:
+{self.RESPONSE_FORMAT}"""
+
+        numbered = "\n\n".join(f"ZADANIE {idx}:\n{task.description}"
+                                for idx, task in enumerate(tasks, 1))
+        user_prompt = f"""Zadania do oceny ({len(tasks)}):
+
+{numbered}
+
+Aktualny poziom zagnieżdżenia: {tasks[0].level}
+
+SKUPIAJ SIĘ NA POTENCJALNYM OUTPUTIE - ile tekstu/danych wygeneruje każde zadanie?
+Które zadania wymagają podziału na podzadania? Zwróć dokładnie {len(tasks)} bloków."""
+        return system_prompt, user_prompt
+    
+    def _finish_analysis(self, response: str) -> Dict[str, Any]:
+        """Parsuje odpowiedź analizy i loguje decyzję"""
+        analysis = None
+        if self.structured_output:
+            analysis = self._parse_complexity_json(response)
+            self._bump(self.parse_stats, "structured" if analysis is not None else "parse_failures")
+        if analysis is None:
+            analysis = self._parse_complexity_response(response)
+        self._log_decision(analysis)
+        return analysis
+    
+    def _finish_batch_analysis(self, tasks: List[Task],
+                               response: str) -> List[Optional[Dict[str, Any]]]:
+        """Parsuje odpowiedź wsadową; None oznacza pozycję do oceny osobnym wywołaniem"""
+        analyses = self._parse_batch_response(response, len(tasks))
+        missing = sum(1 for analysis in analyses if analysis is None)
+        self._bump(self.batch_stats, "batches")
+        self._bump(self.batch_stats, "batched_tasks", len(tasks) - missing)
+        self._bump(self.batch_stats, "fallbacks", missing)
+        
+        for task, analysis in zip(tasks, analyses):
+            if analysis is None:
+                self.log(f"⚠ Brak oceny dla {task.id} w odpowiedzi wsadowej - oceniam osobno", Fore.RED)
+            else:
+                self.log(f"{task.id}:", Fore.MAGENTA)
+                self._log_decision(analysis)
+        return analyses
+    
+    def _parse_batch_response(self, response: str, count: int) -> List[Optional[Dict[str, Any]]]:
+        """Dzieli odpowiedź na bloki "ZADANIE n:" i parsuje każdy osobno"""
+        import re
         
+        analyses: List[Optional[Dict[str, Any]]] = [None] * count
+        parts = re.split(r'^\W*ZADANIE\s*\[?(\d+)\]?\W*$', response,
+                         flags=re.IGNORECASE | re.MULTILINE)
+        # parts = [wstęp, numer, blok, numer, blok, ...]
+        for number, block in zip(parts[1::2], parts[2::2]):
+            idx = int(number) - 1
+            # Blok bez decyzji o podziale jest nieczytelny - pomijamy go
+            if 0 <= idx < count and analyses[idx] is None and re.search(r'PODZIA[ŁL]', block.upper()):
+                analyses[idx] = self._parse_complexity_response(block)
+        return analyses
+    
+    def _log_decision(self, analysis: Dict[str, Any]):
+        """Loguje decyzję o podziale zadania"""
         if analysis["should_split"]:
             self.log(f"✓ Zadanie WYMAGA podziału na {analysis['num_subtasks']} podzadań", Fore.YELLOW)
             self.log(f"  Output: {analysis['output_size']} | Złożoność: {analysis['complexity']}", Fore.CYAN)
         else:
             self.log(f"✓ Zadanie jest WYSTARCZAJĄCO PROSTE - wykonaj bezpośrednio", Fore.GREEN)
             self.log(f"  Output: {analysis['output_size']} | Złożoność: {analysis['complexity']}", Fore.CYAN)
+    
+    def _parse_complexity_json(self, response: str) -> Optional[Dict[str, Any]]:
+        """Ścisły parser odpowiedzi JSON - None gdy odpowiedź nie pasuje do schematu"""
+        data = _load_json_object(response)
+        if data is None:
+            return None
+        should_split = data.get("should_split")
+        num_subtasks = data.get("num_subtasks")
+        if not isinstance(should_split, bool) or isinstance(num_subtasks, bool) \
+                or not isinstance(num_subtasks, int):
+            return None
+        output_size = str(data.get("output_size", "")).upper().replace(" ", "_")
+        complexity = str(data.get("complexity", "")).upper().replace(" ", "_")
+        if output_size not in self.OUTPUT_SIZES or complexity not in self.COMPLEXITIES:
+            return None
         
+        analysis = {
+            "should_split": should_split,
+            "num_subtasks": max(0, min(num_subtasks, 5)),
+            "complexity": complexity,
+            "output_size": output_size,
+            "reasoning": str(data.get("reasoning", ""))
+        }
+        # Te same reguły co w parserze tekstowym
+        if analysis["should_split"] and analysis["num_subtasks"] == 0:
+            analysis["num_subtasks"] = 3
         return analysis
     
     def _parse_complexity_response(self, response: str) -> Dict[str, Any]:
@@ -174,10 +790,42 @@ Czy to zadanie wymaga podziału na podzadania?"""
 class CoordinatorAgent(BaseAgent):
     """Agent koordynujący - analizuje cel i dzieli na podzadania"""
     
-    def __init__(self, api_key: Optional[str] = None, provider: Optional[str] = None, 
-                 model: Optional[str] = None):
-        super().__init__("Coordinator", "Task Decomposition", api_key, provider, model)
-        
+    priority = Priority.DECOMPOSITION
+    
+    def __init__(self, api_key: Optional[str] = None, provider: Optional[str] = None,
+                 model: Optional[str] = None, client_registry: Optional[ClientRegistry] = None):
+        super().__init__("Coordinator", "Task Decomposition", api_key, provider, model, client_registry)
+        # Liczniki trybu łączonego (ocena + dekompozycja + duplikaty w jednym wywołaniu)
+        self.fused_stats: Dict[str, int] = {"plans": 0, "fallbacks": 0}
+    
+    PLAN_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "output_size": {"type": "string", "enum": ComplexityAnalyzerAgent.OUTPUT_SIZES},
+            "complexity": {"type": "string", "enum": ComplexityAnalyzerAgent.COMPLEXITIES},
+            "should_split": {"type": "boolean"},
+            "reasoning": {"type": "string"},
+            "subtasks": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": ["output_size", "complexity", "should_split", "reasoning", "subtasks"],
+        "additionalProperties": False
+    }
+    
+    def plan_task(self, task: Task, task_manager=None) -> Optional[Dict[str, Any]]:
+        """Ocena złożoności, dekompozycja i eliminacja duplikatów w jednym wywołaniu
+        (None gdy odpowiedź nieczytelna - należy użyć pełnego potoku)"""
+        self.log(f"Planuję zadanie: {task.description[:50]}...", Fore.CYAN)
+        response = self._call_llm(*self._build_plan_prompts(task, task_manager),
+                                  response_format=self._response_format("task_plan", self.PLAN_SCHEMA))
+        return self._finish_plan(response)
+    
+    async def aplan_task(self, task: Task, task_manager=None) -> Optional[Dict[str, Any]]:
+        """Asynchroniczna wersja plan_task"""
+        self.log(f"Planuję zadanie: {task.description[:50]}...", Fore.CYAN)
+        response = await self._acall_llm(*self._build_plan_prompts(task, task_manager),
+                                         response_format=self._response_format("task_plan", self.PLAN_SCHEMA))
+        return self._finish_plan(response)
+    
     def decompose_task(self, task: Task, max_subtasks: int, task_manager=None) -> List[str]:
         """Dekomponuje zadanie na podzadania"""
         self.log(f"Analizuję zadanie: {task.description}", Fore.CYAN)
@@ -187,6 +835,22 @@ class CoordinatorAgent(BaseAgent):
             self.log("Zadanie ocenione jako atomowe - nie wymaga dekompozycji", Fore.YELLOW)
             return []
         
+        response = self._call_llm(*self._build_prompts(task, max_subtasks, task_manager))
+        return self._parse_subtasks(response, max_subtasks)
+    
+    async def adecompose_task(self, task: Task, max_subtasks: int, task_manager=None) -> List[str]:
+        """Asynchroniczna wersja decompose_task"""
+        self.log(f"Analizuję zadanie: {task.description}", Fore.CYAN)
+        
+        if max_subtasks == 1:
+            self.log("Zadanie ocenione jako atomowe - nie wymaga dekompozycji", Fore.YELLOW)
+            return []
+        
+        response = await self._acall_llm(*self._build_prompts(task, max_subtasks, task_manager))
+        return self._parse_subtasks(response, max_subtasks)
+    
+    def _build_prompts(self, task: Task, max_subtasks: int, task_manager=None) -> Tuple[str, str]:
+        """Buduje prompty dekompozycji"""
         system_prompt = f"""Jesteś ekspertem w dekompozycji zadań. Twoim zadaniem jest rozłożenie złożonego 
 zadania na dokładnie {max_subtasks} mniejszych, wykonalnych podzadań.
 
@@ -208,10 +872,89 @@ Zasady:
 {parent_context}
 
 Rozłóż to zadanie na DOKŁADNIE {max_subtasks} podzadań."""
+        return system_prompt, user_prompt
+    
+    def _build_plan_prompts(self, task: Task, task_manager=None) -> Tuple[str, str]:
+        """Buduje prompty trybu łączonego (kryteria analizatora + zasady dekompozycji i duplikatów)"""
+        system_prompt = f"""{ComplexityAnalyzerAgent.ASSESSMENT_CRITERIA}
 
-        response = self._call_llm(system_prompt, user_prompt)
-        
-        # Parsuj odpowiedź
+Jeśli zadanie wymaga podziału, od razu rozłóż je na 2-5 podzadań:
+1. Każde podzadanie powinno być konkretne i wykonalne
+2. Podzadania powinny być logicznie uporządkowane
+3. Razem podzadania powinny w pełni realizować główne zadanie
+4. Podzadania NIE MOGĄ się pokrywać - jeśli dwa robią to samo lub jedno zawiera się
+   w drugim, zostaw JEDNO (bardziej kompletne); różne aspekty zostaw osobno
+
+Odpowiedz WYŁĄCZNIE obiektem JSON (bez dodatkowego tekstu):
+{{"output_size": "KRÓTKI" | "ŚREDNI" | "DŁUGI" | "BARDZO_DŁUGI",
+ "complexity": "NISKA" | "ŚREDNIA" | "WYSOKA" | "BARDZO_WYSOKA",
+ "should_split": true | false,
+ "reasoning": "wyjaśnienie potencjalnego outputu i decyzji",
+ "subtasks": ["unikalne podzadania, bez numeracji - pusta lista gdy should_split = false"]}}"""
+
+        parent_context = ""
+        if task.parent_id and task_manager:
+            parent_task = task_manager.get_task(task.parent_id)
+            if parent_task:
+                parent_context = f"\nKontekst z zadania nadrzędnego: {parent_task.description}"
+
+        user_prompt = f"""Zadanie do oceny:
+{task.description}
+{parent_context}
+
+Aktualny poziom zagnieżdżenia: {task.level}
+
+Czy to zadanie wymaga podziału? Jeśli tak - podaj unikalne podzadania."""
+        return system_prompt, user_prompt
+    
+    def _finish_plan(self, response: str) -> Optional[Dict[str, Any]]:
+        """Parsuje plan łączony i aktualizuje liczniki"""
+        plan = self._parse_plan(response)
+        if plan is None:
+            self._bump(self.fused_stats, "fallbacks")
+            self.log("⚠ Nieczytelny plan łączony - używam pełnego potoku", Fore.RED)
+            return None
+        
+        self._bump(self.fused_stats, "plans")
+        if plan["should_split"]:
+            self.log(f"✓ Plan: podział na {len(plan['subtasks'])} unikalnych podzadań "
+                     f"(Output: {plan['output_size']} | Złożoność: {plan['complexity']})", Fore.YELLOW)
+        else:
+            self.log(f"✓ Plan: zadanie WYSTARCZAJĄCO PROSTE - wykonaj bezpośrednio "
+                     f"(Output: {plan['output_size']} | Złożoność: {plan['complexity']})", Fore.GREEN)
+        return plan
+    
+    def _parse_plan(self, response: str) -> Optional[Dict[str, Any]]:
+        """Ścisły parser planu łączonego - None gdy odpowiedź nie pasuje do schematu"""
+        data = _load_json_object(response)
+        if data is None:
+            return None
+        should_split = data.get("should_split")
+        subtasks = data.get("subtasks")
+        if not isinstance(should_split, bool) or not isinstance(subtasks, list):
+            return None
+        
+        # Zabezpieczenie przed dosłownymi powtórzeniami, których model nie usunął
+        unique: List[str] = []
+        seen = set()
+        for subtask in subtasks:
+            clean = str(subtask).strip().lstrip('0123456789.-•) ').strip()
+            if clean and clean.lower() not in seen:
+                seen.add(clean.lower())
+                unique.append(clean)
+        if should_split and len(unique) < 2:
+            return None
+        
+        return {
+            "should_split": should_split,
+            "subtasks": unique[:5] if should_split else [],
+            "output_size": str(data.get("output_size", "ŚREDNI")),
+            "complexity": str(data.get("complexity", "ŚREDNIA")),
+            "reasoning": str(data.get("reasoning", ""))
+        }
+    
+    def _parse_subtasks(self, response: str, max_subtasks: int) -> List[str]:
+        """Parsuje numerowaną listę podzadań"""
         subtasks = []
         for line in response.strip().split('\n'):
             line = line.strip()
@@ -233,14 +976,47 @@ class ExecutorAgent(BaseAgent):
     """Agent wykonawczy - realizuje atomowe zadania"""
     
     def __init__(self, agent_id: int, api_key: Optional[str] = None, 
-                 provider: Optional[str] = None, model: Optional[str] = None):
-        super().__init__(f"Executor-{agent_id}", "Task Execution", api_key, provider, model)
+                 provider: Optional[str] = None, model: Optional[str] = None,
+                 client_registry: Optional[ClientRegistry] = None):
+        super().__init__(f"Executor-{agent_id}", "Task Execution", api_key, provider, model, client_registry)
         self.agent_id = agent_id
         
-    def execute_task(self, task: Task, context: Dict[str, Any] = None) -> str:
-        """Wykonuje zadanie i zwraca wynik"""
+    def execute_task(self, task: Task, context: Dict[str, Any] = None,
+                     on_token: Optional[Callable[[str], None]] = None) -> str:
+        """Wykonuje zadanie i zwraca wynik (on_token - strumieniowanie fragmentów wyniku)"""
         self.log(f"Wykonuję zadanie: {task.description[:50]}...", Fore.BLUE)
+        prompts = self._build_prompts(task, context)
+        if on_token is None:
+            result = self._call_llm(*prompts)
+        else:
+            chunks = []
+            for delta in self._stream_llm(*prompts):
+                chunks.append(delta)
+                on_token(delta)
+            result = "".join(chunks)
+        self.log("Zadanie ukończone", Fore.GREEN)
+        
+        return result
+    
+    async def aexecute_task(self, task: Task, context: Dict[str, Any] = None,
+                            on_token: Optional[Callable[[str], None]] = None) -> str:
+        """Asynchroniczna wersja execute_task"""
+        self.log(f"Wykonuję zadanie: {task.description[:50]}...", Fore.BLUE)
+        prompts = self._build_prompts(task, context)
+        if on_token is None:
+            result = await self._acall_llm(*prompts)
+        else:
+            chunks = []
+            async for delta in self._astream_llm(*prompts):
+                chunks.append(delta)
+                on_token(delta)
+            result = "".join(chunks)
+        self.log("Zadanie ukończone", Fore.GREEN)
         
+        return result
+    
+    def _build_prompts(self, task: Task, context: Dict[str, Any] = None) -> Tuple[str, str]:
+        """Buduje prompty wykonania zadania"""
         context_info = ""
         if context:
             context_info = f"\nKontekst z poprzednich zadań:\n{self._format_context(context)}"
@@ -260,11 +1036,7 @@ Zasady:
 {context_info}
 
 Wykonaj zadanie i przedstaw wynik."""
-
-        result = self._call_llm(system_prompt, user_prompt)
-        self.log("Zadanie ukończone", Fore.GREEN)
-        
-        return result
+        return system_prompt, user_prompt
     
     def _format_context(self, context: Dict[str, Any]) -> str:
         """Formatuje kontekst dla LLM"""
@@ -274,26 +1046,118 @@ Wykonaj zadanie i przedstaw wynik."""
         return "\n".join(formatted)
 
 
+class AggregatorAgent(BaseAgent):
+    """Agent agregujący - streszcza wyniki podzadań, gdy ich łączny tekst przekracza budżet tokenów"""
+    
+    def __init__(self, api_key: Optional[str] = None, provider: Optional[str] = None,
+                 model: Optional[str] = None, client_registry: Optional[ClientRegistry] = None):
+        super().__init__("Aggregator", "Result Aggregation", api_key, provider, model, client_registry)
+    
+    def summarize(self, task: Task, token_budget: int) -> str:
+        """Zwraca streszczenie wyników podzadań mieszczące się w budżecie tokenów"""
+        self.log(f"Streszczam wyniki podzadań: {task.description[:50]}...", Fore.BLUE)
+        return self._call_llm(*self._build_prompts(task, token_budget))
+    
+    async def asummarize(self, task: Task, token_budget: int) -> str:
+        """Asynchroniczna wersja summarize"""
+        self.log(f"Streszczam wyniki podzadań: {task.description[:50]}...", Fore.BLUE)
+        return await self._acall_llm(*self._build_prompts(task, token_budget))
+    
+    def _build_prompts(self, task: Task, token_budget: int) -> Tuple[str, str]:
+        """Buduje prompty streszczenia - każde podzadanie dostaje równy udział w wejściu"""
+        subtasks = [subtask for subtask in task.subtasks if subtask.has_result]
+        # Wejście ograniczone do ~4x budżetu wyjścia (ok. 4 znaki na token)
+        share = max(200, (token_budget * 16) // max(len(subtasks), 1))
+        sections = []
+        for subtask in subtasks:
+            preview = subtask.result_preview(share)
+            if subtask.result_length > share:
+                preview += " [...]"
+            sections.append(f"[{subtask.id}] {subtask.description}\n{preview}")
+        
+        system_prompt = f"""Jesteś agentem agregującym wyniki podzadań w wynik zadania nadrzędnego.
+Połącz wyniki w jedną spójną odpowiedź na zadanie nadrzędne.
+
+Zasady:
+1. Zachowaj wszystkie konkretne ustalenia, liczby i decyzje
+2. Usuń powtórzenia i treści nieistotne dla zadania nadrzędnego
+3. Odpowiedź nie może przekraczać ok. {token_budget} tokenów"""
+
+        user_prompt = f"""Zadanie nadrzędne:
+{task.description}
+
+Wyniki podzadań:
+{chr(10).join(sections)}
+
+Przedstaw zagregowany wynik zadania nadrzędnego."""
+        return system_prompt, user_prompt
+
+
 class VerificationAgent(BaseAgent):
     """Agent weryfikujący - sprawdza jakość wykonania zadań"""
     
+    priority = Priority.VERIFICATION
+    
     def __init__(self, api_key: Optional[str] = None, provider: Optional[str] = None,
-                 model: Optional[str] = None):
-        super().__init__("Verifier", "Quality Assurance", api_key, provider, model)
+                 model: Optional[str] = None, client_registry: Optional[ClientRegistry] = None):
+        super().__init__("Verifier", "Quality Assurance", api_key, provider, model, client_registry)
+    
+    JSON_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "passed": {"type": "boolean"},
+            "score": {"type": "number"},
+            "feedback": {"type": "string"},
+            "issues": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": ["passed", "score", "feedback", "issues"],
+        "additionalProperties": False
+    }
+    
+    def verify_task(self, task: Task, child_summaries: Optional[str] = None) -> Dict[str, Any]:
+        """Weryfikuje wykonanie zadania (rodzica - opcjonalnie na podstawie streszczeń podzadań)"""
+        self.log(f"Weryfikuję zadanie: {task.description[:50]}...", Fore.MAGENTA)
+        
+        if not task.has_result:
+            return self._missing_result()
         
-    def verify_task(self, task: Task) -> Dict[str, Any]:
-        """Weryfikuje wykonanie zadania"""
+        response = self._call_llm(*self._build_prompts(task, child_summaries),
+                                  response_format=self._response_format("verification", self.JSON_SCHEMA))
+        return self._finish_verification(response)
+    
+    async def averify_task(self, task: Task, child_summaries: Optional[str] = None) -> Dict[str, Any]:
+        """Asynchroniczna wersja verify_task"""
         self.log(f"Weryfikuję zadanie: {task.description[:50]}...", Fore.MAGENTA)
         
-        if not task.result:
-            return {
-                "passed": False,
-                "score": 0.0,
-                "feedback": "Brak wyniku do weryfikacji",
-                "issues": ["Zadanie nie zostało wykonane"]
-            }
+        if not task.has_result:
+            return self._missing_result()
         
-        system_prompt = """Jesteś ekspertem w kontroli jakości i weryfikacji zadań.
+        response = await self._acall_llm(*self._build_prompts(task, child_summaries),
+                                         response_format=self._response_format("verification", self.JSON_SCHEMA))
+        return self._finish_verification(response)
+    
+    def _missing_result(self) -> Dict[str, Any]:
+        """Wynik weryfikacji dla zadania bez wyniku"""
+        return {
+            "passed": False,
+            "score": 0.0,
+            "feedback": "Brak wyniku do weryfikacji",
+            "issues": ["Zadanie nie zostało wykonane"]
+        }
+    
+    def _build_prompts(self, task: Task, child_summaries: Optional[str] = None) -> Tuple[str, str]:
+        """Buduje prompty weryfikacji"""
+        if self.structured_output:
+            system_prompt = """Jesteś ekspertem w kontroli jakości i weryfikacji zadań.
+Twoim zadaniem jest ocena czy zadanie zostało wykonane poprawnie i kompletnie.
+
+Zwróć WYŁĄCZNIE obiekt JSON (bez dodatkowego tekstu):
+{"passed": true | false,
+ "score": liczba 0.0-10.0,
+ "feedback": "szczegółowa ocena",
+ "issues": ["lista problemów - pusta gdy brak"]}"""
+        else:
+            system_prompt = """Jesteś ekspertem w kontroli jakości i weryfikacji zadań.
 Twoim zadaniem jest ocena czy zadanie zostało wykonane poprawnie i kompletnie.
 
 Zwróć odpowiedź w formacie:
@@ -302,6 +1166,16 @@ PUNKTACJA: [0.0-10.0]
 FEEDBACK: [Szczegółowa ocena]
 PROBLEMY: [Lista problemów lub "Brak"]"""
 
+        if child_summaries is not None:
+            user_prompt = f"""Zadanie:
+{task.description}
+
+Zadanie zostało wykonane przez podzadania (opis, ocena weryfikacji, początek wyniku):
+{child_summaries}
+
+Oceń, czy podzadania razem kompletnie realizują zadanie."""
+            return system_prompt, user_prompt
+
         user_prompt = f"""Zadanie:
 {task.description}
 
@@ -309,11 +1183,16 @@ Wynik wykonania:
 {task.result}
 
 Oceń jakość wykonania zadania."""
-
-        response = self._call_llm(system_prompt, user_prompt)
-        
-        # Parsuj odpowiedź
-        verification = self._parse_verification(response)
+        return system_prompt, user_prompt
+    
+    def _finish_verification(self, response: str) -> Dict[str, Any]:
+        """Parsuje odpowiedź weryfikacji i loguje wynik"""
+        verification = None
+        if self.structured_output:
+            verification = self._parse_verification_json(response)
+            self._bump(self.parse_stats, "structured" if verification is not None else "parse_failures")
+        if verification is None:
+            verification = self._parse_verification(response)
         
         if verification["passed"]:
             self.log(f"✓ Weryfikacja zakończona sukcesem (wynik: {verification['score']}/10)", Fore.GREEN)
@@ -322,6 +1201,24 @@ Oceń jakość wykonania zadania."""
         
         return verification
     
+    def _parse_verification_json(self, response: str) -> Optional[Dict[str, Any]]:
+        """Ścisły parser odpowiedzi JSON - None gdy odpowiedź nie pasuje do schematu"""
+        data = _load_json_object(response)
+        if data is None:
+            return None
+        passed = data.get("passed")
+        score = data.get("score")
+        issues = data.get("issues", [])
+        if not isinstance(passed, bool) or isinstance(score, bool) \
+                or not isinstance(score, (int, float)) or not isinstance(issues, list):
+            return None
+        return {
+            "passed": passed,
+            "score": max(0.0, min(float(score), 10.0)),
+            "feedback": str(data.get("feedback", "")),
+            "issues": [str(issue) for issue in issues if str(issue).strip().lower() not in ("", "brak")]
+        }
+    
     def _parse_verification(self, response: str) -> Dict[str, Any]:
         """Parsuje odpowiedź weryfikacyjną"""
         lines = response.strip().split('\n')
@@ -355,9 +1252,13 @@ Oceń jakość wykonania zadania."""
 class DuplicationDetectorAgent(BaseAgent):
     """Agent wykrywający i eliminujący pokrywające się zadania"""
     
+    priority = Priority.DECOMPOSITION
+    
     def __init__(self, api_key: Optional[str] = None, provider: Optional[str] = None,
-                 model: Optional[str] = None):
-        super().__init__("DuplicationDetector", "Duplication Analysis", api_key, provider, model)
+                 model: Optional[str] = None, client_registry: Optional[ClientRegistry] = None):
+        super().__init__("DuplicationDetector", "Duplication Analysis", api_key, provider, model, client_registry)
+        # Opcjonalny lokalny detektor (ustawiany przez orkiestratora) - LLM tylko dla niejednoznacznych par
+        self.local_engine: Optional[LocalDeduplicator] = None
     
     def detect_and_eliminate_duplicates(self, subtask_descriptions: List[str], 
                                        parent_task: Task) -> List[str]:
@@ -366,7 +1267,63 @@ class DuplicationDetectorAgent(BaseAgent):
             return subtask_descriptions
         
         self.log(f"Analizuję {len(subtask_descriptions)} podzadań pod kątem duplikatów", Fore.MAGENTA)
+        if self.local_engine is None:
+            response = self._call_llm(*self._build_prompts(subtask_descriptions, parent_task))
+            return self._finish_deduplication(response, subtask_descriptions)
+        
+        decision, ambiguous = self._local_decision(subtask_descriptions)
+        if not ambiguous:
+            return decision["unique"]
+        candidates = [subtask_descriptions[idx] for idx in ambiguous]
+        response = self._call_llm(*self._build_prompts(candidates, parent_task))
+        return self._merge_verdict(subtask_descriptions, decision, ambiguous,
+                                   self._finish_deduplication(response, candidates))
+    
+    async def adetect_and_eliminate_duplicates(self, subtask_descriptions: List[str],
+                                               parent_task: Task) -> List[str]:
+        """Asynchroniczna wersja detect_and_eliminate_duplicates"""
+        if len(subtask_descriptions) <= 1:
+            return subtask_descriptions
         
+        self.log(f"Analizuję {len(subtask_descriptions)} podzadań pod kątem duplikatów", Fore.MAGENTA)
+        if self.local_engine is None:
+            response = await self._acall_llm(*self._build_prompts(subtask_descriptions, parent_task))
+            return self._finish_deduplication(response, subtask_descriptions)
+        
+        decision, ambiguous = self._local_decision(subtask_descriptions)
+        if not ambiguous:
+            return decision["unique"]
+        candidates = [subtask_descriptions[idx] for idx in ambiguous]
+        response = await self._acall_llm(*self._build_prompts(candidates, parent_task))
+        return self._merge_verdict(subtask_descriptions, decision, ambiguous,
+                                   self._finish_deduplication(response, candidates))
+    
+    def _local_decision(self, subtask_descriptions: List[str]) -> Tuple[Dict[str, Any], List[int]]:
+        """Lokalna klasyfikacja par; zwraca decyzję i indeksy zadań z niejednoznacznych par"""
+        decision = self.local_engine.deduplicate(subtask_descriptions)
+        ambiguous = sorted({idx for i, j, _ in decision["ambiguous"] for idx in (i, j)})
+        self.local_engine.note_llm_check(bool(ambiguous))
+        
+        if decision["removed"]:
+            self.log(f"Lokalnie wyeliminowano {len(decision['removed'])} duplikatów", Fore.YELLOW)
+        if ambiguous:
+            self.log(f"{len(decision['ambiguous'])} niejednoznacznych par - rozstrzyga LLM "
+                     f"({len(ambiguous)} zadań)", Fore.CYAN)
+        else:
+            self.log(f"Pozostało {len(decision['unique'])} unikalnych zadań (bez wywołania LLM)", Fore.GREEN)
+        return decision, ambiguous
+    
+    def _merge_verdict(self, subtask_descriptions: List[str], decision: Dict[str, Any],
+                       ambiguous: List[int], verdict: List[str]) -> List[str]:
+        """Łączy lokalną decyzję z werdyktem LLM dla niejednoznacznych zadań"""
+        # LLM mógł przeredagować opisy - dopasowujemy je do oryginałów podobieństwem
+        matched = self.local_engine.match(verdict, [subtask_descriptions[idx] for idx in ambiguous])
+        rejected = {idx for pos, idx in enumerate(ambiguous) if pos not in matched} if matched else set()
+        dropped = {drop for drop, _, _ in decision["removed"]} | rejected
+        return [desc for idx, desc in enumerate(subtask_descriptions) if idx not in dropped]
+    
+    def _build_prompts(self, subtask_descriptions: List[str], parent_task: Task) -> Tuple[str, str]:
+        """Buduje prompty detekcji duplikatów"""
         system_prompt = """Jesteś ekspertem w analizie zadań i wykrywaniu duplikatów.
 Twoim zadaniem jest przeanalizować listę podzadań i:
 1. Zidentyfikować zadania, które się pokrywają lub są duplikatami
@@ -389,10 +1346,10 @@ Lista podzadań do analizy:
 {tasks_list}
 
 Przeanalizuj te podzadania i zwróć TYLKO unikalne, niepokrywające się zadania (bez numeracji)."""
-
-        response = self._call_llm(system_prompt, user_prompt)
-        
-        # Parsuj odpowiedź
+        return system_prompt, user_prompt
+    
+    def _finish_deduplication(self, response: str, subtask_descriptions: List[str]) -> List[str]:
+        """Parsuje listę unikalnych zadań"""
         unique_tasks = []
         for line in response.strip().split('\n'):
             line = line.strip()
@@ -418,19 +1375,42 @@ class MasterOrchestrator:
     
     def __init__(self, task_manager: TaskManager, api_key: Optional[str] = None,
                  provider: Optional[str] = None, model: Optional[str] = None,
-                 max_recursion_depth: int = 10, persistence_dir: str = "results"):
+                 max_recursion_depth: int = 10, persistence_dir: str = "results",
+                 max_concurrency: int = 1, llm_cache: Optional[LLMResponseCache] = None,
+                 client_registry: Optional[ClientRegistry] = None,
+                 rate_limiter: Optional[ProviderScheduler] = None,
+                 stream: bool = False, event_bus: Optional[EventBus] = None,
+                 batch_analysis: bool = False, structured_output: bool = False,
+                 fused_decomposition: bool = False,
+                 local_dedup: Optional[LocalDeduplicator] = None,
+                 decomposition_memo: Optional[DecompositionMemo] = None,
+                 checkpointing: bool = False, checkpoint_interval: float = 1.0,
+                 event_log: Optional[TaskEventLog] = None,
+                 persistence: Optional[PersistenceManager] = None,
+                 aggregation_token_budget: int = 0,
+                 context_engine: Optional[ContextEngine] = None,
+                 verification_policy: Optional[VerificationPolicy] = None,
+                 repair_policy: Optional[RepairPolicy] = None):
         self.task_manager = task_manager
         self.max_recursion_depth = max_recursion_depth  # Safety limit przeciw nieskończonej rekursji
         self.provider = provider or os.getenv("AI_PROVIDER", "openai")
         self.model = model or os.getenv("MODEL", "gpt-4o-mini")
-        self.persistence = PersistenceManager(persistence_dir)
-        self.complexity_analyzer = ComplexityAnalyzerAgent(api_key, provider, model)
-        self.coordinator = CoordinatorAgent(api_key, provider, model)
-        self.duplication_detector = DuplicationDetectorAgent(api_key, provider, model)
-        self.verifier = VerificationAgent(api_key, provider, model)
-        self.executors = [ExecutorAgent(i, api_key, provider, model) for i in range(1, 6)]
+        # Magazyn wyników (pliki w results/task_* lub SQLite - patrz results_store.persistence_from_env)
+        self.persistence = persistence or PersistenceManager(persistence_dir)
+        self.client_registry = client_registry or get_client_registry()
+        self.complexity_analyzer = ComplexityAnalyzerAgent(api_key, provider, model, self.client_registry)
+        self.coordinator = CoordinatorAgent(api_key, provider, model, self.client_registry)
+        self.duplication_detector = DuplicationDetectorAgent(api_key, provider, model, self.client_registry)
+        self.verifier = VerificationAgent(api_key, provider, model, self.client_registry)
+        self.aggregator = AggregatorAgent(api_key, provider, model, self.client_registry)
+        self.executors = [ExecutorAgent(i, api_key, provider, model, self.client_registry)
+                          for i in range(1, 6)]
         self.executor_index = 0
-        self.context_store: Dict[str, Any] = {}
+        # Naprawa nieudanych poddrzew przed oznaczeniem rodzica jako FAILED (budżet prób, opcjonalnie inny model)
+        self.repair_policy = repair_policy or RepairPolicy()
+        self.repair_executor = (ExecutorAgent(len(self.executors) + 1, api_key, provider,
+                                              self.repair_policy.model, self.client_registry)
+                                if self.repair_policy.model else None)
         self.decomposition_stats = {
             "total_tasks": 0,
             "decomposed": 0,
@@ -439,62 +1419,312 @@ class MasterOrchestrator:
         }
         self.execution_start_time = time.time()
         
+        # Tryb równoległy: rodzeństwo przetwarzane jednocześnie, globalny limit wywołań LLM
+        self.max_concurrency = max(1, max_concurrency)
+        self._lock = threading.RLock()
+        # Dodatkowe wątki przetwarzania zadań (poza wątkiem wywołującym) - wspólny limit dla
+        # wszystkich poziomów drzewa
+        self._task_slots = threading.BoundedSemaphore(self.max_concurrency)
+        if self.max_concurrency > 1:
+            call_slots = threading.BoundedSemaphore(self.max_concurrency)
+            for agent in self._all_agents():
+                agent.call_slots = call_slots
+        
+        # Cache odpowiedzi LLM - liczniki trafień widoczne w statystykach
+        self.llm_cache = llm_cache
+        if llm_cache is not None:
+            for agent in self._all_agents():
+                agent.llm_cache = llm_cache
+            self.decomposition_stats["llm_cache"] = llm_cache.counters
+        
+        # Harmonogram limitów dostawcy (RPM/TPM, priorytety, backoff)
+        self.rate_limiter = rate_limiter
+        if rate_limiter is not None:
+            for agent in self._all_agents():
+                agent.rate_limiter = rate_limiter
+            self.decomposition_stats["rate_limiter"] = rate_limiter.counters
+        
+        # Zdarzenia postępu dla subskrybentów (np. SSE w web/backend); stream=True
+        # publikuje fragmenty wyników executorów na bieżąco
+        self.stream = stream
+        self.event_bus = event_bus or EventBus()
+        # Początek przetwarzania zadań - czasy (elapsed) w zdarzeniach cyklu życia zadania
+        self._started_at: Dict[str, float] = {}
+        
+        # Analiza wsadowa: nowe rodzeństwo oceniane jednym wywołaniem analizatora
+        self.batch_analysis = batch_analysis
+        if batch_analysis:
+            self.decomposition_stats["batch_analysis"] = self.complexity_analyzer.batch_stats
+        
+        # Odpowiedzi analizatora i weryfikatora w JSON - liczniki nieudanych parsowań
+        self.structured_output = structured_output
+        if structured_output:
+            for agent in (self.complexity_analyzer, self.verifier):
+                agent.structured_output = True
+            self.decomposition_stats["structured_output"] = {
+                self.complexity_analyzer.name: self.complexity_analyzer.parse_stats,
+                self.verifier.name: self.verifier.parse_stats
+            }
+        
+        # Tryb łączony: ocena, dekompozycja i duplikaty w jednym wywołaniu (plan zawsze w JSON);
+        # nieczytelny plan powoduje powrót do pełnego potoku trzech agentów
+        self.fused_decomposition = fused_decomposition
+        if fused_decomposition:
+            self.coordinator.structured_output = True
+            self.decomposition_stats["fused_decomposition"] = self.coordinator.fused_stats
+        
+        # Lokalna detekcja duplikatów (n-gramy + kosinus), LLM tylko dla niejednoznacznych par
+        self.local_dedup = local_dedup
+        if local_dedup is not None:
+            self.duplication_detector.local_engine = local_dedup
+            self.decomposition_stats["local_dedup"] = local_dedup.counters
+        
+        # Pamięć zweryfikowanych dekompozycji między przebiegami (bez wywołań LLM przy trafieniu)
+        self.decomposition_memo = decomposition_memo
+        if decomposition_memo is not None:
+            self.decomposition_stats["decomposition_memo"] = decomposition_memo.counters
+        
+        # Punkty kontrolne drzewa zadań (results/<zadanie>/checkpoint.json) - po przerwaniu
+        # wznowienie wykonuje tylko niezweryfikowane zadania
+        self.checkpoints: Optional[CheckpointWriter] = None
+        if checkpointing:
+            self.checkpoints = CheckpointWriter(self.persistence, task_manager, checkpoint_interval)
+            self.decomposition_stats["checkpoints"] = self.checkpoints.counters
+        
+        # Dziennik zdarzeń zmian stanu zadań (results/<zadanie>/events.jsonl, grupowy fsync)
+        self.event_log = event_log
+        if event_log is not None:
+            self.decomposition_stats["event_log"] = event_log.counters
+        
+        # Wyniki rodziców jako ResultRope (odwołania do wyników podzadań zamiast kopii tekstu);
+        # powyżej budżetu tokenów (0 - bez limitu) wynik rodzica to streszczenie od AggregatorAgent
+        self.aggregation_token_budget = aggregation_token_budget
+        self.decomposition_stats["aggregation"] = {"ropes": 0, "summaries": 0, "chars_not_copied": 0}
+        
+        # Kontekst zadań atomowych: ścieżka rodziców, rodzeństwo i kuzyni wg trafności w budżecie tokenów
+        self.context_engine = context_engine or ContextEngine(task_manager)
+        self.decomposition_stats["context"] = self.context_engine.counters
+        
+        # Które zadania trafiają do weryfikatora (domyślnie wszystkie, z pełnym wynikiem)
+        self.verification_policy = verification_policy or VerificationPolicy()
+        self.decomposition_stats["verification"] = self.verification_policy.counters
+        self.decomposition_stats["repair"] = self.repair_policy.counters
+        
     def log(self, message: str, color=Fore.WHITE):
         """Loguje wiadomość"""
         print(f"{color}[Orchestrator] {message}{Style.RESET_ALL}")
     
+    def _all_agents(self) -> List[BaseAgent]:
+        """Zwraca wszystkich agentów orkiestratora"""
+        agents = [self.complexity_analyzer, self.coordinator, self.duplication_detector,
+                  self.verifier, self.aggregator, *self.executors]
+        if self.repair_executor is not None:
+            agents.append(self.repair_executor)
+        return agents
+    
+    def _bump_stat(self, key: str, amount: int = 1):
+        """Bezpiecznie (wątkowo) zwiększa licznik statystyk"""
+        with self._lock:
+            self.decomposition_stats[key] += amount
+    
     def get_next_executor(self) -> ExecutorAgent:
         """Pobiera następnego dostępnego executora (round-robin)"""
-        executor = self.executors[self.executor_index]
-        self.executor_index = (self.executor_index + 1) % len(self.executors)
+        with self._lock:
+            executor = self.executors[self.executor_index]
+            self.executor_index = (self.executor_index + 1) % len(self.executors)
         return executor
     
+    def _process_subtasks(self, subtasks: List[Task]) -> List[bool]:
+        """Przetwarza rodzeństwo sekwencyjnie lub równolegle (max_concurrency > 1)"""
+        return self._map_tasks(self.process_task_recursive, subtasks)
+    
+    def _map_tasks(self, handler: Callable[[Task], bool], tasks: List[Task]) -> List[bool]:
+        """Wywołuje handler dla zadań sekwencyjnie lub równolegle (max_concurrency > 1)"""
+        if self.max_concurrency <= 1 or len(tasks) <= 1:
+            return [handler(task) for task in tasks]
+        
+        # Nowy wątek tylko przy wolnym slocie, pozostałe zadania wykonuje wątek wywołujący -
+        # liczba wątków nie rośnie z rozgałęzieniem drzewa, a rodzic nigdy nie czeka na
+        # zadanie, które nie ma wątku (brak zakleszczenia przy zagnieżdżeniu poziomów)
+        spawned = 0
+        while spawned < len(tasks) - 1 and self._task_slots.acquire(blocking=False):
+            spawned += 1
+        if not spawned:
+            return [handler(task) for task in tasks]
+        
+        def run_in_slot(task: Task) -> bool:
+            try:
+                return handler(task)
+            finally:
+                self._task_slots.release()
+        
+        with ThreadPoolExecutor(max_workers=spawned, thread_name_prefix="orchestrator") as pool:
+            futures = [pool.submit(run_in_slot, task) for task in tasks[:spawned]]
+            inline = [handler(task) for task in tasks[spawned:]]
+            return [future.result() for future in futures] + inline
+    
     def process_task_recursive(self, task: Task) -> bool:
         """Rekursywnie przetwarza zadanie z inteligentną oceną potrzeby podziału"""
-        self.log(f"\n{'='*80}\nPoziom {task.level}: Przetwarzanie zadania {task.id}", Fore.YELLOW)
-        print(f"Opis: {task.description}\n{'='*80}")
-        
-        self.decomposition_stats["total_tasks"] += 1
-        self.decomposition_stats["max_level_reached"] = max(
-            self.decomposition_stats["max_level_reached"], 
-            task.level
-        )
+        # Wznowienie - zadanie zweryfikowane w poprzednim przebiegu
+        if task.is_verified():
+            return self._skip_verified_task(task)
+        self._begin_task(task)
         
         # Safety limit - ochrona przed nieskończoną rekursją
         if task.level >= self.max_recursion_depth:
             self.log(f"⚠ UWAGA: Osiągnięto limit bezpieczeństwa ({self.max_recursion_depth}) - wymuszam wykonanie", Fore.RED)
-            self.decomposition_stats["executed_directly"] += 1
-            return self._execute_atomic_task(task)
-        
-        # Krok 1: Complexity Analyzer ocenia czy zadanie wymaga podziału
-        complexity_analysis = self.complexity_analyzer.should_decompose(task)
-        
-        # Jeśli zadanie jest wystarczająco proste, wykonaj bezpośrednio
-        if not complexity_analysis["should_split"]:
-            self.decomposition_stats["executed_directly"] += 1
+            self._bump_stat("executed_directly")
             return self._execute_atomic_task(task)
         
-        # Krok 2: Dekompozycja zadania
-        num_subtasks = complexity_analysis["num_subtasks"]
-        subtask_descriptions = self.coordinator.decompose_task(task, num_subtasks, self.task_manager)
+        if task.subtasks:
+            # Wznowienie - podział z poprzedniego przebiegu, bez ponownego planowania
+            self._resume_decomposed_task(task)
+        else:
+            # Kroki 1-3: ocena złożoności, dekompozycja i eliminacja duplikatów
+            planning_started = time.time()
+            subtask_descriptions = self._plan_subtasks(task)
+            self._publish_analyzed(task, subtask_descriptions, planning_started)
+            
+            if not subtask_descriptions:
+                # Zadanie wystarczająco proste (lub brak podzadań) - wykonaj bezpośrednio
+                self._bump_stat("executed_directly")
+                return self._execute_atomic_task(task)
+            
+            # Utwórz podzadania i (opcjonalnie) oceń je jednym wywołaniem
+            self._create_subtasks(task, subtask_descriptions)
+            candidates = self._batch_analysis_candidates(task)
+            if candidates:
+                self._store_prefetched_analyses(
+                    candidates, self.complexity_analyzer.should_decompose_batch(candidates)
+                )
+        
+        # Rekursywnie przetwórz wszystkie podzadania (równolegle jeśli włączone)
+        results = self._process_subtasks(list(task.subtasks))
+        if not all(results) and not self._repair_subtasks(task):
+            return self._fail_task(task, reason="subtasks")
+        
+        # Agreguj wyniki podzadań i zweryfikuj
+        rope = self._aggregate_subtask_results(task)
+        summary = self.aggregator.summarize(task, self.aggregation_token_budget) if self._needs_summary(rope) else None
+        self._complete_parent(task, rope, summary)
+        verification = self._verify(task)
+        return self._apply_verification(task, verification)
+    
+    async def arun(self, task: Task, max_concurrency: Optional[int] = None,
+                   close_clients: bool = True) -> bool:
+        """Asynchroniczny punkt wejścia - przetwarza drzewo zadań na jednej pętli zdarzeń.
+        
+        Na końcu zamyka klientów async tej pętli; `close_clients=False` zostawia ich dla kolejnych
+        przebiegów na długo żyjącej pętli (wtedy zamyka je właściciel pętli przez ClientRegistry.aclose).
+        """
+        limit = max_concurrency or (self.max_concurrency if self.max_concurrency > 1
+                                    else DEFAULT_ASYNC_CONCURRENCY)
+        # Semafor tworzony w bieżącej pętli zdarzeń (współdzielony przez wszystkich agentów)
+        async_call_slots = asyncio.Semaphore(limit)
+        for agent in self._all_agents():
+            agent.async_call_slots = async_call_slots
+        try:
+            return await self.aprocess_task_recursive(task)
+        finally:
+            if close_clients:
+                await self.client_registry.aclose()
+    
+    async def aprocess_task_recursive(self, task: Task) -> bool:
+        """Asynchroniczna wersja process_task_recursive - rodzeństwo przetwarzane współbieżnie"""
+        if task.is_verified():
+            return self._skip_verified_task(task)
+        self._begin_task(task)
         
-        if not subtask_descriptions:
-            # Coordinator nie stworzył podzadań - wykonaj bezpośrednio
-            self.decomposition_stats["executed_directly"] += 1
-            return self._execute_atomic_task(task)
+        if task.level >= self.max_recursion_depth:
+            self.log(f"⚠ UWAGA: Osiągnięto limit bezpieczeństwa ({self.max_recursion_depth}) - wymuszam wykonanie", Fore.RED)
+            self._bump_stat("executed_directly")
+            return await self._aexecute_atomic_task(task)
         
-        # Krok 3: Detekcja i eliminacja duplikatów
-        subtask_descriptions = self.duplication_detector.detect_and_eliminate_duplicates(
-            subtask_descriptions, task
+        if task.subtasks:
+            self._resume_decomposed_task(task)
+        else:
+            planning_started = time.time()
+            subtask_descriptions = await self._aplan_subtasks(task)
+            self._publish_analyzed(task, subtask_descriptions, planning_started)
+            
+            if not subtask_descriptions:
+                self._bump_stat("executed_directly")
+                return await self._aexecute_atomic_task(task)
+            
+            self._create_subtasks(task, subtask_descriptions)
+            candidates = self._batch_analysis_candidates(task)
+            if candidates:
+                self._store_prefetched_analyses(
+                    candidates, await self.complexity_analyzer.ashould_decompose_batch(candidates)
+                )
+        
+        results = await asyncio.gather(
+            *(self.aprocess_task_recursive(subtask) for subtask in list(task.subtasks))
         )
+        if not all(results) and not await self._arepair_subtasks(task):
+            return self._fail_task(task, reason="subtasks")
+        
+        rope = self._aggregate_subtask_results(task)
+        summary = (await self.aggregator.asummarize(task, self.aggregation_token_budget)
+                   if self._needs_summary(rope) else None)
+        self._complete_parent(task, rope, summary)
+        verification = await self._averify(task)
+        return self._apply_verification(task, verification)
+    
+    def _begin_task(self, task: Task):
+        """Loguje rozpoczęcie przetwarzania i aktualizuje statystyki"""
+        self.log(f"\n{'='*80}\nPoziom {task.level}: Przetwarzanie zadania {task.id}", Fore.YELLOW)
+        print(f"Opis: {task.description}\n{'='*80}")
         
-        if not subtask_descriptions:
-            # Po eliminacji duplikatów nie zostało nic - wykonaj zadanie bezpośrednio
-            self.decomposition_stats["executed_directly"] += 1
-            return self._execute_atomic_task(task)
-        
-        # Utwórz podzadania
-        self.decomposition_stats["decomposed"] += 1
+        with self._lock:
+            self.decomposition_stats["total_tasks"] += 1
+            self.decomposition_stats["max_level_reached"] = max(
+                self.decomposition_stats["max_level_reached"], 
+                task.level
+            )
+        self._started_at[task.id] = time.time()
+        self.event_bus.publish("task_started", task.id, level=task.level,
+                               parent_id=task.parent_id, description=task.description)
+    
+    def _elapsed(self, task: Task) -> float:
+        """Sekundy od rozpoczęcia przetwarzania zadania (0 dla zadań spoza bieżącego przebiegu)"""
+        started = self._started_at.get(task.id)
+        return round(time.time() - started, 3) if started is not None else 0.0
+    
+    def _publish_analyzed(self, task: Task, subtask_descriptions: List[str], planning_started: float):
+        """Publikuje decyzję planowania (podział lub wykonanie bezpośrednie) z czasem planowania"""
+        self.event_bus.publish("task_analyzed", task.id, decomposed=bool(subtask_descriptions),
+                               subtasks=len(subtask_descriptions),
+                               duration=round(time.time() - planning_started, 3))
+    
+    def _skip_verified_task(self, task: Task) -> bool:
+        """Pomija zadanie zweryfikowane w poprzednim przebiegu (wznowienie z punktu kontrolnego)"""
+        self.log(f"↷ Zadanie {task.id} zweryfikowane wcześniej - pomijam", Fore.GREEN)
+        self._bump_resume_stat("verified_skipped")
+        self.event_bus.publish("task_verified", task.id, level=task.level, parent_id=task.parent_id,
+                               description=task.description, resumed=True,
+                               score=(task.verification_result or {}).get("score"), elapsed=0.0)
+        return True
+    
+    def _resume_decomposed_task(self, task: Task):
+        """Wznawia zadanie podzielone w poprzednim przebiegu - przetwarzane są tylko niezweryfikowane podzadania"""
+        pending = len([subtask for subtask in task.subtasks if not subtask.is_verified()])
+        self.log(f"↻ Wznawiam podział zadania {task.id}: {pending}/{len(task.subtasks)} podzadań do wykonania", Fore.CYAN)
+        self._bump_stat("decomposed")
+        self._bump_resume_stat("decompositions_reused")
+        self.task_manager.update_task_status(task.id, TaskStatus.DECOMPOSED)
+    
+    def _bump_resume_stat(self, key: str):
+        """Zwiększa licznik wznowienia (sekcja "resume" pojawia się w statystykach przy pierwszym użyciu)"""
+        with self._lock:
+            resume = self.decomposition_stats.setdefault(
+                "resume", {"verified_skipped": 0, "decompositions_reused": 0, "results_reused": 0}
+            )
+            resume[key] += 1
+    
+    def _create_subtasks(self, task: Task, subtask_descriptions: List[str]):
+        """Oznacza zadanie jako podzielone i tworzy podzadania"""
+        self._bump_stat("decomposed")
         self.task_manager.update_task_status(task.id, TaskStatus.DECOMPOSED)
         
         for idx, subtask_desc in enumerate(subtask_descriptions, 1):
@@ -504,31 +1734,257 @@ class MasterOrchestrator:
                 level=task.level + 1,
                 parent_id=task.id
             )
+            self.event_bus.publish("task_created", subtask.id, parent_id=task.id, level=subtask.level,
+                                   description=subtask.description)
             self.log(f"Utworzono podzadanie {idx}/{len(subtask_descriptions)}: {subtask.id}", Fore.CYAN)
+    
+    def _plan_subtasks(self, task: Task) -> List[str]:
+        """Ocenia, dekomponuje i usuwa duplikaty - pusta lista oznacza wykonanie bezpośrednie"""
+        # Ocena mogła zostać wykonana wsadowo razem z rodzeństwem
+        complexity_analysis = self._take_prefetched_analysis(task)
+        if complexity_analysis is not None and not complexity_analysis["should_split"]:
+            return []
         
-        # Rekursywnie przetwórz wszystkie podzadania
-        all_success = True
-        for subtask in task.subtasks:
-            success = self.process_task_recursive(subtask)
-            if success:
-                # Zapisz wynik do kontekstu
-                self.context_store[subtask.id] = subtask.result
-            all_success = all_success and success
-        
-        if all_success:
-            # Agreguj wyniki podzadań
-            task.result = self._aggregate_subtask_results(task)
-            self.task_manager.update_task_status(task.id, TaskStatus.COMPLETED)
-            
-            # Weryfikacja
-            verification = self.verifier.verify_task(task)
-            self.task_manager.update_verification(task.id, verification)
-            
-            if verification["passed"]:
-                self.task_manager.update_task_status(task.id, TaskStatus.VERIFIED)
-                return True
+        # Tryb łączony - jedno wywołanie zamiast trzech
+        if self.fused_decomposition:
+            # Bez oceny złożoności pamięć dekompozycji przyjmuje tylko dokładne dopasowanie -
+            # podobne opisy podzadań mogłyby zapętlić dekompozycję
+            reused = self._reuse_decomposition(task, allow_similar=complexity_analysis is not None)
+            if reused:
+                return reused
+            plan = self.coordinator.plan_task(task, self.task_manager)
+            if plan is not None:
+                return plan["subtasks"]
         
+        # Krok 1: Complexity Analyzer ocenia czy zadanie wymaga podziału
+        if complexity_analysis is None:
+            complexity_analysis = self.complexity_analyzer.should_decompose(task)
+        if not complexity_analysis["should_split"]:
+            return []
+        
+        # Zweryfikowana wcześniej dekompozycja tego samego (lub bardzo podobnego) zadania
+        if not self.fused_decomposition:
+            reused = self._reuse_decomposition(task)
+            if reused:
+                return reused
+        
+        # Krok 2: Dekompozycja zadania
+        num_subtasks = complexity_analysis["num_subtasks"]
+        subtask_descriptions = self.coordinator.decompose_task(task, num_subtasks, self.task_manager)
+        if not subtask_descriptions:
+            return []
+        
+        # Krok 3: Detekcja i eliminacja duplikatów
+        return self.duplication_detector.detect_and_eliminate_duplicates(subtask_descriptions, task)
+    
+    async def _aplan_subtasks(self, task: Task) -> List[str]:
+        """Asynchroniczna wersja _plan_subtasks"""
+        complexity_analysis = self._take_prefetched_analysis(task)
+        if complexity_analysis is not None and not complexity_analysis["should_split"]:
+            return []
+        
+        if self.fused_decomposition:
+            reused = self._reuse_decomposition(task, allow_similar=complexity_analysis is not None)
+            if reused:
+                return reused
+            plan = await self.coordinator.aplan_task(task, self.task_manager)
+            if plan is not None:
+                return plan["subtasks"]
+        
+        if complexity_analysis is None:
+            complexity_analysis = await self.complexity_analyzer.ashould_decompose(task)
+        if not complexity_analysis["should_split"]:
+            return []
+        
+        if not self.fused_decomposition:
+            reused = self._reuse_decomposition(task)
+            if reused:
+                return reused
+        
+        num_subtasks = complexity_analysis["num_subtasks"]
+        subtask_descriptions = await self.coordinator.adecompose_task(
+            task, num_subtasks, self.task_manager
+        )
+        if not subtask_descriptions:
+            return []
+        
+        return await self.duplication_detector.adetect_and_eliminate_duplicates(
+            subtask_descriptions, task
+        )
+    
+    def _reuse_decomposition(self, task: Task, allow_similar: bool = True) -> List[str]:
+        """Zwraca zapamiętaną dekompozycję zadania (pusta lista przy braku trafienia)"""
+        if self.decomposition_memo is None:
+            return []
+        subtasks = self.decomposition_memo.lookup(task.description, allow_similar)
+        if not subtasks:
+            return []
+        self.log(f"♻ Używam zapamiętanej dekompozycji ({len(subtasks)} podzadań) - bez wywołań LLM", Fore.GREEN)
+        return subtasks
+    
+    def _remember_decomposition(self, task: Task):
+        """Zapisuje zweryfikowaną dekompozycję do pamięci między przebiegami"""
+        if self.decomposition_memo is not None and task.subtasks:
+            self.decomposition_memo.store(task.description, [subtask.description for subtask in task.subtasks])
+    
+    def _batch_analysis_candidates(self, task: Task) -> List[Task]:
+        """Zwraca podzadania do wsadowej oceny (puste gdy tryb wyłączony lub nic do zyskania)"""
+        if not self.batch_analysis or len(task.subtasks) < 2:
+            return []
+        # Podzadania na limicie rekursji i tak zostaną wykonane bez analizy
+        if task.level + 1 >= self.max_recursion_depth:
+            return []
+        return list(task.subtasks)
+    
+    def _store_prefetched_analyses(self, subtasks: List[Task], analyses: List[Dict[str, Any]]):
+        """Zapamiętuje wyniki wsadowej oceny w metadanych podzadań"""
+        for subtask, analysis in zip(subtasks, analyses):
+            subtask.metadata["complexity_analysis"] = analysis
+    
+    def _take_prefetched_analysis(self, task: Task) -> Optional[Dict[str, Any]]:
+        """Pobiera (jednorazowo) ocenę złożoności wykonaną wsadowo"""
+        if not task.has_metadata:
+            return None
+        return task.metadata.pop("complexity_analysis", None)
+    
+    def _plan_repair(self, task: Task) -> Tuple[List[Task], List[Task]]:
+        """Nieudane liście objęte budżetem napraw i rodzice do ponownej agregacji"""
+        if not self.repair_policy.enabled:
+            return [], []
+        leaves, parents = failed_subtree(task)
+        self.log(f"🔧 Naprawa zadania {task.id}: {len(leaves)} nieudanych liści, "
+                 f"{len(parents)} rodziców do ponownej agregacji", Fore.YELLOW)
+        return [leaf for leaf in leaves if self.repair_policy.acquire(leaf)], parents
+    
+    def _finish_repair(self, task: Task) -> bool:
+        """Sprawdza czy po naprawie wszystkie podzadania są zweryfikowane"""
+        recovered = all(subtask.is_verified() for subtask in task.subtasks)
+        if recovered:
+            self.repair_policy.record("subtrees_recovered")
+            self.log(f"✓ Naprawa zadania {task.id} zakończona - agreguję wyniki", Fore.GREEN)
+        return recovered
+    
+    def _prepare_repair(self, leaf: Task) -> Tuple[Dict[str, Any], ExecutorAgent]:
+        """Kontekst i executor ponownego wykonania liścia (uwagi weryfikatora, model naprawczy)"""
+        repair_context = self.repair_policy.repair_context(leaf)
+        context, executor = self._prepare_atomic_task(leaf)
+        context.update(repair_context)
+        self.log(f"🔧 Ponowne wykonanie zadania {leaf.id}", Fore.YELLOW)
+        return context, self.repair_executor or executor
+    
+    def _repair_leaf(self, leaf: Task) -> bool:
+        """Ponownie wykonuje nieudany liść i weryfikuje go w pełni (z pominięciem polityki próbkowania)"""
+        context, executor = self._prepare_repair(leaf)
+        result = executor.execute_task(leaf, context, on_token=self._token_publisher(leaf))
+        self._store_atomic_result(leaf, result)
+        passed = self._apply_verification(leaf, self.verifier.verify_task(leaf))
+        self.repair_policy.record("leaves_repaired" if passed else "leaves_failed")
+        return passed
+    
+    async def _arepair_leaf(self, leaf: Task) -> bool:
+        """Asynchroniczna wersja _repair_leaf"""
+        context, executor = self._prepare_repair(leaf)
+        result = await executor.aexecute_task(leaf, context, on_token=self._token_publisher(leaf))
+        self._store_atomic_result(leaf, result)
+        passed = self._apply_verification(leaf, await self.verifier.averify_task(leaf))
+        self.repair_policy.record("leaves_repaired" if passed else "leaves_failed")
+        return passed
+    
+    def _can_reaggregate(self, parent: Task) -> bool:
+        """Czy rodzic ma komplet zweryfikowanych podzadań i mieści się w budżecie napraw"""
+        if not all(subtask.is_verified() for subtask in parent.subtasks):
+            return False
+        if not self.repair_policy.acquire(parent):
+            return False
+        self.repair_policy.record("parents_reaggregated")
+        return True
+    
+    def _repair_subtasks(self, task: Task) -> bool:
+        """Naprawia nieudane poddrzewa podzadań; zwraca czy wszystkie podzadania są teraz zweryfikowane"""
+        leaves, parents = self._plan_repair(task)
+        if not leaves and not parents:
+            return False
+        self._map_tasks(self._repair_leaf, leaves)
+        for parent in parents:
+            if not self._can_reaggregate(parent):
+                continue
+            rope = self._aggregate_subtask_results(parent)
+            summary = (self.aggregator.summarize(parent, self.aggregation_token_budget)
+                       if self._needs_summary(rope) else None)
+            self._complete_parent(parent, rope, summary)
+            if self._apply_verification(parent, self._verify(parent)):
+                self.repair_policy.record("parents_recovered")
+        return self._finish_repair(task)
+    
+    async def _arepair_subtasks(self, task: Task) -> bool:
+        """Asynchroniczna wersja _repair_subtasks - liście naprawiane współbieżnie"""
+        leaves, parents = self._plan_repair(task)
+        if not leaves and not parents:
+            return False
+        await asyncio.gather(*(self._arepair_leaf(leaf) for leaf in leaves))
+        for parent in parents:
+            if not self._can_reaggregate(parent):
+                continue
+            rope = self._aggregate_subtask_results(parent)
+            summary = (await self.aggregator.asummarize(parent, self.aggregation_token_budget)
+                       if self._needs_summary(rope) else None)
+            self._complete_parent(parent, rope, summary)
+            if self._apply_verification(parent, await self._averify(parent)):
+                self.repair_policy.record("parents_recovered")
+        return self._finish_repair(task)
+    
+    def _needs_summary(self, rope: ResultRope) -> bool:
+        """Czy łączny tekst wyników podzadań przekracza budżet tokenów agregacji"""
+        # ~4 znaki na token, jak estimate_tokens - bez składania tekstu
+        return 0 < self.aggregation_token_budget < rope.length // 4
+    
+    def _complete_parent(self, task: Task, rope: ResultRope, summary: Optional[str] = None):
+        """Zapisuje wynik zadania nadrzędnego - rope z wyników podzadań albo ich streszczenie"""
+        with self._lock:
+            stats = self.decomposition_stats["aggregation"]
+            stats["ropes"] += 1
+            stats["chars_not_copied"] += rope.length
+            if summary is not None:
+                stats["summaries"] += 1
+        self.task_manager.update_task_result(task.id, summary if summary is not None else rope)
+        self.task_manager.update_task_status(task.id, TaskStatus.COMPLETED)
+    
+    def _verify(self, task: Task) -> Dict[str, Any]:
+        """Weryfikuje zadanie zgodnie z polityką weryfikacji (pominięcie bez wywołania LLM)"""
+        decision = self.verification_policy.decide(task)
+        if decision == SKIP:
+            return self.verification_policy.skipped_verification(task)
+        child_summaries = self.verification_policy.child_summaries(task) if decision == SUMMARY else None
+        return self.verifier.verify_task(task, child_summaries)
+    
+    async def _averify(self, task: Task) -> Dict[str, Any]:
+        """Asynchroniczna wersja _verify"""
+        decision = self.verification_policy.decide(task)
+        if decision == SKIP:
+            return self.verification_policy.skipped_verification(task)
+        child_summaries = self.verification_policy.child_summaries(task) if decision == SUMMARY else None
+        return await self.verifier.averify_task(task, child_summaries)
+    
+    def _apply_verification(self, task: Task, verification: Dict[str, Any]) -> bool:
+        """Zapisuje wynik weryfikacji i ustawia końcowy status zadania"""
+        self.task_manager.update_verification(task.id, verification)
+        
+        if verification["passed"]:
+            self.task_manager.update_task_status(task.id, TaskStatus.VERIFIED)
+            self._remember_decomposition(task)
+            self.event_bus.publish("task_verified", task.id, score=verification.get("score"),
+                                   skipped=verification.get("skipped", False), elapsed=self._elapsed(task),
+                                   preview=task.result_preview(200))
+            return True
+        return self._fail_task(task, verification)
+    
+    def _fail_task(self, task: Task, verification: Optional[Dict[str, Any]] = None,
+                   reason: str = "verification") -> bool:
+        """Oznacza zadanie jako nieudane (reason: "verification" lub "subtasks")"""
         self.task_manager.update_task_status(task.id, TaskStatus.FAILED)
+        self.event_bus.publish("task_failed", task.id, reason=reason,
+                               score=(verification or {}).get("score"),
+                               issues=(verification or {}).get("issues", []), elapsed=self._elapsed(task))
         return False
     
     def print_statistics(self):
@@ -541,7 +1997,69 @@ class MasterOrchestrator:
         print(f"Podzielonych na podzadania: {stats['decomposed']}")
         print(f"Wykonanych bezpośrednio: {stats['executed_directly']}")
         print(f"Maksymalny poziom zagnieżdżenia: {stats['max_level_reached']}")
-        print(f"Średnia złożoność: {stats['decomposed'] / max(stats['total_tasks'], 1):.2%} zadań wymagało podziału{Style.RESET_ALL}\n")
+        print(f"Średnia złożoność: {stats['decomposed'] / max(stats['total_tasks'], 1):.2%} zadań wymagało podziału{Style.RESET_ALL}")
+        if "llm_cache" in stats:
+            cache = stats["llm_cache"]
+            lookups = cache["hits"] + cache["misses"]
+            print(f"{Fore.WHITE}Cache LLM: {cache['hits']} trafień / {cache['misses']} chybień "
+                  f"({cache['hits'] / max(lookups, 1):.2%} skuteczności){Style.RESET_ALL}")
+        if "batch_analysis" in stats:
+            batch = stats["batch_analysis"]
+            print(f"{Fore.WHITE}Analiza wsadowa: {batch['batched_tasks']} zadań ocenionych "
+                  f"w {batch['batches']} wywołaniach ({batch['fallbacks']} ocenionych osobno){Style.RESET_ALL}")
+        if "structured_output" in stats:
+            for agent_name, parsing in stats["structured_output"].items():
+                print(f"{Fore.WHITE}JSON {agent_name}: {parsing['structured']} poprawnych / "
+                      f"{parsing['parse_failures']} nieudanych parsowań (parser tekstowy){Style.RESET_ALL}")
+        if "fused_decomposition" in stats:
+            fused = stats["fused_decomposition"]
+            print(f"{Fore.WHITE}Tryb łączony: {fused['plans']} planów w jednym wywołaniu, "
+                  f"{fused['fallbacks']} powrotów do pełnego potoku{Style.RESET_ALL}")
+        if "local_dedup" in stats:
+            dedup = stats["local_dedup"]
+            print(f"{Fore.WHITE}Lokalne duplikaty: {dedup['duplicates']} usuniętych, "
+                  f"{dedup['llm_calls_saved']}/{dedup['lists']} list bez wywołania LLM{Style.RESET_ALL}")
+        if "decomposition_memo" in stats:
+            memo = stats["decomposition_memo"]
+            print(f"{Fore.WHITE}Pamięć dekompozycji: {memo['hits']} trafień "
+                  f"({memo['exact_hits']} dokładnych, {memo['similar_hits']} podobnych) / {memo['misses']} chybień "
+                  f"({memo['reuse_rate']:.2%} ponownego użycia){Style.RESET_ALL}")
+        if "checkpoints" in stats:
+            checkpoints = stats["checkpoints"]
+            print(f"{Fore.WHITE}Punkty kontrolne: {checkpoints['writes']} zapisów, "
+                  f"{checkpoints['skipped']} odroczonych, {checkpoints['failures']} błędów{Style.RESET_ALL}")
+        if "event_log" in stats:
+            event_log = stats["event_log"]
+            print(f"{Fore.WHITE}Dziennik zdarzeń: {event_log['events']} zdarzeń, {event_log['fsyncs']} fsync, "
+                  f"{event_log['compactions']} kompaktowań{Style.RESET_ALL}")
+        aggregation = stats["aggregation"]
+        if aggregation["ropes"]:
+            print(f"{Fore.WHITE}Agregacja: {aggregation['ropes']} wyników rodziców bez kopiowania "
+                  f"({aggregation['chars_not_copied']} znaków), {aggregation['summaries']} streszczeń{Style.RESET_ALL}")
+        verification = stats["verification"]
+        if verification["calls_saved"] or verification["summary_checks"]:
+            print(f"{Fore.WHITE}Weryfikacja: {verification['calls']} wywołań, {verification['calls_saved']} "
+                  f"zaoszczędzonych (próbkowanie liści: {verification['sampled_out']}, tylko liście: "
+                  f"{verification['parents_not_verified']}, zaliczone podzadania: "
+                  f"{verification['parents_skipped_passed']}), {verification['summary_checks']} rodziców "
+                  f"na streszczeniach ({verification['summary_chars_saved']} znaków mniej){Style.RESET_ALL}")
+        repair = stats["repair"]
+        if repair["attempts"]:
+            print(f"{Fore.WHITE}Naprawy: {repair['attempts']} prób, {repair['leaves_repaired']} liści naprawionych, "
+                  f"{repair['leaves_failed']} nieudanych, {repair['parents_recovered']}/{repair['parents_reaggregated']} "
+                  f"rodziców po ponownej agregacji, {repair['subtrees_recovered']} poddrzew uratowanych{Style.RESET_ALL}")
+        context = stats["context"]
+        if context["calls"]:
+            print(f"{Fore.WHITE}Kontekst: {context['calls']} wywołań, {context['included']} elementów "
+                  f"({context['candidates']} kandydatów wyników), {context['tokens']} tokenów "
+                  f"({context['truncated']} przyciętych, "
+                  f"{'tiktoken' if context['exact_tokenizer'] else '~4 znaki/token'}){Style.RESET_ALL}")
+        if "resume" in stats:
+            resume = stats["resume"]
+            print(f"{Fore.WHITE}Wznowienie: {resume['verified_skipped']} zweryfikowanych zadań pominiętych, "
+                  f"{resume['decompositions_reused']} podziałów i {resume['results_reused']} wyników "
+                  f"użytych ponownie{Style.RESET_ALL}")
+        print()
     
     def save_results(self, task: Task):
         """Zapisuje wszystkie rezultaty do plików"""
@@ -551,6 +2069,12 @@ class MasterOrchestrator:
         self.log(f"Zapisuję rezultaty do plików...", Fore.CYAN)
         self.log(f"{'='*80}\n", Fore.WHITE)
         
+        # Końcowy stan drzewa w punkcie kontrolnym
+        if self.checkpoints is not None:
+            self.checkpoints.flush()
+        if self.event_log is not None:
+            self.event_log.sync()
+        
         # Zapisz czysty output
         if task.result:
             output_path = self.persistence.save_task_output(task.id, task.result)
@@ -584,6 +2108,10 @@ class MasterOrchestrator:
         )
         self.log(f"✓ Podsumowanie: {summary_path}", Fore.GREEN)
         
+        # Niewykorzystane numery zadań wracają do wspólnej sekwencji ID
+        if self.task_manager.persistence_manager is not None:
+            self.task_manager.persistence_manager.release_task_numbers()
+        
         # Wyświetl podsumowanie persistencji
         self.persistence.print_summary()
     
@@ -593,55 +2121,67 @@ class MasterOrchestrator:
     
     def _execute_atomic_task(self, task: Task) -> bool:
         """Wykonuje zadanie atomowe"""
-        self.task_manager.update_task_status(task.id, TaskStatus.IN_PROGRESS)
-        
-        # Zbierz kontekst z zadań na tym samym poziomie
-        context = self._gather_context(task)
-        
-        # Przydziel executora
-        executor = self.get_next_executor()
+        if self._has_unverified_result(task):
+            # Wznowienie - wynik z poprzedniego przebiegu czeka tylko na weryfikację
+            return self._apply_verification(task, self._verify(task))
+        context, executor = self._prepare_atomic_task(task)
         
         # Wykonaj zadanie
-        result = executor.execute_task(task, context)
-        self.task_manager.update_task_result(task.id, result)
-        self.task_manager.update_task_status(task.id, TaskStatus.COMPLETED)
+        result = executor.execute_task(task, context, on_token=self._token_publisher(task))
+        self._store_atomic_result(task, result)
         
         # Weryfikacja
-        verification = self.verifier.verify_task(task)
-        self.task_manager.update_verification(task.id, verification)
+        verification = self._verify(task)
+        return self._apply_verification(task, verification)
+    
+    async def _aexecute_atomic_task(self, task: Task) -> bool:
+        """Asynchroniczna wersja _execute_atomic_task"""
+        if self._has_unverified_result(task):
+            return self._apply_verification(task, await self._averify(task))
+        context, executor = self._prepare_atomic_task(task)
         
-        if verification["passed"]:
-            self.task_manager.update_task_status(task.id, TaskStatus.VERIFIED)
-            return True
-        else:
-            self.task_manager.update_task_status(task.id, TaskStatus.FAILED)
+        result = await executor.aexecute_task(task, context, on_token=self._token_publisher(task))
+        self._store_atomic_result(task, result)
+        
+        verification = await self._averify(task)
+        return self._apply_verification(task, verification)
+    
+    def _has_unverified_result(self, task: Task) -> bool:
+        """Sprawdza czy zadanie ma wynik z poprzedniego przebiegu, który nie został jeszcze zweryfikowany"""
+        if task.status != TaskStatus.COMPLETED or not task.has_result:
             return False
+        self._bump_resume_stat("results_reused")
+        return True
     
-    def _aggregate_subtask_results(self, task: Task) -> str:
-        """Agreguje wyniki podzadań"""
-        results = []
-        for subtask in task.subtasks:
-            if subtask.result:
-                results.append(f"[{subtask.id}] {subtask.result}")
+    def _prepare_atomic_task(self, task: Task) -> Tuple[Dict[str, Any], ExecutorAgent]:
+        """Oznacza zadanie jako w toku, zbiera kontekst i przydziela executora"""
+        self.task_manager.update_task_status(task.id, TaskStatus.IN_PROGRESS)
         
-        aggregated = f"Zadanie '{task.description}' zostało ukończone poprzez wykonanie {len(task.subtasks)} podzadań:\n\n"
-        aggregated += "\n\n".join(results)
+        # Zbierz kontekst z wcześniejszych wyników w budżecie tokenów
+        context = self._gather_context(task)
         
-        return aggregated
+        # Przydziel executora
+        executor = self.get_next_executor()
+        self.event_bus.publish("task_executing", task.id, executor=executor.name, elapsed=self._elapsed(task))
+        return context, executor
+    
+    def _token_publisher(self, task: Task) -> Optional[Callable[[str], None]]:
+        """Zwraca callback publikujący fragmenty wyniku (None gdy strumieniowanie wyłączone)"""
+        if not self.stream:
+            return None
+        return lambda delta: self.event_bus.publish("token", task.id, delta=delta)
+    
+    def _store_atomic_result(self, task: Task, result: str):
+        """Zapisuje wynik zadania atomowego"""
+        self.task_manager.update_task_result(task.id, result)
+        self.task_manager.update_task_status(task.id, TaskStatus.COMPLETED)
+        self.event_bus.publish("task_executed", task.id, length=len(result), elapsed=self._elapsed(task))
+    
+    def _aggregate_subtask_results(self, task: Task) -> ResultRope:
+        """Agreguje wyniki podzadań - odwołania do ich wyników, tekst składany dopiero przy odczycie"""
+        header = f"Zadanie '{task.description}' zostało ukończone poprzez wykonanie {len(task.subtasks)} podzadań:\n\n"
+        return build_parent_rope(header, task.subtasks)
     
     def _gather_context(self, task: Task) -> Dict[str, Any]:
-        """Zbiera kontekst z poprzednich zadań"""
-        context = {}
-        
-        # Dodaj kontekst z zadania rodzica
-        if task.parent_id:
-            parent = self.task_manager.get_task(task.parent_id)
-            if parent:
-                context["parent_task"] = parent.description
-                
-                # Dodaj wyniki innych podzadań tego samego rodzica
-                for sibling in parent.subtasks:
-                    if sibling.id != task.id and sibling.result:
-                        context[f"sibling_{sibling.id}"] = sibling.result[:200]
-        
-        return context
+        """Zbiera kontekst z poprzednich zadań (wybór i przycięcie - ContextEngine)"""
+        return self.context_engine.build(task)
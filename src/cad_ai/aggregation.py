@@ -0,0 +1,127 @@
+"""
+Moduł agregacji wyników - wynik zadania nadrzędnego jako lista segmentów (rope) odwołujących się
+do wyników podzadań zamiast kopii ich tekstu; pełny tekst składany leniwie przy odczycie
+"""
+from typing import Any, Callable, Dict, List, Optional, Union
+
+# Rozwiązuje id podzadania na zadanie (TaskManager.get_task)
+Resolver = Callable[[str], Any]
+
+# Separator wyników podzadań w zagregowanym tekście
+SEGMENT_SEPARATOR = "\n\n"
+
+
+class TaskRef:
+    """Segment odwołujący się do wyniku podzadania (w tekście: "[id] wynik")"""
+    __slots__ = ("task_id",)
+
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+
+    def __repr__(self) -> str:
+        return f"TaskRef({self.task_id!r})"
+
+
+class ResultRope:
+    """Wynik zadania nadrzędnego: tekst nagłówka i odwołania do podzadań.
+
+    Wyniki przechowywane są raz (w liściach), a tekst rodzica powstaje dopiero przy odczycie
+    jednym złączeniem całego poddrzewa - bez kopii O(głębokość × wynik) na kolejnych poziomach.
+    Długość liczona jest przy budowie z długości segmentów (bez składania tekstu).
+    """
+    __slots__ = ("segments", "length")
+
+    def __init__(self, segments: List[Union[str, TaskRef]], length: int = 0):
+        self.segments = segments
+        self.length = length
+
+    def __bool__(self) -> bool:
+        return bool(self.segments)
+
+    def _collect(self, resolve: Resolver, parts: List[str], limit: Optional[int] = None) -> int:
+        """Dopisuje fragmenty tekstu do `parts` (najwyżej `limit` znaków), zwraca liczbę znaków"""
+        written = 0
+        for segment in self.segments:
+            if limit is not None and written >= limit:
+                break
+            remaining = None if limit is None else limit - written
+            if isinstance(segment, str):
+                piece = segment if remaining is None else segment[:remaining]
+                parts.append(piece)
+                written += len(piece)
+                continue
+            task = resolve(segment.task_id)
+            if task is None:
+                continue
+            prefix = f"[{segment.task_id}] "
+            parts.append(prefix if remaining is None else prefix[:remaining])
+            written += len(parts[-1])
+            if remaining is not None:
+                remaining -= len(parts[-1])
+                if remaining <= 0:
+                    break
+            stored = task.stored_result
+            if isinstance(stored, ResultRope):
+                # Rodzic w poddrzewie - schodzimy do jego segmentów zamiast składać jego tekst osobno
+                written += stored._collect(resolve, parts, remaining)
+            elif stored:
+                piece = stored if remaining is None else stored[:remaining]
+                parts.append(piece)
+                written += len(piece)
+        return written
+
+    def materialize(self, resolve: Resolver) -> str:
+        """Pełny tekst wyniku (składany przy każdym wywołaniu, nie jest przechowywany)"""
+        parts: List[str] = []
+        self._collect(resolve, parts)
+        return "".join(parts)
+
+    def prefix(self, resolve: Resolver, limit: int) -> str:
+        """Początek tekstu wyniku (np. podgląd w raporcie) bez składania całości"""
+        parts: List[str] = []
+        self._collect(resolve, parts, limit)
+        return "".join(parts)
+
+    def to_record(self) -> List[Any]:
+        """Zapis segmentów do punktu kontrolnego lub dziennika zdarzeń"""
+        return [segment if isinstance(segment, str) else {"ref": segment.task_id}
+                for segment in self.segments]
+
+    @classmethod
+    def from_record(cls, record: List[Any], length: int = 0) -> "ResultRope":
+        """Odtwarza rope z to_record"""
+        return cls([segment if isinstance(segment, str) else TaskRef(segment["ref"])
+                    for segment in record], length)
+
+
+def build_parent_rope(header: str, subtasks: List[Any]) -> ResultRope:
+    """Rope wyniku rodzica: nagłówek i wyniki podzadań rozdzielone SEGMENT_SEPARATOR"""
+    segments: List[Union[str, TaskRef]] = [header]
+    length = len(header)
+    first = True
+    for subtask in subtasks:
+        if not subtask.has_result:
+            continue
+        if not first:
+            segments.append(SEGMENT_SEPARATOR)
+            length += len(SEGMENT_SEPARATOR)
+        first = False
+        segments.append(TaskRef(subtask.id))
+        length += len(subtask.id) + 3 + subtask.result_length
+    return ResultRope(segments, length)
+
+
+def result_to_record(task: Any) -> Dict[str, Any]:
+    """Pola wyniku zadania do zapisu: tekst albo segmenty rope (bez składania tekstu)"""
+    stored = task.stored_result
+    if isinstance(stored, ResultRope):
+        return {"result": None, "result_parts": stored.to_record(), "result_length": stored.length}
+    return {"result": stored}
+
+
+def result_from_record(data: Dict[str, Any]) -> Union[str, ResultRope, None]:
+    """Odtwarza wynik zadania z result_to_record (także z zapisów sprzed rope - sam tekst)"""
+    if data.get("result_parts") is not None:
+        return ResultRope.from_record(data["result_parts"], data.get("result_length") or 0)
+    return data.get("result")
+
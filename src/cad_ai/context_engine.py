@@ -0,0 +1,183 @@
+"""
+Moduł kontekstu wykonania - wybór najistotniejszych wcześniejszych wyników (ścieżka rodziców,
+ukończone rodzeństwo, wcześniejsi kuzyni) wg lokalnej oceny trafności w budżecie tokenów
+"""
+import importlib.util
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .dedup import ngram_vectors
+from .task_manager import Task, TaskManager
+
+# Waga bliskości w drzewie - mnożnik trafności kandydata
+SIBLING_WEIGHT = 1.0
+COUSIN_WEIGHT = 0.6
+
+# Ile znaków wyniku kandydata bierze udział w ocenie trafności
+_SCORING_PREVIEW = 400
+# Górna granica znaków na token przy pobieraniu początku wyniku (bez składania całego rope)
+_CHARS_PER_TOKEN_BOUND = 8
+
+
+class TokenCounter:
+    """Licznik tokenów - tiktoken (jeśli zainstalowany) albo przybliżenie ~4 znaki na token"""
+
+    def __init__(self, model: Optional[str] = None):
+        self.encoding = None
+        # tiktoken jest opcjonalny - bez niego liczymy w przybliżeniu jak estimate_tokens
+        if importlib.util.find_spec("tiktoken") is not None:
+            import tiktoken
+            try:
+                self.encoding = tiktoken.encoding_for_model(model or "gpt-4o-mini")
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    @property
+    def exact(self) -> bool:
+        """Czy liczenie odpowiada tokenizerowi modelu"""
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        """Liczba tokenów tekstu"""
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Początek tekstu mieszczący się w max_tokens"""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else self.encoding.decode(tokens[:max_tokens])
+        return text[:max_tokens * 4]
+
+
+class ContextEngine:
+    """Buduje kontekst zadania atomowego w budżecie tokenów.
+
+    Opisy zadań na ścieżce do korzenia trafiają zawsze (od najbliższego rodzica), a pozostały
+    budżet wypełniają wyniki ukończonego rodzeństwa i wcześniejszych kuzynów w kolejności
+    trafności: podobieństwo kosinusowe n-gramów do opisu zadania × waga bliskości w drzewie.
+    Pojedynczy wynik zajmuje najwyżej `max_item_tokens`.
+    """
+
+    def __init__(self, task_manager: TaskManager, token_budget: int = 1000,
+                 max_item_tokens: int = 300, counter: Optional[TokenCounter] = None):
+        self.task_manager = task_manager
+        self.token_budget = token_budget
+        self.max_item_tokens = max_item_tokens
+        self.counter = counter or TokenCounter()
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Any] = {
+            "calls": 0,
+            "candidates": 0,
+            "included": 0,
+            "truncated": 0,
+            "tokens": 0,
+            "exact_tokenizer": self.counter.exact
+        }
+
+    def build(self, task: Task) -> Dict[str, Any]:
+        """Kontekst zadania: klucz -> tekst (parent_task, ancestor_<id>, sibling_<id>, cousin_<id>)"""
+        context: Dict[str, Any] = {}
+        remaining = self.token_budget
+        included = truncated = 0
+
+        for key, text in self._ancestor_items(task):
+            text, tokens, cut = self._fit(text, remaining)
+            if not text:
+                break
+            context[key] = text
+            remaining -= tokens
+            included += 1
+            truncated += cut
+
+        candidates = self._result_candidates(task)
+        for (key, candidate), _ in sorted(zip(candidates, self._scores(task, candidates)),
+                                          key=lambda item: -item[1]):
+            if remaining <= 0:
+                break
+            preview = candidate.result_preview(self.max_item_tokens * _CHARS_PER_TOKEN_BOUND)
+            text, tokens, cut = self._fit(preview, remaining)
+            if not text:
+                continue
+            context[key] = text
+            remaining -= tokens
+            included += 1
+            truncated += cut or len(text) < candidate.result_length
+
+        with self._lock:
+            self.counters["calls"] += 1
+            self.counters["candidates"] += len(candidates)
+            self.counters["included"] += included
+            self.counters["truncated"] += truncated
+            self.counters["tokens"] += self.token_budget - remaining
+        return context
+
+    def _fit(self, text: str, remaining: int) -> Tuple[str, int, int]:
+        """Przycina tekst do limitu elementu i pozostałego budżetu; zwraca (tekst, tokeny, czy przycięty)"""
+        limit = min(self.max_item_tokens, remaining)
+        tokens = self.counter.count(text)
+        if tokens <= limit:
+            return text, tokens, 0
+        text = self.counter.truncate(text, limit)
+        return text, self.counter.count(text), 1
+
+    def _ancestor_items(self, task: Task) -> List[Tuple[str, str]]:
+        """Opisy zadań na ścieżce do korzenia (najbliższy rodzic jako parent_task)"""
+        items = []
+        parent_id = task.parent_id
+        while parent_id:
+            parent = self.task_manager.get_task(parent_id)
+            if parent is None:
+                break
+            items.append(("parent_task" if not items else f"ancestor_{parent.id}", parent.description))
+            parent_id = parent.parent_id
+        return items
+
+    def _result_candidates(self, task: Task) -> List[Tuple[str, Task]]:
+        """Ukończone rodzeństwo i kuzyni utworzeni przed zadaniem (dzieci wcześniejszego rodzeństwa rodzica)"""
+        parent = self.task_manager.get_task(task.parent_id) if task.parent_id else None
+        if parent is None:
+            return []
+        candidates = [(f"sibling_{sibling.id}", sibling) for sibling in parent.subtasks
+                      if sibling.id != task.id and self._has_usable_result(sibling)]
+        grandparent = self.task_manager.get_task(parent.parent_id) if parent.parent_id else None
+        if grandparent is not None:
+            for uncle in grandparent.subtasks:
+                if uncle.id == parent.id:
+                    # Tylko wcześniejsze gałęzie - późniejsze nie mają jeszcze wyników
+                    break
+                candidates.extend((f"cousin_{cousin.id}", cousin) for cousin in uncle.subtasks
+                                  if self._has_usable_result(cousin))
+        return candidates
+
+    @staticmethod
+    def _has_usable_result(task: Task) -> bool:
+        """Wynik ukończonego zadania (bez nieudanych i w toku)"""
+        return task.has_result and task.is_completed()
+
+    def _scores(self, task: Task, candidates: List[Tuple[str, Task]]) -> List[float]:
+        """Trafność kandydatów: kosinus n-gramów (opis + początek wyniku) × waga bliskości"""
+        if not candidates:
+            return []
+        texts = [task.description] + [
+            f"{candidate.description} {candidate.result_preview(_SCORING_PREVIEW)}"
+            for _, candidate in candidates
+        ]
+        vectors = ngram_vectors(texts)
+        similarities = vectors[1:] @ vectors[0]
+        return [float(similarity) * (SIBLING_WEIGHT if key.startswith("sibling_") else COUSIN_WEIGHT)
+                for (key, _), similarity in zip(candidates, similarities)]
+
+
+def context_engine_from_env(task_manager: TaskManager, model: Optional[str] = None) -> ContextEngine:
+    """Tworzy silnik kontekstu na podstawie CONTEXT_TOKEN_BUDGET i CONTEXT_ITEM_TOKENS"""
+    return ContextEngine(
+        task_manager,
+        token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "1000")),
+        max_item_tokens=int(os.getenv("CONTEXT_ITEM_TOKENS", "300")),
+        counter=TokenCounter(model or os.getenv("MODEL"))
+    )
@@ -0,0 +1,153 @@
+"""
+Moduł pamięci dekompozycji - zweryfikowane listy podzadań wielokrotnego użytku między przebiegami
+(dokładne dopasowanie znormalizowanego opisu + indeks podobieństwa n-gramów)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .dedup import ngram_vectors, normalize_text
+
+
+class DecompositionMemo:
+    """Trwały indeks: znormalizowany opis zadania -> zweryfikowana lista podzadań"""
+
+    def __init__(self, cache_dir: str = "results", similarity_threshold: float = 0.9,
+                 max_entries: int = 10000):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Any] = {
+            "hits": 0,
+            "exact_hits": 0,
+            "similar_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "reuse_rate": 0.0
+        }
+
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self.db_path = Path(cache_dir) / "decomposition_memo.sqlite"
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS decompositions (
+                key TEXT PRIMARY KEY,
+                description TEXT NOT NULL,
+                subtasks TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                uses INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_decompositions_used ON decompositions(last_used)"
+        )
+        self._db.commit()
+
+        # Indeks w pamięci: klucze w kolejności wierszy macierzy wektorów
+        self._keys: List[str] = []
+        self._subtasks: Dict[str, List[str]] = {}
+        self._vectors = ngram_vectors([])
+        self._load()
+
+    def _load(self):
+        """Wczytuje wszystkie wpisy z bazy i buduje indeks podobieństwa"""
+        rows = self._db.execute("SELECT key, description, subtasks FROM decompositions").fetchall()
+        self._keys = [key for key, _, _ in rows]
+        self._subtasks = {key: json.loads(subtasks) for key, _, subtasks in rows}
+        self._vectors = ngram_vectors([description for _, description, _ in rows])
+
+    def lookup(self, description: str, allow_similar: bool = True) -> Optional[List[str]]:
+        """Zwraca zapamiętaną dekompozycję zadania (dokładną lub najbardziej podobną) albo None"""
+        key = normalize_text(description)
+        with self._lock:
+            match = None
+            if key in self._subtasks:
+                match = key
+                self.counters["exact_hits"] += 1
+            elif allow_similar and self._keys:
+                # Brak dokładnego dopasowania - najbliższy opis w indeksie podobieństwa
+                similarities = self._vectors @ ngram_vectors([description])[0]
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    match = self._keys[best]
+                    self.counters["similar_hits"] += 1
+
+            if match is None:
+                self.counters["misses"] += 1
+                self._update_reuse_rate()
+                return None
+
+            self.counters["hits"] += 1
+            self._update_reuse_rate()
+            self._db.execute(
+                "UPDATE decompositions SET last_used = ?, uses = uses + 1 WHERE key = ?",
+                (time.time(), match)
+            )
+            self._db.commit()
+            return list(self._subtasks[match])
+
+    def store(self, description: str, subtasks: List[str]):
+        """Zapamiętuje zweryfikowaną dekompozycję"""
+        key = normalize_text(description)
+        if not key or len(subtasks) < 2:
+            return
+        # Podzadanie identyczne z zadaniem nadrzędnym zapętliłoby ponowne użycie
+        if any(normalize_text(subtask) == key for subtask in subtasks):
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO decompositions (key, description, subtasks, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                "subtasks = excluded.subtasks, last_used = excluded.last_used",
+                (key, description, json.dumps(subtasks, ensure_ascii=False), now, now)
+            )
+            self.counters["stores"] += 1
+            if key not in self._subtasks:
+                self._keys.append(key)
+                self._vectors = np.vstack([self._vectors, ngram_vectors([description])])
+            self._subtasks[key] = list(subtasks)
+            if len(self._keys) > self.max_entries:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        """Usuwa najdawniej używane wpisy ponad limit i przebudowuje indeks (pod blokadą)"""
+        overflow = len(self._keys) - self.max_entries
+        self._db.execute(
+            "DELETE FROM decompositions WHERE key IN "
+            "(SELECT key FROM decompositions ORDER BY last_used ASC LIMIT ?)",
+            (overflow,)
+        )
+        self._load()
+
+    def _update_reuse_rate(self):
+        """Odsetek zapytań obsłużonych z pamięci (pod blokadą)"""
+        lookups = self.counters["hits"] + self.counters["misses"]
+        self.counters["reuse_rate"] = round(self.counters["hits"] / max(lookups, 1), 4)
+
+    def close(self):
+        """Zamyka połączenie z bazą"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def memo_from_env(cache_dir: str = "results") -> Optional[DecompositionMemo]:
+    """Tworzy pamięć dekompozycji na podstawie DECOMPOSITION_MEMO* (None gdy wyłączona)"""
+    if os.getenv("DECOMPOSITION_MEMO", "0").lower() not in ("1", "true", "tak"):
+        return None
+    return DecompositionMemo(
+        cache_dir=cache_dir,
+        similarity_threshold=float(os.getenv("DECOMPOSITION_MEMO_THRESHOLD", "0.9")),
+        max_entries=int(os.getenv("DECOMPOSITION_MEMO_MAX_ENTRIES", "10000"))
+    )
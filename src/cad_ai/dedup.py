@@ -0,0 +1,212 @@
+"""
+Moduł lokalnej detekcji duplikatów - n-gramy znakowe (TF-IDF) z podobieństwem kosinusowym
+(NumPy), MinHash/LSH dla długich list; LLM rozstrzyga tylko niejednoznaczne pary
+"""
+import os
+import re
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Liczba pierwsza Mersenne'a dla permutacji MinHash (iloczyny mieszczą się w int64)
+_MERSENNE_PRIME = (1 << 31) - 1
+
+# Ile par porównywać naraz w trybie LSH (ogranicza pamięć pośrednich macierzy)
+_PAIR_CHUNK = 1024
+
+
+def normalize_text(text: str) -> str:
+    """Sprowadza opis zadania do małych liter i pojedynczych spacji (bez numeracji i interpunkcji)"""
+    words = _WORD_RE.findall(text.lower())
+    # Numeracja listy ("1.", "2)") nie niesie treści
+    while words and words[0].isdigit():
+        words.pop(0)
+    return " ".join(words)
+
+
+def char_ngrams(text: str, sizes: Tuple[int, ...] = (3, 4, 5)) -> List[str]:
+    """Zwraca n-gramy znakowe (z granicami słów) znormalizowanego tekstu"""
+    padded = f" {text} "
+    return [padded[i:i + n] for n in sizes for i in range(len(padded) - n + 1)]
+
+
+def _hash_ngram(ngram: str) -> int:
+    """Deterministyczny hash n-gramu (niezależny od PYTHONHASHSEED)"""
+    return zlib.crc32(ngram.encode("utf-8"))
+
+
+def ngram_vectors(texts: List[str], ngram_sizes: Tuple[int, ...] = (3, 4, 5),
+                  dimensions: int = 1 << 12, idf: bool = False) -> np.ndarray:
+    """Wektory n-gramów rzutowane na stały wymiar (hashing trick), wiersze znormalizowane L2"""
+    matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        columns = [_hash_ngram(g) % dimensions for g in char_ngrams(normalize_text(text), ngram_sizes)]
+        if columns:
+            np.add.at(matrix[row], np.asarray(columns), 1.0)
+
+    if idf:
+        document_frequency = np.count_nonzero(matrix, axis=0)
+        matrix *= (np.log((1 + len(texts)) / (1 + document_frequency)) + 1.0).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LocalDeduplicator:
+    """Lokalny detektor duplikatów - wektory TF-IDF n-gramów (hashing trick) i kosinus w NumPy.
+
+    Pary o podobieństwie >= duplicate_threshold są duplikatami (zostaje dłuższy, pełniejszy opis),
+    pary w przedziale [ambiguous_threshold, duplicate_threshold) są niejednoznaczne i wymagają
+    rozstrzygnięcia przez LLM, pozostałe uznaje się za różne zadania.
+    """
+
+    def __init__(self, duplicate_threshold: float = 0.85, ambiguous_threshold: float = 0.4,
+                 ngram_sizes: Tuple[int, ...] = (3, 4, 5), dimensions: int = 1 << 12,
+                 minhash_min_items: int = 64, num_permutations: int = 128, bands: int = 32,
+                 seed: int = 1):
+        if not 0 < ambiguous_threshold <= duplicate_threshold <= 1:
+            raise ValueError("Wymagane 0 < ambiguous_threshold <= duplicate_threshold <= 1")
+        if num_permutations % bands:
+            raise ValueError("num_permutations musi być wielokrotnością bands")
+        self.duplicate_threshold = duplicate_threshold
+        self.ambiguous_threshold = ambiguous_threshold
+        self.ngram_sizes = ngram_sizes
+        self.dimensions = dimensions
+        # Od tej liczby zadań kandydaci do porównania wybierani są przez MinHash/LSH
+        self.minhash_min_items = minhash_min_items
+        self.bands = bands
+        rng = np.random.default_rng(seed)
+        self._perm_a = rng.integers(1, _MERSENNE_PRIME, size=num_permutations, dtype=np.int64)
+        self._perm_b = rng.integers(0, _MERSENNE_PRIME, size=num_permutations, dtype=np.int64)
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "lists": 0,
+            "items": 0,
+            "duplicates": 0,
+            "ambiguous_pairs": 0,
+            "llm_checks": 0,
+            "llm_calls_saved": 0
+        }
+
+    def vectorize(self, texts: List[str]) -> np.ndarray:
+        """Macierz TF-IDF (wiersze znormalizowane L2) n-gramów rzutowanych na stały wymiar"""
+        return ngram_vectors(texts, self.ngram_sizes, self.dimensions, idf=True)
+
+    def minhash_signatures(self, texts: List[str]) -> np.ndarray:
+        """Sygnatury MinHash zbiorów n-gramów (wiersz = zadanie)"""
+        signatures = np.full((len(texts), len(self._perm_a)), _MERSENNE_PRIME, dtype=np.int64)
+        for row, text in enumerate(texts):
+            shingles = {_hash_ngram(g) % _MERSENNE_PRIME
+                        for g in char_ngrams(normalize_text(text), self.ngram_sizes)}
+            if not shingles:
+                continue
+            values = np.fromiter(shingles, dtype=np.int64, count=len(shingles))
+            hashed = (np.outer(self._perm_a, values) + self._perm_b[:, None]) % _MERSENNE_PRIME
+            signatures[row] = hashed.min(axis=1)
+        return signatures
+
+    def candidate_pairs(self, texts: List[str]) -> Set[Tuple[int, int]]:
+        """Pary do porównania - wszystkie dla krótkich list, z kubełków LSH dla długich"""
+        count = len(texts)
+        if count < self.minhash_min_items:
+            return {(i, j) for i in range(count) for j in range(i + 1, count)}
+
+        signatures = self.minhash_signatures(texts)
+        rows = signatures.shape[1] // self.bands
+        pairs: Set[Tuple[int, int]] = set()
+        for band in range(self.bands):
+            buckets: Dict[bytes, List[int]] = {}
+            for idx, key in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+                buckets.setdefault(key.tobytes(), []).append(idx)
+            for members in buckets.values():
+                for a in range(len(members)):
+                    for b in range(a + 1, len(members)):
+                        pairs.add((members[a], members[b]))
+        return pairs
+
+    def _pair_similarities(self, vectors: np.ndarray, pairs: List[Tuple[int, int]]) -> np.ndarray:
+        """Podobieństwo kosinusowe wskazanych par (wektory są już znormalizowane)"""
+        if not pairs:
+            return np.zeros(0, dtype=np.float32)
+        index = np.asarray(pairs, dtype=np.int64)
+        if len(vectors) < self.minhash_min_items:
+            # Krótka lista - pełna macierz podobieństw jest najtańsza
+            return (vectors @ vectors.T)[index[:, 0], index[:, 1]]
+        return np.concatenate([
+            np.einsum("ij,ij->i", vectors[chunk[:, 0]], vectors[chunk[:, 1]])
+            for chunk in np.array_split(index, -(-len(index) // _PAIR_CHUNK))
+        ])
+
+    def deduplicate(self, texts: List[str]) -> Dict[str, Any]:
+        """Klasyfikuje pary zadań; zwraca unikalne zadania, usunięte duplikaty i pary niejednoznaczne"""
+        decision: Dict[str, Any] = {"unique": list(texts), "removed": [], "ambiguous": []}
+        if len(texts) <= 1:
+            return decision
+
+        vectors = self.vectorize(texts)
+        pairs = sorted(self.candidate_pairs(texts))
+        similarities = self._pair_similarities(vectors, pairs)
+
+        # Najpierw najbardziej podobne pary - z każdej pary duplikatów zostaje dłuższy opis
+        normalized = [normalize_text(text) for text in texts]
+        lengths = [len(text) for text in normalized]
+        # Liczby (lata, kwartały, numery etapów) odróżniają zadania mimo prawie identycznego tekstu
+        numbers = [frozenset(re.findall(r"\d+", text)) for text in normalized]
+        dropped: Set[int] = set()
+        ambiguous: List[Tuple[int, int, float]] = []
+        for pair_idx in np.argsort(-similarities, kind="stable"):
+            i, j = pairs[pair_idx]
+            score = float(similarities[pair_idx])
+            if score < self.ambiguous_threshold:
+                break
+            if i in dropped or j in dropped:
+                continue
+            if score >= self.duplicate_threshold and numbers[i] == numbers[j]:
+                keep, drop = (i, j) if lengths[i] >= lengths[j] else (j, i)
+                dropped.add(drop)
+                decision["removed"].append((drop, keep, score))
+            else:
+                ambiguous.append((i, j, score))
+
+        decision["ambiguous"] = [(i, j, score) for i, j, score in ambiguous
+                                 if i not in dropped and j not in dropped]
+        decision["unique"] = [text for idx, text in enumerate(texts) if idx not in dropped]
+        with self._lock:
+            self.counters["lists"] += 1
+            self.counters["items"] += len(texts)
+            self.counters["duplicates"] += len(dropped)
+            self.counters["ambiguous_pairs"] += len(decision["ambiguous"])
+        return decision
+
+    def match(self, candidates: List[str], references: List[str]) -> Set[int]:
+        """Indeksy `references`, którym odpowiada któryś z `candidates` (np. lista zwrócona przez LLM)"""
+        if not candidates or not references:
+            return set()
+        vectors = self.vectorize(list(references) + list(candidates))
+        similarities = vectors[len(references):] @ vectors[:len(references)].T
+        matched = set()
+        for row in similarities:
+            best = int(np.argmax(row))
+            if row[best] >= self.ambiguous_threshold:
+                matched.add(best)
+        return matched
+
+    def note_llm_check(self, needed: bool):
+        """Zlicza czy lista wymagała rozstrzygnięcia przez LLM"""
+        with self._lock:
+            self.counters["llm_checks" if needed else "llm_calls_saved"] += 1
+
+
+def dedup_from_env() -> Optional[LocalDeduplicator]:
+    """Tworzy lokalny detektor duplikatów na podstawie LOCAL_DEDUP* (None gdy wyłączony)"""
+    if os.getenv("LOCAL_DEDUP", "0").lower() not in ("1", "true", "tak"):
+        return None
+    return LocalDeduplicator(
+        duplicate_threshold=float(os.getenv("DEDUP_DUPLICATE_THRESHOLD", "0.85")),
+        ambiguous_threshold=float(os.getenv("DEDUP_AMBIGUOUS_THRESHOLD", "0.4")),
+        minhash_min_items=int(os.getenv("DEDUP_MINHASH_MIN_ITEMS", "64"))
+    )
@@ -0,0 +1,263 @@
+"""
+Moduł dziennika zdarzeń - dopisywany log (JSON Lines) zmian stanu zadań z grupowym fsync,
+odtwarzaniem do TaskManager i kompaktowaniem do migawki
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+from .aggregation import result_from_record, result_to_record
+from .persistence import task_from_record, task_to_record, write_json_atomic
+from .task_manager import Task, TaskManager, TaskStatus
+
+EVENT_LOG_NAME = "events.jsonl"
+SNAPSHOT_NAME = "events_snapshot.json"
+
+
+class TaskEventLog:
+    """Słuchacz TaskManager dopisujący każdą zmianę zadania do results/<zadanie główne>/events.jsonl.
+
+    Zdarzenia trafiają do bufora pliku od razu, a fsync wykonywany jest grupowo: po `fsync_batch`
+    zdarzeniach albo najpóźniej po `fsync_interval` sekundach (wątek w tle). Po `compact_every`
+    zdarzeniach dziennik jest kompaktowany do migawki stanu drzewa.
+    """
+
+    def __init__(self, task_manager: TaskManager, base_dir: str = "results",
+                 fsync_interval: float = 0.5, fsync_batch: int = 64, compact_every: int = 10000):
+        self.task_manager = task_manager
+        self.base_dir = Path(base_dir)
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = max(1, fsync_batch)
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        # Otwarte dzienniki: zadanie główne -> plik, numer ostatniego zdarzenia, liczba zdarzeń w pliku
+        self._files: Dict[str, IO[str]] = {}
+        self._seq: Dict[str, int] = {}
+        self._logged: Dict[str, int] = {}
+        self._unsynced = 0
+        self.counters: Dict[str, int] = {"events": 0, "fsyncs": 0, "compactions": 0, "bytes": 0}
+
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name="event-log-fsync", daemon=True)
+        self._flusher.start()
+        self._remove = task_manager.add_listener(self.on_change)
+
+    def on_change(self, task: Task, change: str):
+        """Dopisuje zdarzenie dla zmiany zadania"""
+        root = self.task_manager.get_root(task.id)
+        if root is None:
+            return
+        if change == "created":
+            payload = {"task": task_to_record(task)}
+        elif change == "status":
+            payload = {"status": task.status.value}
+        elif change == "result":
+            payload = result_to_record(task)
+        else:
+            payload = {"verification": task.verification_result}
+        self.append(root.id, change, task.id, payload)
+
+    def append(self, root_id: str, event: str, task_id: str, payload: Dict[str, Any]):
+        """Dopisuje zdarzenie do dziennika zadania głównego"""
+        sync = False
+        compact = False
+        with self._lock:
+            handle = self._open(root_id)
+            self._seq[root_id] += 1
+            record = {"seq": self._seq[root_id], "ts": time.time(), "event": event,
+                      "task_id": task_id, **payload}
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            handle.write(line)
+            self._logged[root_id] += 1
+            self._unsynced += 1
+            self.counters["events"] += 1
+            self.counters["bytes"] += len(line)
+            sync = self._unsynced >= self.fsync_batch
+            compact = self.compact_every > 0 and self._logged[root_id] >= self.compact_every
+        if compact:
+            self.compact(root_id)
+        elif sync:
+            self.sync()
+
+    def sync(self):
+        """Zrzuca bufory i wykonuje fsync wszystkich otwartych dzienników"""
+        with self._lock:
+            if not self._unsynced:
+                return
+            descriptors = []
+            for handle in self._files.values():
+                handle.flush()
+                descriptors.append(handle.fileno())
+            self._unsynced = 0
+            self.counters["fsyncs"] += 1
+            # fsync pod blokadą - zamknięcie lub kompaktowanie nie podmieni deskryptora w trakcie
+            for fd in descriptors:
+                os.fsync(fd)
+
+    def compact(self, root_id: str):
+        """Zapisuje migawkę drzewa zadania głównego i zaczyna dziennik od nowa"""
+        with self._lock:
+            # Drzewo i seq pobierane pod tą samą blokadą - zdarzenie dopisane w międzyczasie
+            # miałoby seq <= seq migawki i zostałoby pominięte przy odtwarzaniu (TaskManager
+            # powiadamia słuchaczy poza własną blokadą, więc kolejność blokad jest bezpieczna)
+            tasks = self.task_manager.get_subtree(root_id)
+            handle = self._open(root_id)
+            handle.flush()
+            os.fsync(handle.fileno())
+            snapshot = {
+                "main_task_id": root_id,
+                "seq": self._seq[root_id],
+                "timestamp": datetime.now().isoformat(),
+                "tasks": [task_to_record(task) for task in tasks]
+            }
+            # Migawka zapisywana przed obcięciem dziennika; przy awarii pomiędzy krokami
+            # odtwarzanie pomija zdarzenia o numerach nie większych niż seq migawki
+            write_json_atomic(self._task_dir(root_id) / SNAPSHOT_NAME, snapshot)
+            handle.close()
+            self._files[root_id] = open(self._task_dir(root_id) / EVENT_LOG_NAME, "w", encoding="utf-8")
+            self._logged[root_id] = 0
+            self.counters["compactions"] += 1
+
+    def close(self):
+        """Zapisuje zaległe zdarzenia, zamyka pliki i odłącza słuchacza"""
+        self._remove()
+        self._closed.set()
+        self.sync()
+        with self._lock:
+            for handle in self._files.values():
+                handle.close()
+            self._files.clear()
+
+    def _task_dir(self, root_id: str) -> Path:
+        """Katalog zadania głównego"""
+        task_dir = self.base_dir / root_id
+        task_dir.mkdir(parents=True, exist_ok=True)
+        return task_dir
+
+    def _open(self, root_id: str) -> IO[str]:
+        """Otwiera dziennik zadania głównego do dopisywania (pod blokadą), kontynuując numerację"""
+        if root_id not in self._files:
+            task_dir = self._task_dir(root_id)
+            last_seq = 0
+            logged = 0
+            snapshot = _read_snapshot(task_dir)
+            if snapshot is not None:
+                last_seq = snapshot["seq"]
+            valid_bytes = 0
+            for record, end in _read_events_with_offsets(task_dir / EVENT_LOG_NAME):
+                last_seq = max(last_seq, record["seq"])
+                logged += 1
+                valid_bytes = end
+            log_path = task_dir / EVENT_LOG_NAME
+            # Urwany ostatni wiersz (awaria w trakcie zapisu) jest obcinany przed dopisywaniem
+            if log_path.exists() and log_path.stat().st_size > valid_bytes:
+                os.truncate(log_path, valid_bytes)
+            self._files[root_id] = open(log_path, "a", encoding="utf-8")
+            self._seq[root_id] = last_seq
+            self._logged[root_id] = logged
+        return self._files[root_id]
+
+    def _flush_periodically(self):
+        """Wątek w tle - fsync co fsync_interval sekund, jeśli są niezapisane zdarzenia"""
+        while not self._closed.wait(self.fsync_interval):
+            try:
+                self.sync()
+            except (OSError, ValueError) as e:
+                print(f"Błąd zapisu dziennika zdarzeń: {e}")
+
+
+def _read_snapshot(task_dir: Path) -> Optional[Dict[str, Any]]:
+    """Ładuje migawkę dziennika (None gdy brak)"""
+    path = task_dir / SNAPSHOT_NAME
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _read_events_with_offsets(path: Path) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """Czyta zdarzenia z dziennika wraz z pozycją końca wiersza; urwany ostatni wiersz
+    (awaria w trakcie zapisu) kończy odczyt"""
+    if not path.exists():
+        return
+    offset = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                break
+            offset += len(line)
+            yield record, offset
+
+
+def _read_events(path: Path) -> Iterator[Dict[str, Any]]:
+    """Czyta zdarzenia z dziennika (bez urwanego ostatniego wiersza)"""
+    for record, _ in _read_events_with_offsets(path):
+        yield record
+
+
+def read_events(base_dir: str, task_id: str, after: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Zwraca zdarzenia zadania głównego o numerach większych niż `after` (np. dla historii w UI)"""
+    events = []
+    for record in _read_events(Path(base_dir) / task_id / EVENT_LOG_NAME):
+        if record["seq"] <= after:
+            continue
+        events.append(record)
+        if limit is not None and len(events) >= limit:
+            break
+    return events
+
+
+def replay_event_log(base_dir: str, task_id: str, persistence_manager=None) -> Optional[TaskManager]:
+    """Odtwarza TaskManager z migawki i dziennika zdarzeń zadania głównego (None gdy brak dziennika)"""
+    task_dir = Path(base_dir) / task_id
+    snapshot = _read_snapshot(task_dir)
+    if snapshot is None and not (task_dir / EVENT_LOG_NAME).exists():
+        return None
+
+    task_manager = TaskManager(persistence_manager=persistence_manager)
+    last_seq = 0
+    if snapshot is not None:
+        task_manager.restore_tasks([task_from_record(data) for data in snapshot["tasks"]])
+        last_seq = snapshot["seq"]
+
+    for record in _read_events(task_dir / EVENT_LOG_NAME):
+        if record["seq"] <= last_seq:
+            continue
+        last_seq = record["seq"]
+        if record["event"] == "created":
+            # Zadanie mogło już trafić do migawki zapisanej współbieżnie ze zdarzeniem
+            if record["task_id"] not in task_manager.tasks:
+                task_manager.restore_tasks([task_from_record(record["task"])])
+            continue
+        task = task_manager.get_task(record["task_id"])
+        if task is None:
+            continue
+        if record["event"] == "status":
+            task.status = TaskStatus(record["status"])
+        elif record["event"] == "result":
+            task.result = result_from_record(record)
+        elif record["event"] == "verification":
+            task.verification_result = record["verification"]
+
+    return task_manager if task_id in task_manager.tasks else None
+
+
+def event_log_from_env(task_manager: TaskManager, base_dir: str = "results") -> Optional[TaskEventLog]:
+    """Tworzy dziennik zdarzeń na podstawie EVENT_LOG* (None gdy wyłączony)"""
+    if os.getenv("EVENT_LOG", "0").lower() not in ("1", "true", "tak"):
+        return None
+    return TaskEventLog(
+        task_manager,
+        base_dir=base_dir,
+        fsync_interval=float(os.getenv("EVENT_LOG_FSYNC_INTERVAL", "0.5")),
+        fsync_batch=int(os.getenv("EVENT_LOG_FSYNC_BATCH", "64")),
+        compact_every=int(os.getenv("EVENT_LOG_COMPACT_EVERY", "10000"))
+    )
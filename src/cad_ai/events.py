@@ -0,0 +1,69 @@
+"""
+Moduł zdarzeń - prosta magistrala publikuj/subskrybuj dla postępu przetwarzania
+"""
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+# Subskrybent otrzymuje słownik zdarzenia: {"type", "task_id", "timestamp", ...}
+ProgressSubscriber = Callable[[Dict[str, Any]], None]
+
+# Prefiks linii zdarzeń wypisywanych na stdout przez przebieg w podprocesie (scripts/test_run.py)
+EVENT_LINE_PREFIX = "@@event "
+
+
+class EventBus:
+    """Magistrala zdarzeń postępu - bezpieczna wątkowo, synchroniczne powiadamianie"""
+
+    def __init__(self):
+        self._subscribers: List[ProgressSubscriber] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscriber: ProgressSubscriber) -> Callable[[], None]:
+        """Rejestruje subskrybenta; zwraca funkcję wyrejestrowującą"""
+        with self._lock:
+            self._subscribers.append(subscriber)
+
+        def unsubscribe():
+            with self._lock:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+
+        return unsubscribe
+
+    def publish(self, event_type: str, task_id: Optional[str] = None, **data: Any):
+        """Publikuje zdarzenie do wszystkich subskrybentów"""
+        event = {"type": event_type, "task_id": task_id, "timestamp": time.time(), **data}
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber(event)
+            except Exception as e:
+                # Błąd subskrybenta nie może przerwać przetwarzania zadań
+                print(f"Błąd subskrybenta zdarzeń: {e}")
+
+
+def stdout_event_writer(stream: TextIO) -> ProgressSubscriber:
+    """Subskrybent wypisujący zdarzenia jako linie JSON z EVENT_LINE_PREFIX (odczyt: parse_event_line)"""
+    lock = threading.Lock()
+
+    def write(event: Dict[str, Any]):
+        line = EVENT_LINE_PREFIX + json.dumps(event, ensure_ascii=False, default=str)
+        with lock:
+            stream.write(line + "\n")
+            stream.flush()
+
+    return write
+
+
+def parse_event_line(line: str) -> Optional[Dict[str, Any]]:
+    """Zdarzenie z linii stdout podprocesu albo None dla zwykłej linii logu"""
+    if not line.startswith(EVENT_LINE_PREFIX):
+        return None
+    try:
+        event = json.loads(line[len(EVENT_LINE_PREFIX):])
+    except json.JSONDecodeError:
+        return None
+    return event if isinstance(event, dict) and "type" in event else None
@@ -0,0 +1,85 @@
+"""
+Moduł przydziału identyfikatorów zadań - trwała sekwencja w SQLite, z której każdy proces
+rezerwuje bloki numerów (atomowo między procesami, bez skanowania katalogu wyników)
+"""
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+TASK_IDS_DB_NAME = "task_ids.sqlite"
+
+
+class TaskIdAllocator:
+    """Sekwencja numerów zadań współdzielona przez procesy zapisujące do tego samego results/.
+
+    Numery pobierane są z lokalnie zarezerwowanego bloku `block_size` kolejnych wartości; nowy blok
+    rezerwuje jedna transakcja BEGIN IMMEDIATE, więc równoległe orkiestratory nigdy nie dostaną
+    tego samego numeru. Niewykorzystana końcówka bloku wraca do sekwencji przy release(), o ile
+    nikt nie zarezerwował w międzyczasie kolejnego bloku.
+    """
+
+    def __init__(self, db_path: str, block_size: int = 64,
+                 seed: Optional[Callable[[], int]] = None):
+        self.db_path = Path(db_path)
+        self.block_size = max(1, block_size)
+        # Wartość początkowa przy pierwszym użyciu (np. najwyższy numer istniejących katalogów)
+        self._seed = seed
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+        self.counters: Dict[str, int] = {"allocated": 0, "blocks": 0, "released": 0}
+        self._db = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sequences (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def reserve(self, count: int) -> Tuple[int, int]:
+        """Rezerwuje `count` kolejnych numerów; zwraca zakres [początek, koniec)"""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._db.execute("SELECT value FROM sequences WHERE name = 'task'").fetchone()
+            if row is None:
+                # Pierwsze użycie - jednorazowe przejęcie numeracji istniejących wyników
+                current = self._seed() if self._seed else 0
+                self._db.execute("INSERT INTO sequences (name, value) VALUES ('task', ?)", (current + count,))
+            else:
+                current = row[0]
+                self._db.execute("UPDATE sequences SET value = ? WHERE name = 'task'", (current + count,))
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self.counters["blocks"] += 1
+        return current + 1, current + count + 1
+
+    def next_number(self) -> int:
+        """Następny numer zadania (z bieżącego bloku lub nowo zarezerwowanego)"""
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = self.reserve(self.block_size)
+            number = self._next
+            self._next += 1
+            self.counters["allocated"] += 1
+            return number
+
+    def release(self):
+        """Zwraca niewykorzystaną końcówkę bloku, jeśli sekwencja nie przesunęła się od rezerwacji"""
+        with self._lock:
+            if self._next >= self._end:
+                return
+            cursor = self._db.execute(
+                "UPDATE sequences SET value = ? WHERE name = 'task' AND value = ?",
+                (self._next - 1, self._end - 1)
+            )
+            if cursor.rowcount:
+                self.counters["released"] += self._end - self._next
+            self._next = self._end
+
+    def close(self):
+        """Zwraca niewykorzystane numery i zamyka połączenie z bazą"""
+        self.release()
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,173 @@
+"""
+Moduł cache odpowiedzi LLM - adresowany treścią, pamięć LRU + SQLite na dysku
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+class LLMResponseCache:
+    """Cache odpowiedzi LLM kluczowany (provider, model, temperatura, prompty)"""
+
+    def __init__(self, cache_dir: str = "results", max_memory_entries: int = 1024,
+                 max_disk_entries: int = 50000, ttl_seconds: Optional[float] = 7 * 24 * 3600,
+                 deterministic: bool = True, use_disk: bool = True):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        # Tryb deterministyczny - agenci wywołują model z temperaturą 0
+        self.deterministic = deterministic
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0
+        }
+
+        self._db: Optional[sqlite3.Connection] = None
+        if use_disk:
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+            self.db_path = Path(cache_dir) / "llm_cache.sqlite"
+            self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(provider: str, model: str, temperature: float,
+                 system_prompt: str, user_prompt: str) -> str:
+        """Buduje klucz (SHA-256) z parametrów wywołania"""
+        payload = json.dumps(
+            [provider, model, round(float(temperature), 4), system_prompt, user_prompt],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        """Sprawdza czy wpis przekroczył TTL"""
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Zwraca odpowiedź z cache lub None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if not self._is_expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.counters["hits"] += 1
+                    self.counters["memory_hits"] += 1
+                    return response
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    response, created_at = row
+                    if not self._is_expired(created_at, now):
+                        self._db.execute(
+                            "UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key)
+                        )
+                        self._db.commit()
+                        self._remember(key, response, created_at)
+                        self.counters["hits"] += 1
+                        self.counters["disk_hits"] += 1
+                        return response
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, key: str, response: str):
+        """Zapisuje odpowiedź w obu warstwach cache"""
+        if not response:
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            self.counters["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def _remember(self, key: str, response: str, created_at: float):
+        """Dodaje wpis do warstwy LRU w pamięci (wywoływane pod blokadą)"""
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _evict_disk(self, now: float):
+        """Usuwa przeterminowane i najdawniej używane wpisy z dysku"""
+        if self.ttl_seconds is not None:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+        (count,) = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self.counters["evictions"] += overflow
+
+    def clear(self):
+        """Czyści oba poziomy cache"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def close(self):
+        """Zamyka połączenie z bazą"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def cache_from_env(cache_dir: str = "results") -> Optional[LLMResponseCache]:
+    """Tworzy cache na podstawie zmiennych LLM_CACHE* (None gdy wyłączony)"""
+    if os.getenv("LLM_CACHE", "0").lower() not in ("1", "true", "tak"):
+        return None
+    ttl = os.getenv("LLM_CACHE_TTL")
+    return LLMResponseCache(
+        cache_dir=cache_dir,
+        max_memory_entries=int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024")),
+        max_disk_entries=int(os.getenv("LLM_CACHE_DISK_ENTRIES", "50000")),
+        ttl_seconds=float(ttl) if ttl else 7 * 24 * 3600,
+        deterministic=os.getenv("LLM_CACHE_DETERMINISTIC", "1").lower() in ("1", "true", "tak")
+    )
@@ -1,23 +1,97 @@
 """
 Moduł persistencji - przechowywanie wyników w plikach
 """
+import atexit
 import json
 import os
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from pathlib import Path
-from .task_manager import Task, TaskStatus, TaskType
+from .task_manager import Task, TaskStatus, TaskType, TaskManager
+from .run_index import RunIndex, run_fields_from_artifact
+from .aggregation import result_from_record, result_to_record
+from .id_allocator import TASK_IDS_DB_NAME, TaskIdAllocator
+
+CHECKPOINT_VERSION = 1
+
+
+def task_to_record(task: Task) -> Dict[str, Any]:
+    """Pełny zapis zadania (bez podzadań) do punktu kontrolnego lub dziennika zdarzeń"""
+    return {
+        "id": task.id,
+        "description": task.description,
+        "type": task.task_type.value,
+        "status": task.status.value,
+        "level": task.level,
+        "parent_id": task.parent_id,
+        # Wynik zagregowany zapisywany jako segmenty z odwołaniami do podzadań, nie pełny tekst
+        **result_to_record(task),
+        "verification": task.verification_result,
+        "created_at": task.created_at.isoformat() if task.created_at else None,
+        "metadata": task.metadata if task.has_metadata else {}
+    }
+
+
+def task_from_record(data: Dict[str, Any]) -> Task:
+    """Odtwarza zadanie z zapisu task_to_record"""
+    return Task(
+        id=data["id"],
+        description=data["description"],
+        task_type=TaskType(data["type"]),
+        status=TaskStatus(data["status"]),
+        level=data["level"],
+        parent_id=data["parent_id"],
+        result=result_from_record(data),
+        verification_result=data["verification"],
+        created_at=datetime.fromisoformat(data["created_at"]) if data["created_at"] else None,
+        metadata=data.get("metadata")
+    )
+
+
+def write_json_atomic(filepath: Path, data: Any, indent: Optional[int] = None):
+    """Zapisuje JSON przez plik tymczasowy, fsync i podmianę - przerwanie nie zostawi uszkodzonego pliku"""
+    tmp_path = filepath.with_name(f"{filepath.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, filepath)
 
 
 class PersistenceManager:
     """Manager do zarządzania persistencją wyników"""
     
-    def __init__(self, base_dir: str = "results"):
+    def __init__(self, base_dir: str = "results", run_index: Optional[RunIndex] = None,
+                 id_block_size: int = 64):
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(exist_ok=True)
+        # Indeks przebiegów dla listy wyników w UI - aktualizowany przy każdym zapisie artefaktu
+        self.run_index = run_index
+        # Sekwencja ID zadań (results/task_ids.sqlite) tworzona przy pierwszym przydziale
+        self.id_block_size = id_block_size
+        self._id_allocator: Optional[TaskIdAllocator] = None
+        self._id_lock = threading.Lock()
+    
+    def next_task_number(self) -> int:
+        """Przydziela numer nowego zadania z trwałej sekwencji (unikalny także między procesami)"""
+        with self._id_lock:
+            if self._id_allocator is None:
+                self._id_allocator = TaskIdAllocator(
+                    str(self.base_dir / TASK_IDS_DB_NAME), self.id_block_size, seed=self.get_next_task_counter
+                )
+                # Niewykorzystane numery bloku wracają do sekwencji przy zakończeniu procesu
+                atexit.register(self._id_allocator.release)
+        return self._id_allocator.next_number()
+    
+    def release_task_numbers(self):
+        """Zwraca do sekwencji niewykorzystane numery zarezerwowanego bloku (koniec przebiegu)"""
+        if self._id_allocator is not None:
+            self._id_allocator.release()
     
     def get_next_task_counter(self) -> int:
-        """Pobiera następny licznik zadań na podstawie istniejących folderów"""
+        """Najwyższy numer zadania wśród istniejących folderów (jednorazowo - początek sekwencji ID)"""
         max_counter = 0
         for task_dir in self.base_dir.iterdir():
             if task_dir.is_dir() and task_dir.name.startswith("task_"):
@@ -34,20 +108,62 @@ class PersistenceManager:
         task_dir.mkdir(exist_ok=True)
         return task_dir
     
-    def save_task_output(self, task_id: str, output: str) -> str:
-        """Zapisuje sam output zadania (czysty wynik)"""
-        task_dir = self._get_task_dir(task_id)
-        filepath = task_dir / "output.txt"
+    # Magazyn artefaktów - nazwy względne wobec katalogu zadania ("stats.json",
+    # "execution_logs/summary_<czas>.json"); inne backendy (SQLite) nadpisują te metody
+    
+    def _write_text(self, task_id: str, name: str, content: str) -> str:
+        """Zapisuje artefakt tekstowy zadania, zwraca jego lokalizację"""
+        filepath = self._get_task_dir(task_id) / name
+        filepath.parent.mkdir(exist_ok=True)
         
         with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(output)
+            f.write(content)
         
+        self._index_artifact(task_id, name, content)
         return str(filepath)
     
+    def _write_json(self, task_id: str, name: str, data: Dict[str, Any],
+                    indent: Optional[int] = 2) -> str:
+        """Zapisuje (atomowo) artefakt JSON zadania, zwraca jego lokalizację"""
+        filepath = self._get_task_dir(task_id) / name
+        filepath.parent.mkdir(exist_ok=True)
+        write_json_atomic(filepath, data, indent)
+        self._index_artifact(task_id, name, data)
+        return str(filepath)
+    
+    def _index_artifact(self, task_id: str, name: str, data: Any):
+        """Przenosi metadane zapisanego artefaktu do indeksu przebiegów (jeśli włączony)"""
+        if self.run_index is None:
+            return
+        fields = run_fields_from_artifact(name, data)
+        if fields:
+            self.run_index.update(task_id, fields)
+    
+    def _read_json(self, task_id: str, name: str) -> Optional[Dict[str, Any]]:
+        """Ładuje artefakt JSON zadania (None gdy brak)"""
+        filepath = self.base_dir / task_id / name
+        
+        if not filepath.exists():
+            return None
+        
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _iter_json(self, name: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Iteruje po artefaktach JSON o danej nazwie we wszystkich zadaniach (id zadania, dane)"""
+        for filepath in sorted(self.base_dir.glob(f"task_*/{name}")):
+            try:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    yield filepath.parent.name, json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+    
+    def save_task_output(self, task_id: str, output: str) -> str:
+        """Zapisuje sam output zadania (czysty wynik)"""
+        return self._write_text(task_id, "output.txt", output)
+    
     def save_task_result(self, task: Task, execution_time: float = 0.0) -> str:
         """Zapisuje wynik pojedynczego zadania"""
-        task_dir = self._get_task_dir(task.id)
-        
         task_data = {
             "id": task.id,
             "description": task.description,
@@ -59,24 +175,14 @@ class PersistenceManager:
             "subtasks_count": len(task.subtasks),
             "execution_time_seconds": execution_time,
             "created_at": task.created_at.isoformat() if task.created_at else None,
-            "metadata": task.metadata
+            "metadata": task.metadata if task.has_metadata else {}
         }
         
-        filename = "result.json"
-        filepath = task_dir / filename
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(task_data, f, indent=2, ensure_ascii=False)
-        
-        return str(filepath)
+        return self._write_json(task.id, "result.json", task_data)
     
     def save_execution_summary(self, task_id: str, task_description: str, 
                               stats: Dict[str, Any], execution_time: float) -> str:
         """Zapisuje podsumowanie wykonania zadania głównego"""
-        task_dir = self._get_task_dir(task_id)
-        logs_dir = task_dir / "execution_logs"
-        logs_dir.mkdir(exist_ok=True)
-        
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         summary = {
             "execution_id": f"{task_id}_{timestamp}",
@@ -87,37 +193,21 @@ class PersistenceManager:
             "statistics": stats
         }
         
-        filename = f"summary_{timestamp}.json"
-        filepath = logs_dir / filename
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, indent=2, ensure_ascii=False)
-        
-        return str(filepath)
+        return self._write_json(task_id, f"execution_logs/summary_{timestamp}.json", summary)
     
     def save_decomposition_stats(self, stats: Dict[str, Any], 
                                 task_id: str) -> str:
         """Zapisuje statystyki dekompozycji"""
-        task_dir = self._get_task_dir(task_id)
-        
         stat_data = {
             "task_id": task_id,
             "timestamp": datetime.now().isoformat(),
             "statistics": stats
         }
         
-        filename = "stats.json"
-        filepath = task_dir / filename
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(stat_data, f, indent=2, ensure_ascii=False)
-        
-        return str(filepath)
+        return self._write_json(task_id, "stats.json", stat_data)
     
     def save_task_hierarchy(self, task: Task, task_manager) -> str:
         """Zapisuje hierarchię wszystkich zadań"""
-        task_dir = self._get_task_dir(task.id)
-        
         def task_to_dict(t: Task) -> Dict[str, Any]:
             return {
                 "id": t.id,
@@ -127,7 +217,7 @@ class PersistenceManager:
                 "level": t.level,
                 "verified": t.is_verified(),
                 "subtasks": [task_to_dict(st) for st in t.subtasks],
-                "result_preview": t.result[:200] if t.result else None
+                "result_preview": t.result_preview(200)
             }
         
         hierarchy = {
@@ -138,19 +228,11 @@ class PersistenceManager:
             "timestamp": datetime.now().isoformat()
         }
         
-        filename = "hierarchy.json"
-        filepath = task_dir / filename
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(hierarchy, f, indent=2, ensure_ascii=False)
-        
-        return str(filepath)
+        return self._write_json(task.id, "hierarchy.json", hierarchy)
     
     def save_detailed_report(self, task: Task, task_manager, 
                             stats: Dict[str, Any], execution_time: float) -> str:
         """Zapisuje szczegółowy raport z wszystkimi informacjami"""
-        task_dir = self._get_task_dir(task.id)
-        
         def collect_all_tasks(t: Task, level: int = 0) -> List[Dict[str, Any]]:
             """Zbiera wszystkie zadania hierarchicznie"""
             tasks_list = [{
@@ -160,8 +242,8 @@ class PersistenceManager:
                 "type": t.task_type.value,
                 "status": t.status.value,
                 "verified": t.is_verified(),
-                "result_length": len(t.result) if t.result else 0,
-                "result_preview": (t.result[:300] + "...") if t.result and len(t.result) > 300 else t.result,
+                "result_length": t.result_length,
+                "result_preview": (t.result_preview(300) + "...") if t.result_length > 300 else t.result_preview(300),
                 "verification": t.verification_result,
                 "subtasks_count": len(t.subtasks)
             }]
@@ -182,48 +264,76 @@ class PersistenceManager:
             "all_tasks": collect_all_tasks(task),
             "task_summary": {
                 "total_created": len(task_manager.tasks),
-                "verified": len([t for t in task_manager.tasks.values() if t.is_verified()]),
-                "failed": len([t for t in task_manager.tasks.values() if t.status == TaskStatus.FAILED])
+                "verified": task_manager.count_by_status(TaskStatus.VERIFIED),
+                "failed": task_manager.count_by_status(TaskStatus.FAILED)
             },
-            "final_result": task.result if task.result else None
+            "final_result": task.result if task.has_result else None
         }
         
-        filename = "detailed_report.json"
-        filepath = task_dir / filename
+        return self._write_json(task.id, "detailed_report.json", report)
+    
+    def save_checkpoint(self, task: Task, task_manager) -> str:
+        """Zapisuje (atomowo) stan całego drzewa zadania głównego do checkpoint.json"""
+        tasks = task_manager.get_subtree(task.id)
+        checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "main_task_id": task.id,
+            "timestamp": datetime.now().isoformat(),
+            "tasks": [task_to_record(t) for t in tasks]
+        }
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+        return self._write_json(task.id, "checkpoint.json", checkpoint, indent=None)
+    
+    def load_checkpoint(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Ładuje punkt kontrolny zadania głównego (None gdy brak)"""
+        checkpoint = self._read_json(task_id, "checkpoint.json")
+        if checkpoint is None:
+            return None
+        if checkpoint.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Nieobsługiwana wersja punktu kontrolnego: {checkpoint.get('version')}")
+        return checkpoint
+    
+    def restore_task_manager(self, task_id: str) -> Optional[TaskManager]:
+        """Odtwarza TaskManager z punktu kontrolnego (None gdy brak)"""
+        checkpoint = self.load_checkpoint(task_id)
+        if checkpoint is None:
+            return None
         
-        return str(filepath)
+        task_manager = TaskManager(persistence_manager=self)
+        task_manager.restore_tasks([task_from_record(data) for data in checkpoint["tasks"]])
+        return task_manager
+    
+    def list_checkpoints(self) -> List[Dict[str, Any]]:
+        """Lista zadań głównych z punktem kontrolnym (do wznowienia)"""
+        checkpoints = []
+        for _, checkpoint in self._iter_json("checkpoint.json"):
+            tasks = checkpoint.get("tasks", [])
+            checkpoints.append({
+                "task_id": checkpoint.get("main_task_id"),
+                "description": tasks[0]["description"] if tasks else None,
+                "timestamp": checkpoint.get("timestamp"),
+                "total_tasks": len(tasks),
+                "verified": len([t for t in tasks if t["status"] == TaskStatus.VERIFIED.value])
+            })
+        return checkpoints
     
     def load_task_result(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Ładuje zapisany wynik zadania"""
-        filepath = self._get_task_dir(task_id) / "result.json"
-        
-        if not filepath.exists():
-            return None
-        
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return self._read_json(task_id, "result.json")
     
     def list_saved_results(self) -> List[Dict[str, Any]]:
         """Lista wszystkich zapisanych rezultatów"""
         results = []
         
-        # Iteruj po folderach zadań
-        for task_dir in self.base_dir.iterdir():
-            if task_dir.is_dir() and task_dir.name not in ['statistics', 'execution_logs']:
-                result_file = task_dir / "result.json"
-                if result_file.exists():
-                    with open(result_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        results.append({
-                            "filename": result_file.name,
-                            "task_id": data.get("id"),
-                            "description": data.get("description"),
-                            "status": data.get("status"),
-                            "verified": data.get("verification", {}).get("passed") if data.get("verification") else False
-                        })
+        # Iteruj po wynikach zadań
+        for _, data in self._iter_json("result.json"):
+            results.append({
+                "filename": "result.json",
+                "task_id": data.get("id"),
+                "description": data.get("description"),
+                "status": data.get("status"),
+                "verified": data.get("verification", {}).get("passed") if data.get("verification") else False
+            })
         
         return results
     
@@ -257,7 +367,6 @@ class PersistenceManager:
     def export_as_text_report(self, task: Task, stats: Dict[str, Any], 
                              execution_time: float) -> str:
         """Eksportuje wynik jako tekst (dla łatwego czytania)"""
-        task_dir = self._get_task_dir(task.id)
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         report = f"""
@@ -287,7 +396,7 @@ Maksymalny poziom: {stats.get('max_level_reached', 0)}
 ================================================================================
 WYNIK
 ================================================================================
-{task.result if task.result else "Brak wyniku"}
+{task.result if task.has_result else "Brak wyniku"}
 
 ================================================================================
 WERYFIKACJA
@@ -298,18 +407,12 @@ WERYFIKACJA
             v = task.verification_result
             report += f"""
 Status: {"PASS" if v.get('passed') else 'FAIL'}
-Ocena: {v.get('score', 0)}/10.0
+Ocena: {f"{v['score']}/10.0" if v.get('score') is not None else 'brak (weryfikacja pominięta)'}
 Feedback: {v.get('feedback', '')}
 Problemy: {', '.join(v.get('issues', [])) if v.get('issues') else 'Brak'}
 """
         
-        filename = "report.txt"
-        filepath = task_dir / filename
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(report)
-        
-        return str(filepath)
+        return self._write_text(task.id, "report.txt", report)
     
     def print_summary(self):
         """Wyświetla podsumowanie zapisanych plików"""
@@ -326,3 +429,75 @@ Problemy: {', '.join(v.get('issues', [])) if v.get('issues') else 'Brak'}
         print(f"Nieudane: {stats['failed_tasks']}")
         print(f"Logi wykonania: {stats['execution_logs']}")
         print(f"Pliki statystyk: {stats['stats_files']}{Style.RESET_ALL}\n")
+
+
+class CheckpointWriter:
+    """Słuchacz TaskManager zapisujący punkty kontrolne drzewa zadań.
+    
+    Każdy zapis obejmuje całe drzewo, więc wszystkie zmiany (także wyniki i statusy końcowe) są
+    grupowane: drzewo zapisywane jest najwyżej co `min_interval` sekund, a zmiany z tego okresu
+    trafiają do następnego zapisu lub do flush() na końcu przebiegu. Trwałość pojedynczych zmian
+    zapewnia dziennik zdarzeń (EVENT_LOG). Wątek, który trafi na trwający zapis, nie czeka na niego.
+    """
+    
+    def __init__(self, persistence: PersistenceManager, task_manager: TaskManager,
+                 min_interval: float = 1.0):
+        self.persistence = persistence
+        self.task_manager = task_manager
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._last_write = 0.0
+        self._pending: set = set()
+        self.counters: Dict[str, Any] = {"writes": 0, "skipped": 0, "failures": 0}
+        self._remove = task_manager.add_listener(self.on_change)
+    
+    def on_change(self, task: Task, change: str):
+        """Reaguje na zmianę zadania - zapis najwyżej co min_interval, inaczej odroczony"""
+        root = self.task_manager.get_root(task.id)
+        if root is None:
+            return
+        with self._lock:
+            self._pending.add(root.id)
+            if time.monotonic() - self._last_write < self.min_interval:
+                self.counters["skipped"] += 1
+                return
+        if not self._write_lock.acquire(blocking=False):
+            with self._lock:
+                self.counters["skipped"] += 1
+            return
+        try:
+            self._write_pending()
+        finally:
+            self._write_lock.release()
+    
+    def flush(self):
+        """Zapisuje odroczone punkty kontrolne (koniec przebiegu, przerwanie programu)"""
+        with self._write_lock:
+            self._write_pending()
+    
+    def close(self):
+        """Zapisuje zaległe zmiany i odłącza słuchacza"""
+        self.flush()
+        self._remove()
+    
+    def _write_pending(self):
+        """Zapisuje punkty kontrolne oczekujących drzew (pod _write_lock)"""
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+            self._last_write = time.monotonic()
+        for root_id in pending:
+            root = self.task_manager.get_task(root_id)
+            if root is None:
+                continue
+            try:
+                self.persistence.save_checkpoint(root, self.task_manager)
+            except OSError as e:
+                with self._lock:
+                    self.counters["failures"] += 1
+                    self._pending.add(root_id)
+                print(f"Błąd zapisu punktu kontrolnego {root_id}: {e}")
+                continue
+            with self._lock:
+                self.counters["writes"] += 1
@@ -0,0 +1,191 @@
+"""
+Moduł limitowania wywołań - token bucket (RPM/TPM), priorytety i backoff z jitterem
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from enum import IntEnum
+from typing import Any, Dict, Optional
+
+
+class Priority(IntEnum):
+    """Klasa priorytetu wywołania (niższa wartość = obsługiwane wcześniej)"""
+    VERIFICATION = 0
+    ANALYSIS = 1
+    DECOMPOSITION = 2
+    EXECUTION = 3
+
+
+class TokenBucket:
+    """Wiadro tokenów uzupełniane w stałym tempie"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.refill_per_second = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        """Uzupełnia tokeny od ostatniej aktualizacji"""
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+            self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Ile sekund trzeba czekać na `amount` tokenów (0 = dostępne od razu)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float):
+        """Pobiera tokeny (może zejść poniżej zera przy korekcie zużycia)"""
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        """Zwraca niewykorzystane tokeny"""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ProviderScheduler:
+    """Harmonogram wywołań dostawcy - limity RPM/TPM, priorytety i polityka ponowień"""
+
+    # Czas odpytywania gdy czekamy na zadanie o wyższym priorytecie
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._waiters: list = []
+        self._sequence = itertools.count()
+        self.counters: Dict[str, Any] = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "waited_seconds": 0.0
+        }
+
+    def _try_acquire(self, ticket: tuple, tokens: float) -> float:
+        """Próbuje przydzielić slot (pod blokadą); zwraca 0 lub czas oczekiwania"""
+        if self._waiters[0] != ticket:
+            return self.POLL_INTERVAL
+        now = time.monotonic()
+        wait = 0.0
+        if self.request_bucket is not None:
+            wait = max(wait, self.request_bucket.wait_time(1, now))
+        if self.token_bucket is not None:
+            wait = max(wait, self.token_bucket.wait_time(tokens, now))
+        if wait > 0:
+            return wait
+        if self.request_bucket is not None:
+            self.request_bucket.consume(1)
+        if self.token_bucket is not None:
+            self.token_bucket.consume(tokens)
+        heapq.heappop(self._waiters)
+        self.counters["requests"] += 1
+        return 0.0
+
+    def _abandon(self, ticket: tuple):
+        """Usuwa bilet przerwanego oczekiwania (pod blokadą), żeby nie blokował kolejnych"""
+        if ticket in self._waiters:
+            self._waiters.remove(ticket)
+            heapq.heapify(self._waiters)
+        self._condition.notify_all()
+
+    def acquire(self, priority: Priority = Priority.EXECUTION, tokens: float = 0):
+        """Blokuje wątek do czasu przydzielenia slotu zgodnie z priorytetem"""
+        started = time.monotonic()
+        with self._condition:
+            ticket = (int(priority), next(self._sequence))
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    wait = self._try_acquire(ticket, tokens)
+                    if wait == 0:
+                        break
+                    self._condition.wait(timeout=wait)
+                self.counters["waited_seconds"] += time.monotonic() - started
+            finally:
+                self._abandon(ticket)
+
+    async def aacquire(self, priority: Priority = Priority.EXECUTION, tokens: float = 0):
+        """Asynchroniczna wersja acquire (nie blokuje pętli zdarzeń)"""
+        started = time.monotonic()
+        with self._lock:
+            ticket = (int(priority), next(self._sequence))
+            heapq.heappush(self._waiters, ticket)
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_acquire(ticket, tokens)
+                    if wait == 0:
+                        self.counters["waited_seconds"] += time.monotonic() - started
+                        return
+                await asyncio.sleep(min(wait, self.POLL_INTERVAL * 4))
+        finally:
+            # Anulowane lub przerwane oczekiwanie nie może zostać na czele kolejki
+            with self._lock:
+                self._abandon(ticket)
+
+    def record_usage(self, estimated_tokens: float, actual_tokens: Optional[int]):
+        """Koryguje wiadro TPM o różnicę między szacunkiem a faktycznym zużyciem"""
+        if self.token_bucket is None or actual_tokens is None:
+            return
+        with self._lock:
+            difference = actual_tokens - estimated_tokens
+            if difference > 0:
+                self.token_bucket.consume(difference)
+            else:
+                self.token_bucket.refund(-difference)
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Czas oczekiwania przed ponowieniem (Retry-After lub wykładniczy z pełnym jitterem)"""
+        with self._lock:
+            self.counters["retries"] += 1
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def note_rate_limited(self):
+        """Zlicza odpowiedź 429 od dostawcy"""
+        with self._lock:
+            self.counters["rate_limited"] += 1
+
+
+def estimate_tokens(text: str) -> int:
+    """Przybliżona liczba tokenów (~4 znaki na token)"""
+    return max(1, len(text) // 4)
+
+
+_schedulers: Dict[str, ProviderScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def scheduler_from_env(provider: str) -> Optional[ProviderScheduler]:
+    """Zwraca współdzielony harmonogram dla providera na podstawie RATE_LIMIT_* (None gdy brak limitów)"""
+    prefix = provider.upper()
+    rpm = os.getenv(f"{prefix}_RATE_LIMIT_RPM") or os.getenv("RATE_LIMIT_RPM")
+    tpm = os.getenv(f"{prefix}_RATE_LIMIT_TPM") or os.getenv("RATE_LIMIT_TPM")
+    if not rpm and not tpm:
+        return None
+    with _schedulers_lock:
+        if provider not in _schedulers:
+            _schedulers[provider] = ProviderScheduler(
+                requests_per_minute=float(rpm) if rpm else None,
+                tokens_per_minute=float(tpm) if tpm else None,
+                max_retries=int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5"))
+            )
+        return _schedulers[provider]
@@ -0,0 +1,104 @@
+"""
+Moduł naprawy poddrzew - ponowne wykonanie nieudanych liści (z uwagami weryfikatora, opcjonalnie
+mocniejszym modelem) i ponowna agregacja ich rodziców w ramach budżetu prób
+"""
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .task_manager import Task, TaskStatus
+
+# Ile znaków poprzedniego (odrzuconego) wyniku trafia do kontekstu naprawy
+_PREVIOUS_RESULT_PREVIEW = 500
+
+
+class RepairPolicy:
+    """Budżet napraw: najwyżej `max_attempts` prób na zadanie i `budget` prób w całym przebiegu.
+
+    Próbą jest ponowne wykonanie liścia albo ponowna agregacja i weryfikacja rodzica.
+    `use_feedback` dołącza do kontekstu ocenę weryfikatora i początek odrzuconego wyniku,
+    `model` (jeśli ustawiony) wykonuje naprawy innym, zwykle mocniejszym modelem.
+    """
+
+    def __init__(self, max_attempts: int = 1, budget: int = 10, use_feedback: bool = True,
+                 model: Optional[str] = None):
+        self.max_attempts = max_attempts
+        self.budget = budget
+        self.use_feedback = use_feedback
+        self.model = model
+        self._lock = threading.Lock()
+        self._attempts: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {
+            "attempts": 0,
+            "leaves_repaired": 0,
+            "leaves_failed": 0,
+            "parents_reaggregated": 0,
+            "parents_recovered": 0,
+            "subtrees_recovered": 0,
+            "budget_exhausted": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_attempts > 0 and self.budget > 0
+
+    def acquire(self, task: Task) -> bool:
+        """Rezerwuje próbę naprawy zadania (False - wyczerpany limit zadania lub budżet przebiegu)"""
+        with self._lock:
+            if self._attempts.get(task.id, 0) >= self.max_attempts:
+                return False
+            if self.counters["attempts"] >= self.budget:
+                self.counters["budget_exhausted"] += 1
+                return False
+            self._attempts[task.id] = self._attempts.get(task.id, 0) + 1
+            self.counters["attempts"] += 1
+            return True
+
+    def record(self, key: str):
+        """Zwiększa licznik wyniku naprawy"""
+        with self._lock:
+            self.counters[key] += 1
+
+    def repair_context(self, task: Task) -> Dict[str, str]:
+        """Dodatkowy kontekst naprawy: uwagi weryfikatora i początek odrzuconego wyniku"""
+        if not self.use_feedback:
+            return {}
+        context = {}
+        verification = task.verification_result or {}
+        notes = [verification.get("feedback") or ""] + list(verification.get("issues") or [])
+        notes = [note for note in notes if note]
+        if notes:
+            context["verifier_feedback"] = " | ".join(notes)
+        if task.has_result:
+            context["previous_result"] = task.result_preview(_PREVIOUS_RESULT_PREVIEW)
+        return context
+
+
+def failed_subtree(task: Task) -> Tuple[List[Task], List[Task]]:
+    """Nieudane liście i nieudani rodzice (od najgłębszych) w poddrzewach nieudanych podzadań"""
+    leaves: List[Task] = []
+    parents: List[Task] = []
+
+    def visit(node: Task):
+        if node.status != TaskStatus.FAILED:
+            return
+        if not node.subtasks:
+            leaves.append(node)
+            return
+        for child in node.subtasks:
+            visit(child)
+        parents.append(node)
+
+    for subtask in task.subtasks:
+        visit(subtask)
+    return leaves, parents
+
+
+def repair_policy_from_env() -> RepairPolicy:
+    """Tworzy politykę napraw na podstawie REPAIR_ATTEMPTS, REPAIR_BUDGET, REPAIR_FEEDBACK i REPAIR_MODEL"""
+    return RepairPolicy(
+        max_attempts=int(os.getenv("REPAIR_ATTEMPTS", "1")),
+        budget=int(os.getenv("REPAIR_BUDGET", "10")),
+        use_feedback=os.getenv("REPAIR_FEEDBACK", "1").lower() in ("1", "true", "tak"),
+        model=os.getenv("REPAIR_MODEL") or None
+    )
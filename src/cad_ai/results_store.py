@@ -0,0 +1,183 @@
+"""
+Moduł magazynu wyników w SQLite - alternatywa dla plików results/task_* za tym samym
+interfejsem PersistenceManager (jedna baza w trybie WAL, listy wyników jednym zapytaniem)
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from .persistence import PersistenceManager
+from .run_index import RUN_INDEX_NAME, RunIndex, run_fields_from_artifact
+
+RESULTS_DB_NAME = "results.sqlite"
+
+
+class ResultsStore(RunIndex):
+    """Baza wyników: tabela runs (indeks przebiegów) i artifacts (treść plików)"""
+
+    def __init__(self, db_path: str):
+        super().__init__(db_path)
+        with self._lock:
+            self._db.executescript(
+                """CREATE TABLE IF NOT EXISTS artifacts (
+                    task_id TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    is_json INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (task_id, name)
+                );
+                CREATE INDEX IF NOT EXISTS idx_artifacts_name ON artifacts(name, task_id);"""
+            )
+            self._db.commit()
+
+    def put_artifact(self, task_id: str, name: str, content: str, is_json: bool,
+                     run_fields: Optional[Dict[str, Any]] = None, timestamp: Optional[float] = None):
+        """Zapisuje artefakt i (opcjonalnie) aktualizuje metadane przebiegu w jednej transakcji"""
+        now = timestamp or time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO artifacts (task_id, name, content, is_json, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(task_id, name) DO UPDATE SET content = excluded.content, "
+                "is_json = excluded.is_json, updated_at = excluded.updated_at",
+                (task_id, name, content, int(is_json), now)
+            )
+            self._upsert_run(task_id, run_fields or {}, now)
+
+    def get_artifact(self, task_id: str, name: str) -> Optional[Any]:
+        """Zwraca artefakt (JSON zdekodowany) albo None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content, is_json FROM artifacts WHERE task_id = ? AND name = ?", (task_id, name)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row["content"]) if row["is_json"] else row["content"]
+
+    def get_artifacts(self, task_id: str, names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Zwraca artefakty zadania (wszystkie lub wskazane) jako słownik nazwa -> treść"""
+        query = "SELECT name, content, is_json FROM artifacts WHERE task_id = ?"
+        params: List[Any] = [task_id]
+        if names:
+            query += f" AND name IN ({', '.join('?' for _ in names)})"
+            params.extend(names)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return {row["name"]: json.loads(row["content"]) if row["is_json"] else row["content"] for row in rows}
+
+    def iter_artifacts(self, name: str) -> Iterator[Tuple[str, Any]]:
+        """Iteruje po artefaktach o danej nazwie we wszystkich zadaniach (id zadania, treść)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT task_id, content, is_json FROM artifacts WHERE name = ? ORDER BY task_id", (name,)
+            ).fetchall()
+        for row in rows:
+            yield row["task_id"], json.loads(row["content"]) if row["is_json"] else row["content"]
+
+    def statistics(self) -> Dict[str, int]:
+        """Podsumowanie magazynu w dwóch zapytaniach agregujących"""
+        with self._lock:
+            runs = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(verified), 0), COALESCE(SUM(status = 'failed'), 0) FROM runs"
+            ).fetchone()
+            artifacts = self._db.execute(
+                "SELECT COALESCE(SUM(name LIKE 'execution_logs/%'), 0), COALESCE(SUM(name = 'stats.json'), 0) "
+                "FROM artifacts"
+            ).fetchone()
+        return {
+            "total_tasks_saved": runs[0],
+            "verified_tasks": runs[1],
+            "failed_tasks": runs[2],
+            "execution_logs": artifacts[0],
+            "stats_files": artifacts[1]
+        }
+
+    def task_ids(self) -> List[str]:
+        """Identyfikatory zadań obecnych w magazynie"""
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT DISTINCT task_id FROM artifacts")]
+
+    def _stored_task_ids(self) -> Set[str]:
+        """Przebiegi z artefaktami w bazie - zostają w indeksie także bez katalogu results/task_*"""
+        return set(self.task_ids())
+
+
+class SQLitePersistenceManager(PersistenceManager):
+    """PersistenceManager zapisujący artefakty do results/results.sqlite zamiast plików w results/task_*"""
+
+    def __init__(self, base_dir: str = "results", db_name: str = RESULTS_DB_NAME, id_block_size: int = 64):
+        super().__init__(base_dir, id_block_size=id_block_size)
+        self.store = ResultsStore(str(self.base_dir / db_name))
+
+    def _location(self, task_id: str, name: str) -> str:
+        """Opis lokalizacji artefaktu w bazie (do logów)"""
+        return f"{self.store.db_path}::{task_id}/{name}"
+
+    def _write_text(self, task_id: str, name: str, content: str) -> str:
+        self.store.put_artifact(task_id, name, content, is_json=False,
+                                run_fields=run_fields_from_artifact(name, content))
+        return self._location(task_id, name)
+
+    def _write_json(self, task_id: str, name: str, data: Dict[str, Any],
+                    indent: Optional[int] = 2) -> str:
+        # W bazie zawsze zwarty JSON - wcięcia tylko zwiększają rozmiar
+        self.store.put_artifact(task_id, name, json.dumps(data, ensure_ascii=False), is_json=True,
+                                run_fields=run_fields_from_artifact(name, data))
+        return self._location(task_id, name)
+
+    def _read_json(self, task_id: str, name: str) -> Optional[Dict[str, Any]]:
+        return self.store.get_artifact(task_id, name)
+
+    def _iter_json(self, name: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        return self.store.iter_artifacts(name)
+
+    def import_artifact(self, task_id: str, name: str, data: Any, is_json: bool,
+                        timestamp: Optional[float] = None) -> str:
+        """Zapisuje gotowy artefakt (np. przeniesiony z plików results/task_*) z jego czasem modyfikacji"""
+        content = json.dumps(data, ensure_ascii=False) if is_json else data
+        self.store.put_artifact(task_id, name, content, is_json,
+                                run_fields=run_fields_from_artifact(name, data), timestamp=timestamp)
+        return self._location(task_id, name)
+
+    def get_next_task_counter(self) -> int:
+        """Najwyższy numer zadania - katalogi (np. dzienniki zdarzeń) i zadania zapisane w bazie"""
+        max_counter = super().get_next_task_counter()
+        for task_id in self.store.task_ids():
+            try:
+                max_counter = max(max_counter, int(task_id.split("_")[1]))
+            except (ValueError, IndexError):
+                pass
+        return max_counter
+
+    def list_saved_results(self) -> List[Dict[str, Any]]:
+        """Lista zapisanych przebiegów - jedno zapytanie zamiast odczytu plików"""
+        return [{
+            "filename": RESULTS_DB_NAME,
+            "task_id": run["task_id"],
+            "description": run["description"],
+            "status": run["status"],
+            "verified": run["verified"]
+        } for run in self.store.list_runs()]
+
+    def get_statistics_summary(self) -> Dict[str, Any]:
+        """Podsumowanie statystyk z zapytań agregujących"""
+        return self.store.statistics()
+
+
+def persistence_from_env(base_dir: str = "results") -> PersistenceManager:
+    """Tworzy PersistenceManager wg RESULTS_BACKEND ("files" - domyślnie, "sqlite");
+    pliki dostają indeks przebiegów results/results_index.sqlite, o ile RESULTS_INDEX nie jest wyłączony"""
+    backend = os.getenv("RESULTS_BACKEND", "files").lower()
+    # Liczba numerów zadań rezerwowanych naraz z sekwencji results/task_ids.sqlite
+    id_block_size = int(os.getenv("TASK_ID_BLOCK", "64"))
+    if backend == "sqlite":
+        # Tabela runs magazynu jest jednocześnie indeksem przebiegów
+        return SQLitePersistenceManager(base_dir, id_block_size=id_block_size)
+    if backend != "files":
+        raise ValueError(f"Nieznany RESULTS_BACKEND: {backend} (dostępne: files, sqlite)")
+    run_index = None
+    if os.getenv("RESULTS_INDEX", "1").lower() in ("1", "true", "tak"):
+        run_index = RunIndex(str(Path(base_dir) / RUN_INDEX_NAME))
+    return PersistenceManager(base_dir, run_index=run_index, id_block_size=id_block_size)
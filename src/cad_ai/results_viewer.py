@@ -68,7 +68,8 @@ def view_task_result(task_id: str):
         v = data['verification']
         print(f"\n{Fore.WHITE}Weryfikacja:{Style.RESET_ALL}")
         print(f"  Status: {Fore.GREEN if v.get('passed') else Fore.RED}{'PASS' if v.get('passed') else 'FAIL'}{Style.RESET_ALL}")
-        print(f"  Ocena: {v.get('score', 0)}/10.0")
+        if v.get('score') is not None:
+            print(f"  Ocena: {v['score']}/10.0")
         print(f"  Feedback: {v.get('feedback', '')}")
     
     if data.get('result'):
@@ -0,0 +1,272 @@
+"""
+Moduł indeksu przebiegów - tabela runs w SQLite z metadanymi wyników (aktualizowana przy zapisie,
+uzupełniana z katalogów results/task_*) i stronicowaniem kursorem po indeksach
+"""
+import base64
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+RUN_INDEX_NAME = "results_index.sqlite"
+
+# Kolumny listy przebiegów, po których można sortować -> wyrażenie SQL (z indeksem)
+RUN_SORT_COLUMNS = {
+    # Długość przed tekstem - task_10000 po task_9999 mimo dopełnienia zerami tylko do 4 cyfr
+    "task_id": "LENGTH(task_id)",
+    "updated_at": "updated_at",
+    "created_at": "created_at",
+    "score": "COALESCE(score, 0)"
+}
+
+# Artefakty katalogu zadania czytane przy przebudowie indeksu (późniejsze nadpisują wcześniejsze)
+_INDEXED_FILES = ("checkpoint.json", "detailed_report.json", "result.json", "output.txt")
+
+_RUN_COLUMNS = ("description", "status", "verified", "score", "total_tasks", "execution_time", "preview")
+
+
+def run_fields_from_artifact(name: str, data: Any) -> Dict[str, Any]:
+    """Wyciąga indeksowane metadane przebiegu z zapisywanego artefaktu"""
+    if name == "output.txt":
+        return {"preview": data[:200]}
+    if name == "result.json":
+        verification = data.get("verification") or {}
+        return {"description": data.get("description"), "status": data.get("status"),
+                "verified": verification.get("passed", False), "score": verification.get("score")}
+    if name == "detailed_report.json":
+        info = data.get("execution_info", {})
+        main = (data.get("all_tasks") or [{}])[0]
+        verification = main.get("verification") or {}
+        return {"description": info.get("main_task_description"), "status": main.get("status"),
+                "verified": main.get("verified"), "score": verification.get("score"),
+                "total_tasks": data.get("task_summary", {}).get("total_created"),
+                "execution_time": info.get("execution_time_seconds")}
+    if name == "checkpoint.json":
+        tasks = data.get("tasks") or [{}]
+        return {"description": tasks[0].get("description"), "status": tasks[0].get("status"),
+                "total_tasks": len(data.get("tasks") or [])}
+    return {}
+
+
+def encode_cursor(value: Any, task_id: str) -> str:
+    """Kursor strony: wartość kolumny sortowania i id ostatniego zwróconego przebiegu"""
+    return base64.urlsafe_b64encode(json.dumps([value, task_id]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """Odczytuje kursor zwrócony przez page_runs"""
+    try:
+        value, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Nieprawidłowy kursor: {cursor}") from e
+    return value, task_id
+
+
+class RunIndex:
+    """Indeks przebiegów: jeden wiersz na zadanie główne, zapytania listy tylko po indeksach"""
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """CREATE TABLE IF NOT EXISTS runs (
+                task_id TEXT PRIMARY KEY,
+                description TEXT,
+                status TEXT,
+                verified INTEGER NOT NULL DEFAULT 0,
+                score REAL,
+                total_tasks INTEGER,
+                execution_time REAL,
+                preview TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_status ON runs(status, updated_at);
+            CREATE INDEX IF NOT EXISTS idx_runs_verified ON runs(verified, updated_at);
+            CREATE INDEX IF NOT EXISTS idx_runs_updated ON runs(updated_at, task_id);
+            CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created_at, task_id);
+            CREATE INDEX IF NOT EXISTS idx_runs_score ON runs(COALESCE(score, 0), task_id);
+            CREATE INDEX IF NOT EXISTS idx_runs_id ON runs(LENGTH(task_id), task_id);"""
+        )
+        # Bazy sprzed przebudowy z plików nie mają kolumny czasu indeksowania
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(runs)")}
+        if "indexed_at" not in columns:
+            self._db.execute("ALTER TABLE runs ADD COLUMN indexed_at REAL")
+        self._db.commit()
+
+    def update(self, task_id: str, fields: Dict[str, Any], timestamp: Optional[float] = None):
+        """Tworzy lub uzupełnia wiersz przebiegu (wywoływane przy każdym zapisie artefaktu)"""
+        with self._lock, self._db:
+            self._upsert_run(task_id, fields, timestamp or time.time())
+
+    def _upsert_run(self, task_id: str, fields: Dict[str, Any], now: float,
+                    created_at: Optional[float] = None):
+        """Tworzy lub uzupełnia wiersz przebiegu - puste pola nie nadpisują znanych wartości (pod blokadą)"""
+        values = [fields.get(column) for column in _RUN_COLUMNS]
+        if values[2] is not None:
+            values[2] = int(bool(values[2]))
+        self._db.execute(
+            f"INSERT INTO runs (task_id, {', '.join(_RUN_COLUMNS)}, created_at, updated_at, indexed_at) "
+            f"VALUES (?, ?, ?, COALESCE(?, 0), ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(task_id) DO UPDATE SET "
+            + ", ".join(f"{column} = COALESCE(?, runs.{column})" for column in _RUN_COLUMNS)
+            + ", updated_at = MAX(runs.updated_at, excluded.updated_at), indexed_at = excluded.indexed_at",
+            (task_id, *values, created_at or now, now, time.time(), *values)
+        )
+
+    def _run_filters(self, status: Optional[str] = None, verified: Optional[bool] = None,
+                     search: Optional[str] = None, min_score: Optional[float] = None,
+                     max_score: Optional[float] = None, since: Optional[float] = None,
+                     until: Optional[float] = None) -> Tuple[List[str], List[Any]]:
+        """Warunki WHERE listy przebiegów"""
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if verified is not None:
+            clauses.append("verified = ?")
+            params.append(int(verified))
+        if min_score is not None:
+            clauses.append("COALESCE(score, 0) >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            clauses.append("COALESCE(score, 0) <= ?")
+            params.append(max_score)
+        if since is not None:
+            clauses.append("updated_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("updated_at <= ?")
+            params.append(until)
+        if search:
+            clauses.append("(description LIKE ? OR task_id LIKE ?)")
+            params.extend([f"%{search}%"] * 2)
+        return clauses, params
+
+    def page_runs(self, limit: int = 50, cursor: Optional[str] = None, order_by: str = "task_id",
+                  descending: bool = True, **filters) -> Dict[str, Any]:
+        """Strona przebiegów (keyset po kolumnie sortowania i task_id) z kursorem następnej strony"""
+        if order_by not in RUN_SORT_COLUMNS:
+            raise ValueError(f"Nieobsługiwana kolumna sortowania: {order_by}")
+        expression = RUN_SORT_COLUMNS[order_by]
+        clauses, params = self._run_filters(**filters)
+        if cursor:
+            # Kontynuacja za ostatnim wierszem poprzedniej strony - bez OFFSET, koszt zależy od limitu
+            clauses.append(f"({expression}, task_id) {'<' if descending else '>'} (?, ?)")
+            params.extend(decode_cursor(cursor))
+        direction = "DESC" if descending else "ASC"
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        query = (f"SELECT *, {expression} AS sort_key FROM runs{where} "
+                 f"ORDER BY {expression} {direction}, task_id {direction} LIMIT ?")
+        with self._lock:
+            rows = self._db.execute(query, params + [limit + 1]).fetchall()
+        runs = [self._run_dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last["sort_key"], last["task_id"])
+        return {"runs": runs, "next_cursor": next_cursor}
+
+    def list_runs(self, order_by: str = "task_id", descending: bool = True,
+                  limit: Optional[int] = None, **filters) -> List[Dict[str, Any]]:
+        """Lista przebiegów z filtrowaniem i sortowaniem (bez limitu - wszystkie)"""
+        if order_by not in RUN_SORT_COLUMNS:
+            raise ValueError(f"Nieobsługiwana kolumna sortowania: {order_by}")
+        clauses, params = self._run_filters(**filters)
+        direction = "DESC" if descending else "ASC"
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        query = f"SELECT * FROM runs{where} ORDER BY {RUN_SORT_COLUMNS[order_by]} {direction}, task_id {direction}"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [self._run_dict(row) for row in rows]
+
+    def count_runs(self, **filters) -> int:
+        """Liczba przebiegów spełniających filtry"""
+        clauses, params = self._run_filters(**filters)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM runs{where}", params).fetchone()[0]
+
+    @staticmethod
+    def _run_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        """Wiersz przebiegu jako słownik (bez kolumn technicznych)"""
+        run = {column: row[column] for column in ("task_id", *_RUN_COLUMNS, "created_at", "updated_at")}
+        run["verified"] = bool(run["verified"])
+        return run
+
+    def _stored_task_ids(self) -> Set[str]:
+        """Przebiegi przechowywane poza katalogami results/task_* (nieusuwane przy przebudowie)"""
+        return set()
+
+    def rebuild_from_files(self, results_dir: str) -> Dict[str, int]:
+        """Uzupełnia indeks z katalogów results/task_* - czyta tylko katalogi zmienione od ostatniego
+        indeksowania i usuwa wiersze przebiegów, których katalogi zniknęły"""
+        counters = {"dirs": 0, "indexed": 0, "unchanged": 0, "removed": 0}
+        results_path = Path(results_dir)
+        with self._lock:
+            indexed = {row[0]: row[1] for row in self._db.execute("SELECT task_id, indexed_at FROM runs")}
+
+        task_ids = set()
+        if results_path.exists():
+            for task_dir in results_path.iterdir():
+                if not task_dir.is_dir() or not task_dir.name.startswith("task_"):
+                    continue
+                counters["dirs"] += 1
+                task_ids.add(task_dir.name)
+                stat = task_dir.stat()
+                modified = stat.st_mtime
+                paths = [task_dir / name for name in _INDEXED_FILES]
+                for path in paths:
+                    try:
+                        modified = max(modified, path.stat().st_mtime)
+                    except FileNotFoundError:
+                        continue
+                indexed_at = indexed.get(task_dir.name)
+                if indexed_at is not None and modified <= indexed_at:
+                    counters["unchanged"] += 1
+                    continue
+                fields = self._read_run_fields(paths)
+                if not fields:
+                    continue
+                with self._lock, self._db:
+                    self._upsert_run(task_dir.name, fields, modified, created_at=stat.st_ctime)
+                counters["indexed"] += 1
+
+        stale = set(indexed) - task_ids - self._stored_task_ids()
+        if stale:
+            with self._lock, self._db:
+                self._db.executemany("DELETE FROM runs WHERE task_id = ?", [(task_id,) for task_id in stale])
+            counters["removed"] = len(stale)
+        return counters
+
+    @staticmethod
+    def _read_run_fields(paths: List[Path]) -> Dict[str, Any]:
+        """Metadane przebiegu z plików katalogu zadania (pominięte pliki brakujące lub uszkodzone)"""
+        fields: Dict[str, Any] = {}
+        for path in paths:
+            if not path.exists():
+                continue
+            try:
+                content = path.read_text(encoding="utf-8")
+                data = content if path.suffix == ".txt" else json.loads(content)
+            except (OSError, UnicodeDecodeError, json.JSONDecodeError):
+                continue
+            fields.update({key: value for key, value in run_fields_from_artifact(path.name, data).items()
+                           if value is not None})
+        return fields
+
+    def close(self):
+        """Zamyka połączenie z bazą"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,11 +1,14 @@
 """
 Moduł zarządzania zadaniami - hierarchiczna struktura zadań
 """
-from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any
+import threading
+import time
+from typing import Callable, List, Optional, Dict, Any, Tuple, Union
 from datetime import datetime
 from enum import Enum
 
+from .aggregation import ResultRope
+
 
 class TaskStatus(Enum):
     """Status zadania"""
@@ -24,24 +27,156 @@ class TaskType(Enum):
     ATOMIC = "atomic"
 
 
-@dataclass
+# Kody enumów przechowywane w zadaniu jako małe liczby całkowite (indeks w krotce)
+_STATUSES = tuple(TaskStatus)
+_STATUS_CODES = {status: code for code, status in enumerate(_STATUSES)}
+_TYPES = tuple(TaskType)
+_TYPE_CODES = {task_type: code for code, task_type in enumerate(_TYPES)}
+
+_NO_SUBTASKS: Tuple['Task', ...] = ()
+
+
 class Task:
-    """Reprezentacja pojedynczego zadania"""
-    id: str
-    description: str
-    task_type: TaskType
-    status: TaskStatus = TaskStatus.CREATED
-    level: int = 0
-    parent_id: Optional[str] = None
-    subtasks: List['Task'] = field(default_factory=list)
-    result: Optional[str] = None
-    verification_result: Optional[Dict[str, Any]] = None
-    created_at: datetime = field(default_factory=datetime.now)
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    
+    """Reprezentacja pojedynczego zadania.
+
+    Zwarta postać dla drzew liczących dziesiątki tysięcy węzłów: __slots__ zamiast __dict__,
+    status i typ jako kody liczbowe, czas utworzenia jako znacznik float, a lista podzadań
+    i słownik metadanych tworzone dopiero przy pierwszym użyciu (liście ich nie mają).
+    """
+    __slots__ = ("id", "description", "level", "parent_id", "verification_result",
+                 "_result", "_type", "_status", "_created", "_children", "_metadata", "_manager")
+
+    def __init__(self, id: str, description: str, task_type: TaskType,
+                 status: TaskStatus = TaskStatus.CREATED, level: int = 0,
+                 parent_id: Optional[str] = None, subtasks: Optional[List['Task']] = None,
+                 result: Union[str, ResultRope, None] = None, verification_result: Optional[Dict[str, Any]] = None,
+                 created_at: Union[datetime, float, None] = None,
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.id = id
+        self.description = description
+        self.level = level
+        self.parent_id = parent_id
+        self._result = result
+        self.verification_result = verification_result
+        self._type = _TYPE_CODES[task_type]
+        self._status = _STATUS_CODES[status]
+        if created_at is None:
+            self._created = time.time()
+        elif isinstance(created_at, datetime):
+            self._created = created_at.timestamp()
+        else:
+            self._created = float(created_at)
+        self._children: Optional[List['Task']] = list(subtasks) if subtasks else None
+        self._metadata: Optional[Dict[str, Any]] = metadata or None
+        # TaskManager utrzymujący indeksy zadania (None dla zadań spoza managera)
+        self._manager: Optional['TaskManager'] = None
+
+    @property
+    def task_type(self) -> TaskType:
+        return _TYPES[self._type]
+
+    @task_type.setter
+    def task_type(self, task_type: TaskType):
+        self._type = _TYPE_CODES[task_type]
+
+    @property
+    def status(self) -> TaskStatus:
+        return _STATUSES[self._status]
+
+    @status.setter
+    def status(self, status: TaskStatus):
+        code = _STATUS_CODES[status]
+        if code == self._status:
+            return
+        old_code, self._status = self._status, code
+        if self._manager is not None:
+            self._manager._reindex_status(self, old_code)
+
+    @property
+    def result(self) -> Optional[str]:
+        """Tekst wyniku - dla rodzica z wynikiem zagregowanym (ResultRope) składany przy odczycie"""
+        if isinstance(self._result, ResultRope):
+            return self._result.materialize(self._resolver())
+        return self._result
+
+    @result.setter
+    def result(self, result: Union[str, ResultRope, None]):
+        self._result = result
+
+    @property
+    def stored_result(self) -> Union[str, ResultRope, None]:
+        """Wynik w postaci przechowywanej (tekst albo ResultRope) - bez składania tekstu"""
+        return self._result
+
+    @property
+    def has_result(self) -> bool:
+        """Czy zadanie ma niepusty wynik (bez składania tekstu)"""
+        return bool(self._result)
+
+    @property
+    def result_length(self) -> int:
+        """Długość tekstu wyniku (bez składania tekstu)"""
+        if isinstance(self._result, ResultRope):
+            return self._result.length
+        return len(self._result) if self._result else 0
+
+    def result_preview(self, limit: int) -> Optional[str]:
+        """Początek tekstu wyniku (najwyżej `limit` znaków), None gdy brak wyniku"""
+        if not self._result:
+            return None
+        if isinstance(self._result, ResultRope):
+            return self._result.prefix(self._resolver(), limit)
+        return self._result[:limit]
+
+    def _resolver(self) -> Callable[[str], Optional['Task']]:
+        """Odnajduje podzadania wskazane w ResultRope - przez TaskManager albo w poddrzewie zadania"""
+        if self._manager is not None:
+            return self._manager.get_task
+        subtree = {}
+        pending = [self]
+        while pending:
+            node = pending.pop()
+            subtree[node.id] = node
+            pending.extend(node.subtasks)
+        return subtree.get
+
+    @property
+    def created_at(self) -> datetime:
+        return datetime.fromtimestamp(self._created)
+
+    @created_at.setter
+    def created_at(self, created_at: datetime):
+        self._created = created_at.timestamp()
+
+    @property
+    def created_ts(self) -> float:
+        """Czas utworzenia jako znacznik czasu (bez tworzenia obiektu datetime)"""
+        return self._created
+
+    @property
+    def subtasks(self) -> List['Task']:
+        return self._children if self._children is not None else _NO_SUBTASKS
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, metadata: Dict[str, Any]):
+        self._metadata = metadata or None
+
+    @property
+    def has_metadata(self) -> bool:
+        """Czy zadanie ma metadane (sprawdzenie bez tworzenia pustego słownika)"""
+        return bool(self._metadata)
+
     def add_subtask(self, subtask: 'Task'):
         """Dodaje podzadanie"""
-        self.subtasks.append(subtask)
+        if self._children is None:
+            self._children = []
+        self._children.append(subtask)
         
     def is_completed(self) -> bool:
         """Sprawdza czy zadanie jest ukończone"""
@@ -65,74 +200,187 @@ class Task:
             'subtasks_count': len(self.subtasks)
         }
 
+    def __repr__(self) -> str:
+        return (f"Task(id={self.id!r}, description={self.description!r}, task_type={self.task_type}, "
+                f"status={self.status}, level={self.level}, parent_id={self.parent_id!r}, "
+                f"subtasks={len(self.subtasks)})")
+
+
+# Słuchacz zmian otrzymuje zadanie i rodzaj zmiany: "created", "status", "result", "verification"
+TaskListener = Callable[[Task, str], None]
+
 
 class TaskManager:
     """Manager do zarządzania hierarchią zadań"""
     
     def __init__(self, persistence_manager=None):
         self.tasks: Dict[str, Task] = {}
-        # Załaduj counter z istniejących zadań
-        if persistence_manager:
-            self.task_counter = persistence_manager.get_next_task_counter()
-        else:
-            self.task_counter = 0
+        # Blokada chroniąca licznik i słownik zadań przy równoległym przetwarzaniu
+        self._lock = threading.RLock()
+        self._listeners: List[TaskListener] = []
+        # Numery zadań z trwałej sekwencji persistencji (bez skanowania results/), inaczej lokalny licznik
+        self.persistence_manager = persistence_manager
+        self.task_counter = 0
+        # Indeksy pomocnicze aktualizowane przy zapisie - zapytania o poziom, status i zadania
+        # główne kosztują O(wyniku); poziom się nie zmienia, więc wystarczą listy, a status
+        # przenosi zadanie między słownikami id -> zadanie (kolejność utworzenia zachowana)
+        self._by_level: Dict[int, List[Task]] = {}
+        self._by_status: Dict[int, Dict[str, Task]] = {}
+        self._roots: List[Task] = []
         
     def create_task(self, description: str, task_type: TaskType, 
                    level: int = 0, parent_id: Optional[str] = None) -> Task:
         """Tworzy nowe zadanie"""
-        self.task_counter += 1
-        task_id = f"task_{self.task_counter:04d}"
-        
-        task = Task(
-            id=task_id,
-            description=description,
-            task_type=task_type,
-            level=level,
-            parent_id=parent_id
-        )
-        
-        self.tasks[task_id] = task
-        
-        # Dodaj jako podzadanie do rodzica
-        if parent_id and parent_id in self.tasks:
-            self.tasks[parent_id].add_subtask(task)
+        with self._lock:
+            if self.persistence_manager is not None:
+                self.task_counter = self.persistence_manager.next_task_number()
+            else:
+                self.task_counter += 1
+            task_id = f"task_{self.task_counter:04d}"
+            
+            task = Task(
+                id=task_id,
+                description=description,
+                task_type=task_type,
+                level=level,
+                parent_id=parent_id
+            )
+            
+            self._register(task)
             
+        self._notify(task, "created")
         return task
     
+    def _register(self, task: Task):
+        """Dodaje zadanie do słownika, indeksów i listy podzadań rodzica (pod blokadą)"""
+        self.tasks[task.id] = task
+        task._manager = self
+        self._by_level.setdefault(task.level, []).append(task)
+        self._by_status.setdefault(task._status, {})[task.id] = task
+        if task.parent_id and task.parent_id in self.tasks:
+            self.tasks[task.parent_id].add_subtask(task)
+        elif not task.parent_id:
+            self._roots.append(task)
+    
+    def _reindex_status(self, task: Task, old_code: int):
+        """Przenosi zadanie między indeksami statusów (wywoływane przez Task.status)"""
+        with self._lock:
+            self._by_status.get(old_code, {}).pop(task.id, None)
+            self._by_status.setdefault(task._status, {})[task.id] = task
+    
+    def add_listener(self, listener: TaskListener) -> Callable[[], None]:
+        """Rejestruje słuchacza zmian zadań (np. zapis punktów kontrolnych); zwraca funkcję wyrejestrowującą"""
+        with self._lock:
+            self._listeners.append(listener)
+        
+        def remove():
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+        
+        return remove
+    
+    def _notify(self, task: Task, change: str):
+        """Powiadamia słuchaczy o zmianie zadania"""
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(task, change)
+            except Exception as e:
+                # Błąd słuchacza (np. zapisu na dysk) nie może przerwać przetwarzania zadań
+                print(f"Błąd słuchacza zadań: {e}")
+    
+    def restore_tasks(self, tasks: List[Task]):
+        """Odtwarza zadania z punktu kontrolnego (rodzice przed dziećmi) i przesuwa licznik ID"""
+        with self._lock:
+            for task in tasks:
+                self._register(task)
+                try:
+                    self.task_counter = max(self.task_counter, int(task.id.split("_")[1]))
+                except (ValueError, IndexError):
+                    pass
+    
+    def get_subtree(self, task_id: str) -> List[Task]:
+        """Zwraca zadanie i wszystkich jego potomków (rodzice przed dziećmi)"""
+        with self._lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return []
+            subtree = [task]
+            for node in subtree:
+                subtree.extend(node.subtasks)
+            return subtree
+    
+    def get_root(self, task_id: str) -> Optional[Task]:
+        """Zwraca zadanie główne (bez rodzica) dla podanego zadania"""
+        with self._lock:
+            task = self.tasks.get(task_id)
+            while task is not None and task.parent_id and task.parent_id in self.tasks:
+                task = self.tasks[task.parent_id]
+            return task
+    
     def get_task(self, task_id: str) -> Optional[Task]:
         """Pobiera zadanie po ID"""
         return self.tasks.get(task_id)
     
     def update_task_status(self, task_id: str, status: TaskStatus):
         """Aktualizuje status zadania"""
-        if task_id in self.tasks:
-            self.tasks[task_id].status = status
+        with self._lock:
+            task = self.tasks.get(task_id)
+            if task is not None:
+                task.status = status
+        if task is not None:
+            self._notify(task, "status")
             
-    def update_task_result(self, task_id: str, result: str):
-        """Aktualizuje wynik zadania"""
-        if task_id in self.tasks:
-            self.tasks[task_id].result = result
+    def update_task_result(self, task_id: str, result: Union[str, ResultRope]):
+        """Aktualizuje wynik zadania (tekst albo wynik zagregowany z podzadań)"""
+        with self._lock:
+            task = self.tasks.get(task_id)
+            if task is not None:
+                task.result = result
+        if task is not None:
+            self._notify(task, "result")
             
     def update_verification(self, task_id: str, verification: Dict[str, Any]):
         """Aktualizuje wynik weryfikacji zadania"""
-        if task_id in self.tasks:
-            self.tasks[task_id].verification_result = verification
+        with self._lock:
+            task = self.tasks.get(task_id)
+            if task is not None:
+                task.verification_result = verification
+        if task is not None:
+            self._notify(task, "verification")
             
     def get_all_tasks_by_level(self, level: int) -> List[Task]:
         """Pobiera wszystkie zadania z danego poziomu"""
-        return [task for task in self.tasks.values() if task.level == level]
+        with self._lock:
+            return list(self._by_level.get(level, ()))
+    
+    def get_tasks_by_status(self, status: TaskStatus) -> List[Task]:
+        """Pobiera wszystkie zadania o danym statusie"""
+        with self._lock:
+            return list(self._by_status.get(_STATUS_CODES[status], {}).values())
+    
+    def count_by_status(self, status: TaskStatus) -> int:
+        """Liczba zadań o danym statusie (bez budowania listy)"""
+        with self._lock:
+            return len(self._by_status.get(_STATUS_CODES[status], {}))
+    
+    def get_root_tasks(self) -> List[Task]:
+        """Pobiera zadania główne (bez rodzica)"""
+        with self._lock:
+            return list(self._roots)
     
     def get_subtasks(self, task_id: str) -> List[Task]:
         """Pobiera podzadania danego zadania"""
         task = self.get_task(task_id)
-        return task.subtasks if task else []
+        return list(task.subtasks) if task else []
     
     def print_hierarchy(self, task_id: Optional[str] = None, indent: int = 0):
         """Wyświetla hierarchię zadań"""
         if task_id is None:
             # Wyświetl zadania główne (bez rodzica)
-            root_tasks = [t for t in self.tasks.values() if t.parent_id is None]
-            for task in root_tasks:
+            for task in self.get_root_tasks():
                 self.print_hierarchy(task.id, indent)
         else:
             task = self.get_task(task_id)
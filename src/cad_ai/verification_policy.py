@@ -0,0 +1,159 @@
+"""
+Moduł polityk weryfikacji - które zadania trafiają do VerificationAgent (próbkowanie liści,
+pomijanie rodziców z zaliczonymi podzadaniami, weryfikacja rodziców na streszczeniach podzadań)
+"""
+import os
+import threading
+import zlib
+from typing import Any, Dict, Optional
+
+from .task_manager import Task
+
+# Decyzje polityki dla pojedynczego zadania
+FULL = "full"          # weryfikacja pełnego wyniku
+SUMMARY = "summary"    # weryfikacja rodzica na podstawie streszczeń podzadań
+SKIP = "skip"          # bez wywołania LLM - wynik przyjęty zgodnie z polityką
+
+# Tryby weryfikacji zadań nadrzędnych
+PARENT_MODES = ("full", "summary", "skip_passed", "none")
+
+# Znaczniki w wyniku sugerujące nieudane wykonanie (podnoszą ryzyko liścia)
+RISK_MARKERS = ("błąd", "error", "exception", "nie można", "nie mogę", "todo", "brak danych")
+
+# Ile znaków wyniku podzadania trafia do streszczenia dla weryfikacji rodzica
+_CHILD_PREVIEW = 300
+
+
+class VerificationPolicy:
+    """Decyduje, czy i jak weryfikować zadanie.
+
+    Liście weryfikowane są z prawdopodobieństwem `leaf_sample_rate` (przy `risk_weighted` rośnie ono
+    z lokalną oceną ryzyka wyniku aż do 1.0). Losowanie jest deterministyczne względem id zadania,
+    więc wznowiony przebieg podejmuje te same decyzje. Rodzice wg `parent_mode`:
+    "full" - pełny wynik, "summary" - streszczenia podzadań z ich ocenami, "skip_passed" - pominięcie,
+    gdy każde podzadanie przeszło weryfikację z oceną >= `skip_score` (inaczej pełna weryfikacja),
+    "none" - tylko liście.
+    """
+
+    def __init__(self, leaf_sample_rate: float = 1.0, risk_weighted: bool = False,
+                 parent_mode: str = "full", skip_score: float = 8.0):
+        if parent_mode not in PARENT_MODES:
+            raise ValueError(f"Nieznany tryb weryfikacji rodziców: {parent_mode} "
+                             f"(dostępne: {', '.join(PARENT_MODES)})")
+        self.leaf_sample_rate = max(0.0, min(leaf_sample_rate, 1.0))
+        self.risk_weighted = risk_weighted
+        self.parent_mode = parent_mode
+        self.skip_score = skip_score
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "calls": 0,
+            "calls_saved": 0,
+            "sampled_out": 0,
+            "parents_not_verified": 0,
+            "parents_skipped_passed": 0,
+            "summary_checks": 0,
+            "summary_chars_saved": 0
+        }
+
+    def decide(self, task: Task) -> str:
+        """Decyzja dla zadania z wynikiem: FULL, SUMMARY albo SKIP"""
+        if not task.has_result:
+            # Brak wyniku zawsze trafia do weryfikatora (który go odrzuci)
+            return self._count(FULL)
+        if not task.subtasks:
+            if self.leaf_sample_rate >= 1.0 or self._sampled(task):
+                return self._count(FULL)
+            return self._count(SKIP, "sampled_out")
+        if self.parent_mode == "none":
+            return self._count(SKIP, "parents_not_verified")
+        if self.parent_mode == "skip_passed":
+            if self._children_passed(task):
+                return self._count(SKIP, "parents_skipped_passed")
+            return self._count(FULL)
+        if self.parent_mode == "summary":
+            return self._count(SUMMARY)
+        return self._count(FULL)
+
+    def _count(self, decision: str, reason: Optional[str] = None) -> str:
+        """Zlicza decyzję (SKIP - zaoszczędzone wywołanie z podanego powodu)"""
+        with self._lock:
+            if decision == SKIP:
+                self.counters["calls_saved"] += 1
+                self.counters[reason] += 1
+            else:
+                self.counters["calls"] += 1
+        return decision
+
+    def risk(self, task: Task) -> float:
+        """Lokalna ocena ryzyka wyniku liścia (0.0-1.0) - bez wywołań LLM"""
+        preview = task.result_preview(2000).lower()
+        risk = 0.0
+        if task.result_length < 200:
+            risk += 0.4
+        if any(marker in preview for marker in RISK_MARKERS):
+            risk += 0.4
+        if task.level <= 1:
+            risk += 0.2
+        return min(risk, 1.0)
+
+    def _sampled(self, task: Task) -> bool:
+        """Czy liść trafia do próbki (deterministycznie względem id zadania)"""
+        rate = self.leaf_sample_rate
+        if self.risk_weighted:
+            rate += (1.0 - rate) * self.risk(task)
+        return zlib.crc32(task.id.encode("utf-8")) / 0xFFFFFFFF < rate
+
+    def _children_passed(self, task: Task) -> bool:
+        """Czy każde podzadanie zostało faktycznie zweryfikowane z oceną >= skip_score"""
+        for subtask in task.subtasks:
+            verification = subtask.verification_result
+            if not verification or not verification.get("passed") or verification.get("skipped"):
+                return False
+            if (verification.get("score") or 0.0) < self.skip_score:
+                return False
+        return True
+
+    def skipped_verification(self, task: Task) -> Dict[str, Any]:
+        """Wynik weryfikacji zadania pominiętego przez politykę (ocena - najniższa z podzadań, jeśli są;
+        bez ocen podzadań score to None i raporty pomijają linię oceny)"""
+        scores = [subtask.verification_result["score"] for subtask in task.subtasks
+                  if subtask.verification_result and subtask.verification_result.get("score") is not None]
+        return {
+            "passed": True,
+            "score": min(scores) if scores else None,
+            "feedback": "Weryfikacja pominięta zgodnie z polityką weryfikacji",
+            "issues": [],
+            "skipped": True
+        }
+
+    def child_summaries(self, task: Task) -> str:
+        """Streszczenie podzadań (opis, ocena, początek wyniku) zamiast pełnego wyniku rodzica"""
+        lines = []
+        for subtask in task.subtasks:
+            verification = subtask.verification_result or {}
+            if verification.get("skipped") or not verification:
+                status = "niezweryfikowane"
+            elif verification.get("score") is None:
+                status = "PASS" if verification.get("passed") else "FAIL"
+            else:
+                status = f"{'PASS' if verification.get('passed') else 'FAIL'}, ocena {verification.get('score')}/10"
+            lines.append(f"- [{subtask.id}] {subtask.description} ({status})")
+            if verification.get("feedback") and not verification.get("skipped"):
+                lines.append(f"  Ocena weryfikatora: {verification['feedback'][:200]}")
+            lines.append(f"  Wynik (początek): {subtask.result_preview(_CHILD_PREVIEW)}")
+        summary = "\n".join(lines)
+        with self._lock:
+            self.counters["summary_checks"] += 1
+            self.counters["summary_chars_saved"] += max(0, task.result_length - len(summary))
+        return summary
+
+
+def verification_policy_from_env() -> VerificationPolicy:
+    """Tworzy politykę weryfikacji na podstawie VERIFY_LEAF_SAMPLE, VERIFY_RISK_WEIGHTED,
+    VERIFY_PARENTS i VERIFY_SKIP_SCORE"""
+    return VerificationPolicy(
+        leaf_sample_rate=float(os.getenv("VERIFY_LEAF_SAMPLE", "1.0")),
+        risk_weighted=os.getenv("VERIFY_RISK_WEIGHTED", "0").lower() in ("1", "true", "tak"),
+        parent_mode=os.getenv("VERIFY_PARENTS", "full").lower(),
+        skip_score=float(os.getenv("VERIFY_SKIP_SCORE", "8.0"))
+    )
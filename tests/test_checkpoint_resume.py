@@ -0,0 +1,114 @@
+"""
+Test wznawiania z punktu kontrolnego - przerwany przebieg (sync i async) jest kończony bez
+ponownego wykonywania zweryfikowanych zadań (lokalny, fałszywy serwer OpenAI - nie wymaga klucza API)
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+from colorama import Fore, Style, init
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from fake_openai_server import start_fake_server
+
+server, state, base_url = start_fake_server(max_level=2)
+os.environ.update({"AI_PROVIDER": "ollama", "OLLAMA_BASE_URL": base_url, "MODEL": "fake"})
+
+from cad_ai.task_manager import TaskManager, TaskType, TaskStatus
+from cad_ai.persistence import PersistenceManager
+from cad_ai.agents import MasterOrchestrator, ExecutorAgent
+
+init(autoreset=True)
+
+print(f"{Fore.CYAN}{'='*80}")
+print(f"{Fore.CYAN}  Test Wznawiania z Punktu Kontrolnego")
+print(f"{Fore.CYAN}{'='*80}{Style.RESET_ALL}\n")
+
+# Przerwanie (jak Ctrl+C) przy szóstym wykonaniu zadania atomowego
+CRASH_AT = 6
+calls = {"executions": 0}
+original_execute = ExecutorAgent.execute_task
+original_aexecute = ExecutorAgent.aexecute_task
+
+
+def crashing_execute(self, *args, **kwargs):
+    calls["executions"] += 1
+    if calls["executions"] == CRASH_AT:
+        raise KeyboardInterrupt
+    return original_execute(self, *args, **kwargs)
+
+
+async def crashing_aexecute(self, *args, **kwargs):
+    calls["executions"] += 1
+    if calls["executions"] == CRASH_AT:
+        raise KeyboardInterrupt
+    return await original_aexecute(self, *args, **kwargs)
+
+
+ExecutorAgent.execute_task = crashing_execute
+ExecutorAgent.aexecute_task = crashing_aexecute
+
+
+def run(orchestrator: MasterOrchestrator, main_task, mode: str) -> bool:
+    # Przerwany przebieg async zostawia w pętli anulowane zadania - ich ostrzeżenia pomijamy
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        if mode == "async":
+            return asyncio.run(orchestrator.arun(main_task))
+        return orchestrator.process_task_recursive(main_task)
+
+
+def requests_for_full_run(mode: str) -> int:
+    """Liczba zapytań do modelu dla pełnego, nieprzerwanego przebiegu"""
+    calls["executions"] = -10**9
+    before = state.counters["requests"]
+    task_manager = TaskManager()
+    orchestrator = MasterOrchestrator(task_manager, persistence_dir=tempfile.mkdtemp())
+    run(orchestrator, task_manager.create_task("Raport o kosztach", TaskType.MAIN), mode)
+    return state.counters["requests"] - before
+
+
+for mode in ("sync", "async"):
+    results_dir = tempfile.mkdtemp()
+    calls["executions"] = 0
+    persistence = PersistenceManager(results_dir)
+    task_manager = TaskManager(persistence_manager=persistence)
+    orchestrator = MasterOrchestrator(task_manager, persistence_dir=results_dir, checkpointing=True)
+    main_task = task_manager.create_task("Raport o kosztach", TaskType.MAIN)
+    start = state.counters["requests"]
+    try:
+        run(orchestrator, main_task, mode)
+        raise AssertionError("Przebieg powinien zostać przerwany")
+    except KeyboardInterrupt:
+        orchestrator.checkpoints.flush()
+    interrupted = state.counters["requests"] - start
+
+    checkpoint = persistence.load_checkpoint(main_task.id)
+    verified = sum(task["status"] == TaskStatus.VERIFIED.value for task in checkpoint["tasks"])
+    # Punkt kontrolny zawiera drzewo dekompozycji, nie tylko zadanie główne
+    assert len(checkpoint["tasks"]) > 1
+
+    # Wznowienie: drzewo z punktu kontrolnego, zweryfikowane zadania nie są wykonywane ponownie
+    restored = persistence.restore_task_manager(main_task.id)
+    resumed_orchestrator = MasterOrchestrator(restored, persistence_dir=results_dir, checkpointing=True)
+    start = state.counters["requests"]
+    success = run(resumed_orchestrator, restored.get_task(main_task.id), mode)
+    resumed = state.counters["requests"] - start
+    full = requests_for_full_run(mode)
+
+    print(f"{Fore.WHITE}{mode}: punkt kontrolny {len(checkpoint['tasks'])} zadań ({verified} zweryfikowanych), "
+          f"zapytania przerwany/wznowiony/pełny {interrupted}/{resumed}/{full}{Style.RESET_ALL}")
+    assert success
+    assert resumed < full
+    assert restored.get_task(main_task.id).status == TaskStatus.VERIFIED
+    assert all(task.status == TaskStatus.VERIFIED for task in restored.tasks.values())
+    # Numeracja zadań kontynuowana za przywróconym drzewem
+    assert restored.create_task("Kolejne", TaskType.MAIN).id not in {task["id"] for task in checkpoint["tasks"]}
+
+server.shutdown()
+print(f"\n{Fore.GREEN}✓ Wznawianie z punktu kontrolnego działa poprawnie{Style.RESET_ALL}\n")
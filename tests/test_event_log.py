@@ -0,0 +1,95 @@
+"""
+Test dziennika zdarzeń - odtworzenie drzewa zadań po urwanym ostatnim wierszu (awaria w trakcie
+zapisu) i po kompaktowaniu do migawki (lokalny, fałszywy serwer OpenAI - nie wymaga klucza API)
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+from colorama import Fore, Style, init
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from fake_openai_server import start_fake_server
+
+server, state, base_url = start_fake_server(max_level=2)
+os.environ.update({"AI_PROVIDER": "ollama", "OLLAMA_BASE_URL": base_url, "MODEL": "fake"})
+
+from cad_ai.task_manager import TaskManager, TaskType
+from cad_ai.persistence import PersistenceManager, task_to_record
+from cad_ai.agents import MasterOrchestrator
+from cad_ai.event_log import (
+    EVENT_LOG_NAME, SNAPSHOT_NAME, TaskEventLog, read_events, replay_event_log
+)
+
+init(autoreset=True)
+
+print(f"{Fore.CYAN}{'='*80}")
+print(f"{Fore.CYAN}  Test Dziennika Zdarzeń (urwany wiersz, kompaktowanie)")
+print(f"{Fore.CYAN}{'='*80}{Style.RESET_ALL}\n")
+
+
+def tree_state(task_manager: TaskManager) -> list:
+    """Porównywalny stan drzewa: id, status, wynik, weryfikacja i rodzic każdego zadania"""
+    return sorted(
+        (record["id"], record["status"], record["result"], str(record["verification"]), record["parent_id"])
+        for record in map(task_to_record, task_manager.tasks.values())
+    )
+
+
+def run_logged(results_dir: str, compact_every: int) -> tuple:
+    """Wykonuje zadanie z dziennikiem zdarzeń; zwraca (TaskManager, zadanie główne, dziennik)"""
+    task_manager = TaskManager(persistence_manager=PersistenceManager(results_dir))
+    event_log = TaskEventLog(task_manager, results_dir, fsync_batch=16, compact_every=compact_every)
+    orchestrator = MasterOrchestrator(task_manager, persistence_dir=results_dir, max_concurrency=4,
+                                      event_log=event_log)
+    main_task = task_manager.create_task("Raport o kosztach", TaskType.MAIN)
+    with contextlib.redirect_stdout(io.StringIO()):
+        orchestrator.process_task_recursive(main_task)
+    event_log.close()
+    return task_manager, main_task, event_log
+
+
+# Urwany ostatni wiersz - odtworzenie kończy się na ostatnim pełnym zdarzeniu
+results_dir = tempfile.mkdtemp()
+task_manager, main_task, event_log = run_logged(results_dir, compact_every=0)
+log_path = Path(results_dir) / main_task.id / EVENT_LOG_NAME
+events = read_events(results_dir, main_task.id)
+with open(log_path, "a", encoding="utf-8") as f:
+    f.write('{"seq": 99999, "event": "sta')
+
+replayed = replay_event_log(results_dir, main_task.id)
+print(f"{Fore.WHITE}Bez kompaktowania: {len(task_manager.tasks)} zadań, {len(events)} zdarzeń{Style.RESET_ALL}")
+assert len(task_manager.tasks) > 1
+assert tree_state(replayed) == tree_state(task_manager)
+assert read_events(results_dir, main_task.id) == events
+
+# Ponowne otwarcie obcina urwany wiersz i kontynuuje numerację
+reopened = TaskEventLog(task_manager, results_dir)
+task_manager.create_task("Dodatkowe podzadanie", TaskType.SUBTASK, 1, main_task.id)
+reopened.close()
+assert read_events(results_dir, main_task.id)[-1]["seq"] == events[-1]["seq"] + 1
+assert log_path.read_text(encoding="utf-8").endswith("\n")
+assert tree_state(replay_event_log(results_dir, main_task.id)) == tree_state(task_manager)
+
+# Kompaktowanie - starsze zdarzenia trafiają do migawki, odtworzenie łączy migawkę z resztą dziennika
+results_dir = tempfile.mkdtemp()
+task_manager, main_task, event_log = run_logged(results_dir, compact_every=25)
+remaining = read_events(results_dir, main_task.id)
+print(f"{Fore.WHITE}Z kompaktowaniem: {len(task_manager.tasks)} zadań, {event_log.counters}, "
+      f"{len(remaining)} zdarzeń po migawce{Style.RESET_ALL}")
+assert (Path(results_dir) / main_task.id / SNAPSHOT_NAME).exists()
+assert event_log.counters["compactions"] > 0
+assert tree_state(replay_event_log(results_dir, main_task.id)) == tree_state(task_manager)
+
+# Urwany wiersz po kompaktowaniu
+with open(Path(results_dir) / main_task.id / EVENT_LOG_NAME, "a", encoding="utf-8") as f:
+    f.write('{"seq": 99999, "event": "sta')
+assert tree_state(replay_event_log(results_dir, main_task.id)) == tree_state(task_manager)
+
+server.shutdown()
+print(f"\n{Fore.GREEN}✓ Dziennik zdarzeń działa poprawnie{Style.RESET_ALL}\n")
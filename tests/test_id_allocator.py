@@ -0,0 +1,73 @@
+"""
+Test przydziału identyfikatorów zadań - dwa alokatory (jak dwa procesy) na jednej bazie SQLite
+rezerwują rozłączne bloki numerów i zwracają niewykorzystane końcówki
+"""
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from colorama import Fore, Style, init
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from cad_ai.id_allocator import TASK_IDS_DB_NAME, TaskIdAllocator
+
+init(autoreset=True)
+
+print(f"{Fore.CYAN}{'='*80}")
+print(f"{Fore.CYAN}  Test Przydziału Identyfikatorów (bloki, zwalnianie)")
+print(f"{Fore.CYAN}{'='*80}{Style.RESET_ALL}\n")
+
+db_path = str(Path(tempfile.mkdtemp()) / TASK_IDS_DB_NAME)
+
+# Numeracja startuje od najwyższego istniejącego numeru (seed) - tylko przy pierwszej rezerwacji
+first = TaskIdAllocator(db_path, block_size=4, seed=lambda: 10)
+second = TaskIdAllocator(db_path, block_size=4, seed=lambda: 1000)
+
+assert first.next_number() == 11
+assert second.next_number() == 15
+assert [first.next_number() for _ in range(3)] == [12, 13, 14]
+# Blok pierwszego wyczerpany - kolejny zaczyna się za blokiem drugiego
+assert first.next_number() == 19
+print(f"{Fore.WHITE}Bloki: pierwszy {first.counters}, drugi {second.counters}{Style.RESET_ALL}")
+assert first.counters["blocks"] == 2 and second.counters["blocks"] == 1
+
+# Drugi nie może oddać końcówki (16-18) - sekwencja przesunęła się po jego rezerwacji
+second.close()
+assert second.counters["released"] == 0
+# Pierwszy zarezerwował ostatni blok - niewykorzystane 20-22 wracają do sekwencji
+first.close()
+assert first.counters["released"] == 3
+
+third = TaskIdAllocator(db_path, block_size=4)
+assert third.next_number() == 20
+third.close()
+assert third.counters["released"] == 3
+
+# Równoległe przydziały z dwóch alokatorów i wielu wątków - bez powtórzeń
+allocators = [TaskIdAllocator(db_path, block_size=8) for _ in range(2)]
+numbers = []
+numbers_lock = threading.Lock()
+
+
+def allocate(allocator: TaskIdAllocator):
+    taken = [allocator.next_number() for _ in range(100)]
+    with numbers_lock:
+        numbers.extend(taken)
+
+
+threads = [threading.Thread(target=allocate, args=(allocators[index % 2],)) for index in range(8)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join(timeout=10)
+for allocator in allocators:
+    allocator.close()
+
+print(f"{Fore.WHITE}Równolegle: {len(numbers)} numerów, {len(set(numbers))} unikalnych, "
+      f"zakres {min(numbers)}-{max(numbers)}{Style.RESET_ALL}")
+assert len(numbers) == len(set(numbers)) == 800
+assert min(numbers) == 21
+
+print(f"\n{Fore.GREEN}✓ Przydział identyfikatorów działa poprawnie{Style.RESET_ALL}\n")
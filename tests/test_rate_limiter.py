@@ -0,0 +1,110 @@
+"""
+Test harmonogramu limitów - pokazuje jak system radzi sobie z HTTP 429 od dostawcy
+(lokalny, fałszywy serwer OpenAI - nie wymaga klucza API)
+"""
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from colorama import Fore, Style, init
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from cad_ai.task_manager import TaskManager, TaskType
+from cad_ai.agents import ExecutorAgent, ClientRegistry
+from cad_ai.rate_limiter import ProviderScheduler, Priority
+from fake_openai_server import start_fake_server
+
+init(autoreset=True)
+
+print(f"{Fore.CYAN}{'='*80}")
+print(f"{Fore.CYAN}  Test Harmonogramu Limitów (RPM/TPM, Retry-After)")
+print(f"{Fore.CYAN}{'='*80}{Style.RESET_ALL}\n")
+
+# Serwer przepuszcza 3 zapytania na minutę, potem zwraca 429 z Retry-After
+server, state, base_url = start_fake_server(rpm=3, retry_after=0.2)
+
+os.environ["OLLAMA_BASE_URL"] = base_url
+
+scheduler = ProviderScheduler(requests_per_minute=600, max_retries=3, base_delay=0.1)
+executor = ExecutorAgent(1, provider="ollama", model="fake", client_registry=ClientRegistry())
+executor.rate_limiter = scheduler
+
+task_manager = TaskManager()
+task = task_manager.create_task("Policz do trzech", TaskType.ATOMIC)
+
+results = []
+for _ in range(3):
+    results.append(executor.execute_task(task))
+
+# Czwarte zapytanie dostaje 429 aż do wyczerpania ponowień - zwracany jest pusty wynik
+rate_limited = executor.execute_task(task)
+
+stats = json.loads(urllib.request.urlopen(base_url.replace("/v1", "/")).read())
+print(f"\n{Fore.WHITE}Statystyki serwera: {stats}")
+print(f"Statystyki harmonogramu: {scheduler.counters}{Style.RESET_ALL}\n")
+
+assert all(result.startswith("Wynik wykonania") for result in results)
+assert rate_limited == ""
+assert scheduler.counters["rate_limited"] == stats["rate_limited"] == scheduler.max_retries + 1
+
+# Priorytety: weryfikacja obsługiwana przed wykonaniem, gdy wiadro jest puste
+ordered = ProviderScheduler(requests_per_minute=60)
+ordered.request_bucket.tokens = 0
+served = []
+
+
+def worker(priority: Priority):
+    ordered.acquire(priority)
+    served.append(priority)
+
+
+threads = [threading.Thread(target=worker, args=(Priority.EXECUTION,))]
+threads[0].start()
+time.sleep(0.1)
+threads.append(threading.Thread(target=worker, args=(Priority.VERIFICATION,)))
+threads[1].start()
+time.sleep(0.1)
+# Pierwszy w kolejce czeka na token - zadanie o wyższym priorytecie wyprzedza go
+for thread in threads:
+    thread.join(timeout=5)
+
+print(f"{Fore.WHITE}Kolejność obsługi: {[p.name for p in served]}{Style.RESET_ALL}")
+assert served == [Priority.VERIFICATION, Priority.EXECUTION]
+
+# Anulowane oczekiwanie zwalnia miejsce w kolejce - kolejne zapytania nie czekają za nim
+import asyncio
+
+cancelled = ProviderScheduler(requests_per_minute=600)
+cancelled.request_bucket.tokens = 0
+
+
+async def cancel_then_acquire():
+    pending = asyncio.ensure_future(cancelled.aacquire(Priority.EXECUTION))
+    await asyncio.sleep(0.05)
+    pending.cancel()
+    try:
+        await pending
+    except asyncio.CancelledError:
+        pass
+    # Wiadro uzupełnia się po 0.1 s - następne zapytanie musi zostać obsłużone
+    await asyncio.wait_for(cancelled.aacquire(Priority.EXECUTION), timeout=2)
+
+
+asyncio.run(cancel_then_acquire())
+second = threading.Thread(target=cancelled.acquire)
+second.start()
+cancelled.acquire()
+second.join(timeout=5)
+print(f"{Fore.WHITE}Po anulowaniu: {cancelled.counters['requests']} obsłużonych, "
+      f"{len(cancelled._waiters)} w kolejce{Style.RESET_ALL}")
+assert cancelled.counters["requests"] == 3
+assert cancelled._waiters == []
+
+server.shutdown()
+print(f"\n{Fore.GREEN}✓ Harmonogram limitów działa poprawnie{Style.RESET_ALL}\n")
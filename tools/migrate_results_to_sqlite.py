@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Migracja wyników z katalogów results/task_* do magazynu SQLite (results/results.sqlite).
+
+Importuje wszystkie artefakty znane PersistenceManager (output.txt, result.json, report.txt,
+detailed_report.json, hierarchy.json, stats.json, checkpoint.json, execution_logs/*.json).
+Ponowne uruchomienie nadpisuje artefakty tymi z plików - migracja jest idempotentna.
+
+Użycie:
+    python tools/migrate_results_to_sqlite.py                 # migracja results/
+    python tools/migrate_results_to_sqlite.py --dry-run       # tylko podsumowanie
+    python tools/migrate_results_to_sqlite.py --remove-files  # usuń zmigrowane pliki
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from colorama import Fore, Style, init
+
+init(autoreset=True)
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from cad_ai.results_store import SQLitePersistenceManager
+
+TEXT_ARTIFACTS = ["output.txt", "report.txt"]
+JSON_ARTIFACTS = ["result.json", "detailed_report.json", "hierarchy.json", "stats.json", "checkpoint.json"]
+
+
+def task_artifacts(task_dir: Path) -> list:
+    """Pliki zadania do migracji: (nazwa względna, ścieżka, czy JSON)"""
+    artifacts = [(name, task_dir / name, False) for name in TEXT_ARTIFACTS]
+    artifacts += [(name, task_dir / name, True) for name in JSON_ARTIFACTS]
+    artifacts += [(f"execution_logs/{path.name}", path, True)
+                  for path in sorted((task_dir / "execution_logs").glob("summary_*.json"))]
+    return [artifact for artifact in artifacts if artifact[1].exists()]
+
+
+def migrate(results_dir: Path, dry_run: bool = False, remove_files: bool = False) -> dict:
+    """Przenosi artefakty wszystkich zadań do bazy; zwraca liczniki migracji"""
+    counters = {"tasks": 0, "artifacts": 0, "bytes": 0, "errors": 0, "removed": 0}
+    persistence = None if dry_run else SQLitePersistenceManager(str(results_dir))
+    task_dirs = sorted(path for path in results_dir.glob("task_*") if path.is_dir())
+
+    for task_dir in task_dirs:
+        artifacts = task_artifacts(task_dir)
+        if not artifacts:
+            continue
+        counters["tasks"] += 1
+        for name, path, is_json in artifacts:
+            try:
+                content = path.read_text(encoding="utf-8")
+                data = json.loads(content) if is_json else content
+            except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+                counters["errors"] += 1
+                print(f"{Fore.RED}✗ {path}: {e}{Style.RESET_ALL}")
+                continue
+            counters["artifacts"] += 1
+            counters["bytes"] += len(content.encode("utf-8"))
+            if dry_run:
+                continue
+            # Zapis przez PersistenceManager - te same indeksowane metadane co przy nowych przebiegach
+            persistence.import_artifact(task_dir.name, name, data, is_json, path.stat().st_mtime)
+            if remove_files:
+                path.unlink()
+                counters["removed"] += 1
+        print(f"{Fore.GREEN}✓ {task_dir.name}: {len(artifacts)} plików{Style.RESET_ALL}")
+
+    if persistence is not None:
+        persistence.store.close()
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migracja results/task_* do SQLite")
+    parser.add_argument("--results", default=str(ROOT / "results"), help="katalog z wynikami")
+    parser.add_argument("--dry-run", action="store_true", help="tylko policz pliki do migracji")
+    parser.add_argument("--remove-files", action="store_true",
+                        help="usuń pliki po zapisaniu w bazie (dzienniki zdarzeń zostają)")
+    args = parser.parse_args()
+
+    results_dir = Path(args.results)
+    if not results_dir.exists():
+        print(f"{Fore.RED}Brak katalogu {results_dir}{Style.RESET_ALL}")
+        return 1
+
+    started = time.perf_counter()
+    counters = migrate(results_dir, args.dry_run, args.remove_files)
+    elapsed = time.perf_counter() - started
+
+    mode = "Do migracji" if args.dry_run else "Zmigrowano"
+    print(f"\n{Fore.CYAN}{mode}: {counters['tasks']} zadań, {counters['artifacts']} artefaktów "
+          f"({counters['bytes'] / 1024:.1f} KiB) w {elapsed:.2f} s, błędy: {counters['errors']}, "
+          f"usunięte pliki: {counters['removed']}{Style.RESET_ALL}")
+    return 1 if counters["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
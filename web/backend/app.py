@@ -1,7 +1,8 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
+import threading
 
 
 def get_project_root() -> Path:
@@ -39,11 +40,35 @@ app.add_middleware(
 
 from typing import Optional
 from backend.routes.fs_routes import (
-    RootRequest, SaveFileRequest, get_root, list_roots, set_root, fs_tree, fs_browse, fs_file, fs_save_file
+    RootRequest, SaveFileRequest, get_root, list_roots, set_root, fs_tree, fs_browse, fs_file, fs_raw, fs_save_file
 )
 from backend.routes.task_routes import (
-    RunRequest, api_results, api_task, api_run, api_status
+    RunRequest, api_results, api_task, api_task_events, api_run, api_jobs, api_job, api_job_cancel,
+    api_job_result, api_status, api_stream
 )
+from backend.services.task_service import open_run_index
+from backend.services.job_service import job_manager_from_env
+from backend.services.run_service import get_run_stack
+
+
+@app.on_event("startup")
+def warm_results_index():
+    # Uzupełnienie indeksu przebiegów z katalogów results/task_* w tle - serwer startuje od razu
+    if RESULTS_DIR.exists():
+        threading.Thread(target=open_run_index, args=(RESULTS_DIR,), daemon=True).start()
+
+
+@app.on_event("startup")
+def start_jobs():
+    # Stała pula workerów /api/run; wspólny stos przebiegu (cache, limity, pamięć) rozgrzewany w tle
+    app.state.jobs = job_manager_from_env(PROJECT_ROOT, BASE_ROOT)
+    app.state.jobs.start()
+    threading.Thread(target=get_run_stack, args=(BASE_ROOT,), daemon=True).start()
+
+
+@app.on_event("shutdown")
+def stop_jobs():
+    app.state.jobs.stop()
 
 
 @app.get("/api/fs/root")
@@ -72,8 +97,14 @@ def route_fs_browse(path: str = "/"):
 
 
 @app.get("/api/fs/file")
-def route_fs_file(path: Optional[str] = None):
-    return fs_file(app.state, path)
+def route_fs_file(request: Request, path: Optional[str] = None, offset: Optional[int] = None,
+                  length: Optional[int] = None, line: Optional[int] = None, lines: Optional[int] = None):
+    return fs_file(app.state, path, request.headers, offset, length, line, lines)
+
+
+@app.get("/api/fs/raw")
+def route_fs_raw(request: Request, path: Optional[str] = None):
+    return fs_raw(app.state, path, request.headers)
 
 
 @app.post("/api/fs/file")
@@ -82,8 +113,13 @@ def route_fs_save_file(payload: SaveFileRequest):
 
 
 @app.get("/api/results")
-def route_results():
-    return api_results(RESULTS_DIR)
+def route_results(limit: int = 50, cursor: Optional[str] = None, status: Optional[str] = None,
+                  verified: Optional[bool] = None, minScore: Optional[float] = None,
+                  maxScore: Optional[float] = None, since: Optional[float] = None,
+                  until: Optional[float] = None, q: Optional[str] = None,
+                  sort: str = "task_id", order: str = "desc"):
+    return api_results(RESULTS_DIR, limit, cursor, status, verified, minScore, maxScore,
+                       since, until, q, sort, order)
 
 
 @app.get("/api/task/{task_id}")
@@ -91,9 +127,39 @@ def route_task(task_id: str):
     return api_task(task_id, RESULTS_DIR)
 
 
+@app.get("/api/task/{task_id}/events")
+def route_task_events(task_id: str, after: int = 0, limit: int = 500):
+    return api_task_events(task_id, RESULTS_DIR, after, limit)
+
+
 @app.post("/api/run")
 def route_run(payload: RunRequest):
-    return api_run(payload, PROJECT_ROOT, BASE_ROOT)
+    return api_run(payload, app.state.jobs)
+
+
+@app.get("/api/jobs")
+def route_jobs(limit: int = 50):
+    return api_jobs(app.state.jobs, limit)
+
+
+@app.get("/api/jobs/{job_id}")
+def route_job(job_id: str):
+    return api_job(job_id, app.state.jobs)
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+def route_job_cancel(job_id: str):
+    return api_job_cancel(job_id, app.state.jobs)
+
+
+@app.get("/api/jobs/{job_id}/result")
+def route_job_result(job_id: str):
+    return api_job_result(job_id, app.state.jobs)
+
+
+@app.get("/api/stream")
+def route_stream(task_id: Optional[str] = None, job_id: Optional[str] = None):
+    return api_stream(task_id, job_id)
 
 
 @app.get("/api/status")
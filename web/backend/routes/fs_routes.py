@@ -1,15 +1,22 @@
+import mimetypes
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from pathlib import Path
-from typing import Optional
+from typing import Mapping, Optional
 from backend.utils.path_utils import (
     normalize_root, validate_root, safe_resolve, list_entries
 )
 from backend.services.fs_service import build_tree, browse_folders
+from backend.services.file_service import (
+    RangeNotSatisfiable, file_validators, is_not_modified, parse_range, iter_file, read_bytes, read_lines
+)
 
 router = APIRouter(prefix="/api/fs", tags=["filesystem"])
 
 MAX_FILE_SIZE = 200 * 1024
+# Okno większych plików otwieranych bez zakresu
+DEFAULT_WINDOW_LINES = 1000
 
 
 class RootRequest(BaseModel):
@@ -46,6 +53,7 @@ def set_root(payload: RootRequest, app_state, base_root: Path) -> dict:
 
 @router.get("/tree")
 def fs_tree(app_state, path: str = ".", depth: int = 4) -> dict:
+    # Katalogi głębiej niż depth mają children == None; klient pobiera je osobno (path=<katalog>&depth=0)
     rel_path = Path("") if path in (".", "", None) else Path(path)
     target = safe_resolve(rel_path, app_state.current_root)
     if not target.exists() or not target.is_dir():
@@ -63,18 +71,66 @@ def fs_browse(path: str = "/") -> dict:
     return {"path": str(target), "folders": folders}
 
 
-@router.get("/file")
-def fs_file(app_state, path: Optional[str] = None) -> dict:
+def _resolve_file(app_state, path: Optional[str]) -> Path:
     if not path:
         raise HTTPException(status_code=400, detail="Brak parametru path")
     target = safe_resolve(Path(path), app_state.current_root)
     if not target.exists() or not target.is_file():
         raise HTTPException(status_code=404, detail="Plik nie istnieje")
-    size = target.stat().st_size
-    if size > MAX_FILE_SIZE:
-        raise HTTPException(status_code=413, detail="Plik zbyt duży do podglądu")
-    content = target.read_text(encoding="utf-8")
-    return {"path": path, "size": size, "content": content}
+    return target
+
+
+@router.get("/file")
+def fs_file(app_state, path: Optional[str] = None, headers: Mapping[str, str] | None = None,
+            offset: Optional[int] = None, length: Optional[int] = None,
+            line: Optional[int] = None, lines: Optional[int] = None) -> Response:
+    # Małe pliki bez zakresu - cała treść (edytowalna); większe lub z zakresem - okno linii
+    # (line/lines) albo bajtów (offset/length), partial == True
+    target = _resolve_file(app_state, path)
+    stat = target.stat()
+    etag, last_modified = file_validators(stat)
+    validators = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "no-cache"}
+    if is_not_modified(headers or {}, etag, stat):
+        return Response(status_code=304, headers=validators)
+    payload = {"path": path, "size": stat.st_size}
+    if offset is not None:
+        payload.update(read_bytes(target, offset, length if length is not None else MAX_FILE_SIZE))
+        payload["partial"] = True
+    elif line is not None or stat.st_size > MAX_FILE_SIZE:
+        payload.update(read_lines(target, etag, line or 0, lines if lines is not None else DEFAULT_WINDOW_LINES))
+        payload["partial"] = True
+    else:
+        payload.update({"content": target.read_text(encoding="utf-8"), "partial": False})
+    return JSONResponse(payload, headers=validators)
+
+
+@router.get("/raw")
+def fs_raw(app_state, path: Optional[str] = None, headers: Mapping[str, str] | None = None) -> Response:
+    # Surowa treść pliku strumieniowana fragmentami; obsługuje Range (206) i żądania warunkowe (304)
+    target = _resolve_file(app_state, path)
+    headers = headers or {}
+    stat = target.stat()
+    etag, last_modified = file_validators(stat)
+    response_headers = {"ETag": etag, "Last-Modified": last_modified, "Accept-Ranges": "bytes"}
+    if is_not_modified(headers, etag, stat):
+        return Response(status_code=304, headers=response_headers)
+    size = stat.st_size
+    try:
+        # If-Range z innym ETag - plik zmienił się od poprzedniego fragmentu, wysyłamy całość
+        byte_range = parse_range(headers.get("range"), size) if headers.get("if-range", etag) == etag else None
+    except RangeNotSatisfiable:
+        raise HTTPException(status_code=416, detail="Nieprawidłowy zakres",
+                            headers={"Content-Range": f"bytes */{size}"})
+    start, end = byte_range or (0, size)
+    response_headers["Content-Length"] = str(end - start)
+    status_code = 200
+    if byte_range is not None:
+        status_code = 206
+        response_headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+    media_type = mimetypes.guess_type(target.name)[0] or "text/plain; charset=utf-8"
+    return StreamingResponse(iter_file(target, start, end), status_code=status_code,
+                             media_type=media_type, headers=response_headers)
+
 
 @router.post("/file")
 def fs_save_file(payload: SaveFileRequest, app_state) -> dict:
@@ -1,50 +1,122 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from pathlib import Path
 from typing import Optional
 from backend.services.task_service import (
-    list_task_dirs, build_task_item, load_task_data
+    list_task_page, load_task_payload, load_task_events
 )
-from backend.services.test_runner import start_test_thread
+from backend.services.job_service import QueueFullError, FINAL_STATES, IN_PROCESS
+from backend.services.stream_service import stream_events
+from backend.services.fs_service import dir_index
 
 router = APIRouter(prefix="/api", tags=["tasks"])
 
 
 class RunRequest(BaseModel):
     taskDescription: Optional[str] = None
+    inProcess: bool = False
 
 
 @router.get("/results")
-def api_results(results_dir: Path) -> dict:
-    tasks = [build_task_item(path) for path in list_task_dirs(results_dir)]
-    return {"tasks": list(reversed(tasks)), "total": len(tasks)}
+def api_results(results_dir: Path, limit: int = 50, cursor: Optional[str] = None,
+                status: Optional[str] = None, verified: Optional[bool] = None,
+                min_score: Optional[float] = None, max_score: Optional[float] = None,
+                since: Optional[float] = None, until: Optional[float] = None,
+                q: Optional[str] = None, sort: str = "task_id", order: str = "desc") -> dict:
+    try:
+        return list_task_page(
+            results_dir, max(1, min(limit, 500)), cursor, sort, order,
+            status=status, verified=verified, min_score=min_score, max_score=max_score,
+            since=since, until=until, search=q
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/task/{task_id}")
 def api_task(task_id: str, results_dir: Path) -> dict:
+    payload = load_task_payload(results_dir, task_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Zadanie nie znalezione")
+    return payload
+
+
+@router.get("/task/{task_id}/events")
+def api_task_events(task_id: str, results_dir: Path, after: int = 0, limit: int = 500) -> dict:
     task_path = results_dir / task_id
     if not task_path.exists():
         raise HTTPException(status_code=404, detail="Zadanie nie znalezione")
-    return load_task_data(task_path)
+    return load_task_events(task_path, after, max(1, min(limit, 5000)))
 
 
 @router.post("/run")
-def api_run(payload: RunRequest, project_root: Path, base_root: Path) -> dict:
+def api_run(payload: RunRequest, jobs) -> dict:
     description = payload.taskDescription or "Zaplanuj prosty obiad dla 4 osób: zupa, drugie danie i deser."
-    script_path = base_root / "scripts" / "test_run.py"
-    start_test_thread(script_path, project_root, [description])
+    try:
+        job = jobs.submit(description, in_process=payload.inProcess)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    response = {
+        "status": job.status,
+        "message": "Zlecenie w kolejce" if job.kind == IN_PROCESS else "Zlecenie testu w kolejce",
+        "taskDescription": description,
+        "jobId": job.id,
+        "job": f"/api/jobs/{job.id}",
+        "stream": f"/api/stream?job_id={job.id}"
+    }
+    return response
+
+
+@router.get("/jobs")
+def api_jobs(jobs, limit: int = 50) -> dict:
     return {
-        "status": "running",
-        "message": "Uruchamianie testu w tle...",
-        "taskDescription": description
+        "jobs": [job.to_dict() for job in jobs.list_jobs(max(1, min(limit, 500)))],
+        "stats": jobs.stats()
     }
 
 
+def _get_job(jobs, job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Zlecenie nie znalezione")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+def api_job(job_id: str, jobs) -> dict:
+    return _get_job(jobs, job_id).to_dict()
+
+
+@router.post("/jobs/{job_id}/cancel")
+def api_job_cancel(job_id: str, jobs) -> dict:
+    _get_job(jobs, job_id)
+    return jobs.cancel(job_id).to_dict()
+
+
+@router.get("/jobs/{job_id}/result")
+def api_job_result(job_id: str, jobs) -> dict:
+    job = _get_job(jobs, job_id)
+    if job.status not in FINAL_STATES:
+        raise HTTPException(status_code=409, detail="Zlecenie nie zostało zakończone")
+    return {**job.to_dict(), "result": job.result, "verification": job.verification}
+
+
+@router.get("/stream")
+def api_stream(task_id: Optional[str] = None, job_id: Optional[str] = None) -> StreamingResponse:
+    return StreamingResponse(
+        stream_events(task_id, job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/status")
 def api_status(app_state, results_dir: Path) -> dict:
     return {
         "status": "ok",
         "root": str(app_state.current_root),
         "resultsDir": str(results_dir),
-        "resultsExist": results_dir.exists()
+        "resultsExist": results_dir.exists(),
+        "fsIndex": dir_index.stats()
     }
@@ -0,0 +1,186 @@
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Iterator, Mapping
+
+CHUNK_SIZE = 64 * 1024
+SCAN_CHUNK = 1024 * 1024
+# Górny limit okna (bajty) - chroni przed pojedynczymi bardzo długimi liniami
+MAX_WINDOW_BYTES = 2 * 1024 * 1024
+# Ile plików pamięta indeks początków linii
+LINE_INDEX_FILES = 64
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def file_validators(stat: os.stat_result) -> tuple[str, str]:
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    return etag, formatdate(stat.st_mtime, usegmt=True)
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, stat: os.stat_result) -> bool:
+    # If-None-Match ma pierwszeństwo przed If-Modified-Since (RFC 9110)
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(stat.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Zakres [start, end) z nagłówka Range albo None (brak, zła składnia lub wiele zakresów - cały plik)"""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if not first:
+            # bytes=-N - ostatnie N bajtów
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(0, size - suffix), size
+        start = int(first)
+        end = int(last) + 1 if last else size
+    except ValueError:
+        return None
+    if start >= size or end <= start:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size)
+
+
+def iter_file(path: Path, start: int, end: int, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _utf8_window(data: bytes, start: int, at_eof: bool) -> tuple[str, int, int]:
+    # Okno nie może zaczynać się ani kończyć w środku znaku wielobajtowego
+    head = 0
+    while head < min(3, len(data)) and 0x80 <= data[head] <= 0xBF:
+        head += 1
+    tail = len(data)
+    if not at_eof:
+        for back in range(1, min(4, len(data) - head) + 1):
+            byte = data[tail - back]
+            if byte < 0x80:
+                break
+            if byte >= 0xC0:
+                needed = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+                if needed > back:
+                    tail -= back
+                break
+    return data[head:tail].decode("utf-8", errors="replace"), start + head, start + tail
+
+
+def read_bytes(path: Path, offset: int, length: int) -> dict:
+    size = path.stat().st_size
+    offset = max(0, min(offset, size))
+    length = max(0, min(length, MAX_WINDOW_BYTES))
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    content, start, end = _utf8_window(data, offset, offset + len(data) >= size)
+    return {"content": content, "offset": start, "end": end, "eof": end >= size}
+
+
+class LineIndex:
+    """Zapamiętane początki linii (numer linii -> offset) dla plików przeglądanych oknami.
+
+    Okno linii wymaga przejścia pliku od najbliższego znanego początku linii; kolejne okna
+    (następne, poprzednie, powrót) startują więc z punktu zapisanego przy poprzednim odczycie.
+    Wpisy są ważne dla danego ETag - zmiana pliku zaczyna indeks od nowa.
+    """
+
+    def __init__(self, max_files: int = LINE_INDEX_FILES):
+        self.max_files = max_files
+        self._files: OrderedDict[str, tuple[str, dict[int, int]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def nearest(self, path: Path, etag: str, line: int) -> tuple[int, int]:
+        with self._lock:
+            cached = self._files.get(str(path))
+            if cached is None or cached[0] != etag:
+                return 0, 0
+            self._files.move_to_end(str(path))
+            lines = sorted(cached[1])
+            known = lines[bisect_right(lines, line) - 1]
+            return known, cached[1][known]
+
+    def remember(self, path: Path, etag: str, line: int, offset: int) -> None:
+        with self._lock:
+            cached = self._files.get(str(path))
+            if cached is None or cached[0] != etag:
+                cached = (etag, {0: 0})
+                self._files[str(path)] = cached
+                while len(self._files) > self.max_files:
+                    self._files.popitem(last=False)
+            self._files.move_to_end(str(path))
+            cached[1][line] = offset
+
+
+line_index = LineIndex()
+
+
+def _skip_lines(f, count: int, limit: int | None = None) -> tuple[int, int]:
+    """Przesuwa plik o `count` linii (fragmentami, bez dzielenia na linie w Pythonie);
+    zwraca (liczba pominiętych linii, liczba przeczytanych bajtów)"""
+    skipped = consumed = 0
+    while skipped < count and (limit is None or consumed < limit):
+        chunk = f.read(SCAN_CHUNK if limit is None else min(SCAN_CHUNK, limit - consumed))
+        if not chunk:
+            break
+        newlines = chunk.count(b"\n")
+        if skipped + newlines < count:
+            skipped += newlines
+            consumed += len(chunk)
+            continue
+        index = -1
+        for _ in range(count - skipped):
+            index = chunk.find(b"\n", index + 1)
+        consumed += index + 1
+        skipped = count
+        f.seek(-(len(chunk) - index - 1), os.SEEK_CUR)
+    return skipped, consumed
+
+
+def read_lines(path: Path, etag: str, line: int, count: int) -> dict:
+    size = path.stat().st_size
+    line = max(0, line)
+    known_line, known_offset = line_index.nearest(path, etag, line)
+    with open(path, "rb") as f:
+        f.seek(known_offset)
+        skipped, consumed = _skip_lines(f, line - known_line)
+        start = known_offset + consumed
+        if skipped < line - known_line:
+            # Plik ma mniej linii niż żądany początek okna
+            return {"content": "", "offset": size, "end": size, "line": known_line + skipped,
+                    "lines": 0, "eof": True}
+        line_index.remember(path, etag, line, start)
+        read, length = _skip_lines(f, max(0, count), MAX_WINDOW_BYTES)
+        f.seek(start)
+        data = f.read(length)
+    content, start, end = _utf8_window(data, start, start + length >= size)
+    if data.endswith(b"\n"):
+        line_index.remember(path, etag, line + read, end)
+    elif data and end >= size:
+        # Ostatnia linia pliku bez znaku nowej linii
+        read += 1
+    return {"content": content, "offset": start, "end": end, "line": line, "lines": read, "eof": end >= size}
@@ -1,22 +1,97 @@
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from backend.utils.path_utils import FS_EXCLUDE, list_entries
+from backend.utils.path_utils import FS_EXCLUDE
 
+# Ile katalogów trzyma indeks (najdawniej używane są usuwane)
+DIR_INDEX_SIZE = 4096
 
-def make_file_node(entry: Path, rel_path: Path) -> dict:
+
+class DirectoryIndex:
+    """Pamięć listingów katalogów zbudowanych przez os.scandir.
+
+    Listing zawiera tylko typ i nazwę wpisów i jest ważny, dopóki nie zmieni się mtime katalogu -
+    dodanie, usunięcie lub zmiana nazwy wpisu wymusza ponowny odczyt. Rozmiary plików nie są
+    zapamiętywane (zapis pliku w miejscu nie zmienia mtime katalogu) - make_file_node pobiera je
+    przy każdym listingu.
+    """
+
+    def __init__(self, max_dirs: int = DIR_INDEX_SIZE):
+        self.max_dirs = max_dirs
+        self._dirs: OrderedDict[str, tuple[int, list[dict]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "scans": 0, "rescans": 0, "evictions": 0}
+
+    def entries(self, dir_path: Path) -> list[dict]:
+        key = str(dir_path)
+        mtime = os.stat(key).st_mtime_ns
+        with self._lock:
+            cached = self._dirs.get(key)
+            if cached is not None and cached[0] == mtime:
+                self._dirs.move_to_end(key)
+                self.counters["hits"] += 1
+                return cached[1]
+        entries = self._scan(key)
+        with self._lock:
+            self.counters["rescans" if cached is not None else "scans"] += 1
+            self._dirs[key] = (mtime, entries)
+            self._dirs.move_to_end(key)
+            while len(self._dirs) > self.max_dirs:
+                self._dirs.popitem(last=False)
+                self.counters["evictions"] += 1
+        return entries
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"dirs": len(self._dirs), **self.counters}
+
+    @staticmethod
+    def _scan(key: str) -> list[dict]:
+        entries = []
+        try:
+            with os.scandir(key) as it:
+                for entry in it:
+                    if entry.name in FS_EXCLUDE:
+                        continue
+                    try:
+                        # is_dir/is_file korzystają z typu wpisu zwróconego przez scandir (bez stat)
+                        if entry.is_dir():
+                            entries.append({"type": "dir", "name": entry.name})
+                        elif entry.is_file():
+                            entries.append({"type": "file", "name": entry.name})
+                    except OSError:
+                        continue
+        except PermissionError:
+            pass
+        entries.sort(key=lambda item: item["name"].lower())
+        return entries
+
+
+dir_index = DirectoryIndex()
+
+
+def make_file_node(file_path: Path, rel_path: Path) -> dict | None:
+    try:
+        size = file_path.stat().st_size
+    except OSError:
+        # Plik usunięty po odczycie listingu
+        return None
     return {
         "type": "file",
-        "name": entry.name,
+        "name": file_path.name,
         "path": rel_path.as_posix(),
-        "size": entry.stat().st_size
+        "size": size
     }
 
 
-def make_dir_node(entry: Path, rel_path: Path, depth: int) -> dict:
+def make_dir_node(dir_path: Path, entry: dict, rel_path: Path, depth: int) -> dict:
+    # children == None - katalog poza zasięgiem depth, rozwijany przez klienta na żądanie
     return {
         "type": "dir",
-        "name": entry.name,
+        "name": entry["name"],
         "path": rel_path.as_posix(),
-        "children": build_tree(entry, rel_path, depth - 1)
+        "children": build_tree(dir_path / entry["name"], rel_path, depth - 1) if depth > 0 else None
     }
 
 
@@ -24,12 +99,14 @@ def build_tree(dir_path: Path, rel_base: Path, depth: int) -> list[dict]:
     if depth < 0:
         return []
     items: list[dict] = []
-    for entry in list_entries(dir_path):
-        rel_path = rel_base / entry.name if rel_base else Path(entry.name)
-        if entry.is_dir():
-            items.append(make_dir_node(entry, rel_path, depth))
-        elif entry.is_file():
-            items.append(make_file_node(entry, rel_path))
+    for entry in dir_index.entries(dir_path):
+        rel_path = rel_base / entry["name"] if rel_base else Path(entry["name"])
+        if entry["type"] == "dir":
+            items.append(make_dir_node(dir_path, entry, rel_path, depth))
+        else:
+            node = make_file_node(dir_path / entry["name"], rel_path)
+            if node is not None:
+                items.append(node)
     return items
 
 
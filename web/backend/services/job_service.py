@@ -0,0 +1,265 @@
+import asyncio
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+from backend.services.run_service import (
+    ensure_core_importable, create_main_task, create_orchestrator, run_task_in_process, close_async_clients
+)
+from backend.services.stream_service import broker
+from backend.services.test_runner import run_test_process
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+IN_PROCESS = "in_process"
+SUBPROCESS = "subprocess"
+
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, description: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.description = description
+        # Zadanie główne powstaje dopiero po wyjęciu zlecenia z kolejki (task_id z run_started)
+        self.task_manager = None
+        self.main_task = None
+        self.task_id: str | None = None
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.success: bool | None = None
+        self.error: str | None = None
+        self.result: str | None = None
+        self.verification: dict | None = None
+        self.cancel_requested = False
+        # Ustawiane przez worker na czas wykonania: anuluje zadanie asyncio lub kończy podproces
+        self.cancel_running: Callable[[], None] | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "jobId": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "taskDescription": self.description,
+            "taskId": self.task_id,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "success": self.success,
+            "error": self.error,
+            "cancelRequested": self.cancel_requested
+        }
+
+
+class JobManager:
+    """Ograniczona kolejka zleceń /api/run i stała pula workerów.
+
+    Każdy worker ma własną, długo żyjącą pętlę zdarzeń (ciepli klienci async) i korzysta ze wspólnego
+    stosu przebiegu z run_service; pełna kolejka odrzuca zlecenie (HTTP 429) zamiast tworzyć
+    kolejne wątki i podprocesy. Limit liczy tylko zlecenia wciąż oczekujące - anulowane przed
+    startem zwalniają miejsce od razu, choć ich wpis zostaje w kolejce do wyjęcia przez worker.
+    """
+
+    def __init__(self, project_root: Path, base_root: Path, workers: int = 2,
+                 queue_size: int = 32, history: int = 200):
+        self.project_root = project_root
+        self.base_root = base_root
+        self.workers = max(1, workers)
+        self.history = history
+        self.queue_size = max(1, queue_size)
+        self.queue: queue.Queue = queue.Queue()
+        self._queued = 0
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self.counters = {"submitted": 0, "rejected": 0, "succeeded": 0, "failed": 0, "cancelled": 0}
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{index + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        for job in self.list_jobs():
+            if job.status not in FINAL_STATES:
+                self.cancel(job.id)
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def submit(self, description: str, in_process: bool = True) -> Job:
+        # Zadanie główne (i jego id) tworzy worker - odrzucone zlecenie nie zużywa numeru
+        job = Job(IN_PROCESS if in_process else SUBPROCESS, description)
+        with self._lock:
+            rejected = self._queued >= self.queue_size
+            if rejected:
+                self.counters["rejected"] += 1
+            else:
+                self.jobs[job.id] = job
+                self.counters["submitted"] += 1
+                self._queued += 1
+                self.queue.put_nowait(job)
+        if rejected:
+            raise QueueFullError(f"Kolejka zleceń pełna ({self.queue_size})")
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self, limit: int | None = None) -> list[Job]:
+        with self._lock:
+            jobs = list(reversed(self.jobs.values()))
+        return jobs[:limit] if limit else jobs
+
+    def cancel(self, job_id: str) -> Job | None:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in FINAL_STATES:
+                return job
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                # Worker pominie zlecenie po wyjęciu z kolejki; miejsce w limicie zwalniamy od razu
+                self._queued -= 1
+                self._finish(job, CANCELLED)
+            elif job.cancel_running is not None:
+                job.cancel_running()
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = sum(1 for job in self.jobs.values() if job.status == RUNNING)
+            queued = self._queued
+        return {
+            "workers": self.workers,
+            "queueSize": self.queue_size,
+            "queued": queued,
+            "running": running,
+            **self.counters
+        }
+
+    def _worker(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            while True:
+                job = self.queue.get()
+                if job is None:
+                    break
+                self._run(job, loop)
+        finally:
+            loop.run_until_complete(close_async_clients(self.base_root))
+            loop.close()
+
+    def _run(self, job: Job, loop: asyncio.AbstractEventLoop) -> None:
+        with self._lock:
+            if job.status != QUEUED:
+                return
+            self._queued -= 1
+            job.status = RUNNING
+            job.started_at = time.time()
+        try:
+            if job.kind == IN_PROCESS:
+                success = self._run_in_process(job, loop)
+            else:
+                success = self._run_subprocess(job)
+            status = SUCCEEDED if success else FAILED
+        except asyncio.CancelledError:
+            status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            status = FAILED
+        with self._lock:
+            job.cancel_running = None
+            if job.cancel_requested:
+                status = CANCELLED
+            job.success = status == SUCCEEDED
+            self._finish(job, status)
+        broker.publish({"type": "job_finished", "task_id": job.task_id, "run_id": job.task_id,
+                        "job_id": job.id, "status": status, "success": job.success})
+
+    def _set_cancel(self, job: Job, cancel: Callable[[], None]) -> None:
+        with self._lock:
+            job.cancel_running = cancel
+            if job.cancel_requested:
+                cancel()
+
+    def _run_in_process(self, job: Job, loop: asyncio.AbstractEventLoop) -> bool:
+        job.task_manager, job.main_task = create_main_task(job.description, self.base_root)
+        job.task_id = job.main_task.id
+        orchestrator = create_orchestrator(job.task_manager, job.main_task, self.base_root, job.id)
+        run = loop.create_task(run_task_in_process(orchestrator, job.main_task))
+        self._set_cancel(job, lambda: loop.call_soon_threadsafe(run.cancel))
+        success = loop.run_until_complete(run)
+        if job.main_task.has_result:
+            job.result = job.main_task.result
+        job.verification = job.main_task.verification_result
+        return success
+
+    def _run_subprocess(self, job: Job) -> bool:
+        script_path = self.base_root / "scripts" / "test_run.py"
+        on_start: Callable[[subprocess.Popen], None] = lambda process: self._set_cancel(job, process.terminate)
+        returncode = run_test_process(script_path, self.project_root, [job.description], on_start,
+                                      lambda line: self._forward_line(job, line))
+        return returncode == 0
+
+    def _forward_line(self, job: Job, line: str) -> None:
+        # Zdarzenia postępu podprocesu (PROGRESS_EVENTS) trafiają do brokera jak zdarzenia przebiegu
+        # w procesie, pozostałe linie jako zdarzenia "log"
+        from cad_ai.events import parse_event_line
+
+        event = parse_event_line(line)
+        if event is None:
+            line = _ANSI_ESCAPE.sub("", line)
+            if line.strip():
+                broker.publish({"type": "log", "line": line, "run_id": job.task_id, "job_id": job.id})
+            return
+        if event["type"] == "run_started" and job.task_id is None:
+            job.task_id = event.get("task_id")
+        broker.publish({**event, "run_id": job.task_id, "job_id": job.id})
+
+    def _finish(self, job: Job, status: str) -> None:
+        # Wywoływane pod self._lock
+        job.status = status
+        job.finished_at = time.time()
+        # Drzewo zadań nie jest już potrzebne - zostaje tylko wynik zadania głównego
+        job.task_manager = None
+        job.main_task = None
+        self.counters[status] += 1
+        finished = [job_id for job_id, item in self.jobs.items() if item.status in FINAL_STATES]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+
+def job_manager_from_env(project_root: Path, base_root: Path) -> JobManager:
+    # .env ładowany przed odczytem JOB_WORKERS, JOB_QUEUE_SIZE i JOB_HISTORY
+    ensure_core_importable(base_root)
+    return JobManager(
+        project_root,
+        base_root,
+        workers=int(os.getenv("JOB_WORKERS", "2")),
+        queue_size=int(os.getenv("JOB_QUEUE_SIZE", "32")),
+        history=int(os.getenv("JOB_HISTORY", "200"))
+    )
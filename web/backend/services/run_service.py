@@ -0,0 +1,119 @@
+import asyncio
+import os
+import sys
+import threading
+from pathlib import Path
+from backend.services.stream_service import broker
+
+_run_stack: dict | None = None
+_run_stack_lock = threading.Lock()
+
+
+def ensure_core_importable(base_root: Path) -> None:
+    src_dir = str(base_root / "src")
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=base_root / "config" / ".env")
+
+
+def get_run_stack(base_root: Path) -> dict:
+    # Elementy wspólne dla wszystkich przebiegów (cache, limity dostawcy, pamięć dekompozycji,
+    # magazyn wyników) - tworzone raz na proces i używane przez kolejne zlecenia
+    global _run_stack
+    with _run_stack_lock:
+        if _run_stack is None:
+            ensure_core_importable(base_root)
+            from cad_ai.results_store import persistence_from_env
+            from cad_ai.llm_cache import cache_from_env
+            from cad_ai.rate_limiter import scheduler_from_env
+            from cad_ai.dedup import dedup_from_env
+            from cad_ai.decomposition_memo import memo_from_env
+
+            results_dir = str(base_root / "results")
+            provider = os.getenv("AI_PROVIDER", "openai")
+            _run_stack = {
+                "results_dir": results_dir,
+                "provider": provider,
+                "persistence": persistence_from_env(results_dir),
+                "llm_cache": cache_from_env(results_dir),
+                "rate_limiter": scheduler_from_env(provider),
+                "local_dedup": dedup_from_env(),
+                "decomposition_memo": memo_from_env(results_dir)
+            }
+    return _run_stack
+
+
+def create_main_task(description: str, base_root: Path) -> tuple:
+    stack = get_run_stack(base_root)
+    from cad_ai.task_manager import TaskManager, TaskType
+
+    task_manager = TaskManager(persistence_manager=stack["persistence"])
+    main_task = task_manager.create_task(description=description, task_type=TaskType.MAIN, level=0)
+    return task_manager, main_task
+
+
+def create_orchestrator(task_manager, main_task, base_root: Path, job_id: str | None = None):
+    stack = get_run_stack(base_root)
+    from cad_ai.agents import MasterOrchestrator
+    from cad_ai.event_log import event_log_from_env
+    from cad_ai.context_engine import context_engine_from_env
+    from cad_ai.verification_policy import verification_policy_from_env
+    from cad_ai.repair import repair_policy_from_env
+
+    results_dir = stack["results_dir"]
+    orchestrator = MasterOrchestrator(
+        task_manager=task_manager,
+        provider=stack["provider"],
+        api_key=os.getenv("API_KEY"),
+        model=os.getenv("MODEL", "gpt-4o-mini"),
+        max_recursion_depth=10,
+        persistence_dir=results_dir,
+        max_concurrency=int(os.getenv("MAX_CONCURRENCY", "1")),
+        llm_cache=stack["llm_cache"],
+        rate_limiter=stack["rate_limiter"],
+        stream=True,
+        batch_analysis=os.getenv("BATCH_ANALYSIS", "0").lower() in ("1", "true", "tak"),
+        structured_output=os.getenv("STRUCTURED_OUTPUT", "0").lower() in ("1", "true", "tak"),
+        fused_decomposition=os.getenv("FUSED_DECOMPOSITION", "0").lower() in ("1", "true", "tak"),
+        aggregation_token_budget=int(os.getenv("AGGREGATION_SUMMARY_TOKENS", "0")),
+        context_engine=context_engine_from_env(task_manager),
+        verification_policy=verification_policy_from_env(),
+        repair_policy=repair_policy_from_env(),
+        local_dedup=stack["local_dedup"],
+        decomposition_memo=stack["decomposition_memo"],
+        checkpointing=os.getenv("CHECKPOINTS", "0").lower() in ("1", "true", "tak"),
+        checkpoint_interval=float(os.getenv("CHECKPOINT_INTERVAL", "1.0")),
+        event_log=event_log_from_env(task_manager, results_dir),
+        persistence=stack["persistence"]
+    )
+    # Zdarzenia przebiegu trafiają do klientów SSE (/api/stream) oznaczone identyfikatorem przebiegu i zlecenia
+    orchestrator.event_bus.subscribe(
+        lambda event: broker.publish({**event, "run_id": main_task.id, "job_id": job_id})
+    )
+    return orchestrator
+
+
+def create_run(description: str, base_root: Path) -> tuple:
+    task_manager, main_task = create_main_task(description, base_root)
+    return create_orchestrator(task_manager, main_task, base_root), main_task
+
+
+async def run_task_in_process(orchestrator, main_task) -> bool:
+    orchestrator.event_bus.publish("run_started", main_task.id, description=main_task.description)
+    success = False
+    try:
+        # Pętla workera zleceń żyje dłużej niż przebieg - klienci async zostają dla kolejnych zleceń
+        success = await orchestrator.arun(main_task, close_clients=False)
+        await asyncio.to_thread(orchestrator.save_results, main_task)
+    finally:
+        orchestrator.event_bus.publish("run_finished", main_task.id, success=success)
+    return success
+
+
+async def close_async_clients(base_root: Path) -> None:
+    # Zamyka klientów async bieżącej pętli (przed zamknięciem pętli workera)
+    ensure_core_importable(base_root)
+    from cad_ai.agents import get_client_registry
+
+    await get_client_registry().aclose()
@@ -0,0 +1,106 @@
+import asyncio
+import itertools
+import json
+import threading
+from collections import OrderedDict, deque
+from typing import AsyncIterator
+
+CLIENT_BUFFER_SIZE = 1000
+KEEPALIVE_SECONDS = 15.0
+# Historia zdarzeń przebiegu odtwarzana klientom podłączonym w trakcie (bez fragmentów wyniku i logów)
+HISTORY_PER_RUN = 5000
+HISTORY_RUNS = 20
+HISTORY_SKIP_TYPES = ("token", "log")
+
+
+class ProgressBroker:
+    def __init__(self, buffer_size: int = CLIENT_BUFFER_SIZE, history_per_run: int = HISTORY_PER_RUN,
+                 history_runs: int = HISTORY_RUNS):
+        self.buffer_size = buffer_size
+        self.history_per_run = history_per_run
+        self.history_runs = history_runs
+        self.clients: set[asyncio.Queue] = set()
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.history: OrderedDict[str, deque] = OrderedDict()
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> asyncio.Queue:
+        self.loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.buffer_size)
+        self.clients.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.clients.discard(queue)
+
+    def publish(self, event: dict) -> None:
+        # Wywoływane z dowolnego wątku (orkiestrator, worker zleceń) - numer i historia pod blokadą,
+        # rozesłanie w pętli serwera
+        with self._lock:
+            event = {**event, "seq": next(self._seq)}
+            if event.get("type") not in HISTORY_SKIP_TYPES:
+                # Historia dostępna zarówno po id przebiegu, jak i po id zlecenia
+                for key in {event.get("run_id"), event.get("job_id")} - {None}:
+                    self._remember(key, event)
+        if self.loop is None or not self.clients:
+            return
+        self.loop.call_soon_threadsafe(self._fan_out, event)
+
+    def _remember(self, key: str, event: dict) -> None:
+        # Wywoływane pod self._lock
+        if key not in self.history:
+            self.history[key] = deque(maxlen=self.history_per_run)
+            while len(self.history) > self.history_runs:
+                self.history.popitem(last=False)
+        self.history[key].append(event)
+
+    def replay(self, run_id: str) -> list[dict]:
+        with self._lock:
+            return list(self.history.get(run_id, ()))
+
+    def _fan_out(self, event: dict) -> None:
+        for queue in list(self.clients):
+            if queue.full():
+                # Wolny klient - porzucamy najstarsze zdarzenie zamiast blokować innych
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+broker = ProgressBroker()
+
+
+def format_sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def matches(event: dict, task_id: str | None, job_id: str | None) -> bool:
+    if task_id and event.get("run_id") != task_id:
+        return False
+    if job_id and event.get("job_id") != job_id:
+        return False
+    return True
+
+
+async def stream_events(task_id: str | None = None, job_id: str | None = None) -> AsyncIterator[str]:
+    queue = broker.subscribe()
+    try:
+        # Najpierw dotychczasowy przebieg (np. drzewo zadań dla klienta podłączonego w trakcie)
+        last_seq = 0
+        run_id = job_id or task_id
+        if run_id:
+            for event in broker.replay(run_id):
+                if matches(event, task_id, job_id):
+                    last_seq = event["seq"]
+                    yield format_sse(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event["seq"] <= last_seq or not matches(event, task_id, job_id):
+                continue
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(queue)
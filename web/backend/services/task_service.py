@@ -1,54 +1,103 @@
 from pathlib import Path
 import json
+import sys
+import threading
 
+RESULTS_DB_NAME = "results.sqlite"
+TASK_FILES = [
+    "result.json",
+    "output.txt",
+    "report.txt",
+    "detailed_report.json",
+    "hierarchy.json",
+    "stats.json"
+]
+
+_stores: dict = {}
+_rebuilt: set = set()
+_index_lock = threading.Lock()
 
-def read_json_file(path: Path) -> dict | None:
-    if not path.exists():
-        return None
-    return json.loads(path.read_text(encoding="utf-8"))
 
+def _import_cad_ai(results_dir: Path) -> None:
+    src_dir = str(results_dir.parent / "src")
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
 
-def read_text_preview(path: Path, limit: int = 200) -> str | None:
-    if not path.exists():
+
+def open_results_store(results_dir: Path):
+    # Magazyn SQLite (RESULTS_BACKEND=sqlite) - None gdy wyniki są tylko w plikach
+    db_path = results_dir / RESULTS_DB_NAME
+    if not db_path.exists():
         return None
-    return path.read_text(encoding="utf-8")[:limit]
+    if db_path not in _stores:
+        _import_cad_ai(results_dir)
+        from cad_ai.results_store import ResultsStore
+        _stores[db_path] = ResultsStore(str(db_path))
+    return _stores[db_path]
 
 
-def list_task_dirs(results_dir: Path) -> list[Path]:
-    if not results_dir.exists():
-        return []
-    return sorted(
-        [p for p in results_dir.iterdir() if p.is_dir() and p.name.startswith("task_")],
-        key=lambda p: p.name
-    )
+def open_run_index(results_dir: Path):
+    # Indeks przebiegów: tabela runs magazynu SQLite albo results_index.sqlite przy plikach;
+    # przy pierwszym otwarciu uzupełniany z katalogów results/task_* (tylko zmienione katalogi)
+    with _index_lock:
+        store = open_results_store(results_dir)
+        if store is not None:
+            index = store
+        else:
+            _import_cad_ai(results_dir)
+            from cad_ai.run_index import RUN_INDEX_NAME, RunIndex
+            db_path = results_dir / RUN_INDEX_NAME
+            if db_path not in _stores:
+                _stores[db_path] = RunIndex(str(db_path))
+            index = _stores[db_path]
+        if index.db_path not in _rebuilt:
+            index.rebuild_from_files(str(results_dir))
+            _rebuilt.add(index.db_path)
+        return index
 
 
-def build_task_item(task_path: Path) -> dict:
-    result = read_json_file(task_path / "result.json") or {}
-    preview = read_text_preview(task_path / "output.txt") or "(brak wyniku)"
-    stat = task_path.stat()
+def build_run_item(run: dict) -> dict:
     return {
-        "id": task_path.name,
-        "description": result.get("description", "(brak)"),
-        "status": result.get("status", "unknown"),
-        "verified": (result.get("verification") or {}).get("passed", False),
-        "score": (result.get("verification") or {}).get("score", 0),
-        "preview": preview,
-        "timestamp": stat.st_ctime
+        "id": run["task_id"],
+        "description": run["description"] or "(brak)",
+        "status": run["status"] or "unknown",
+        "verified": run["verified"],
+        "score": run["score"] or 0,
+        "preview": run["preview"] or "(brak wyniku)",
+        "timestamp": run["updated_at"]
     }
 
 
+def list_task_page(results_dir: Path, limit: int = 50, cursor: str | None = None,
+                   sort: str = "task_id", order: str = "desc", **filters) -> dict:
+    # Strona listy przebiegów z indeksu - koszt zależy od rozmiaru strony, nie od historii
+    if not results_dir.exists():
+        return {"tasks": [], "total": 0, "nextCursor": None}
+    index = open_run_index(results_dir)
+    page = index.page_runs(limit=limit, cursor=cursor, order_by=sort,
+                           descending=order != "asc", **filters)
+    result = {"tasks": [build_run_item(run) for run in page["runs"]], "nextCursor": page["next_cursor"]}
+    # Liczność tylko dla pierwszej strony - kolejne strony nie liczą całej tabeli
+    if cursor is None:
+        result["total"] = index.count_runs(**filters)
+    return result
+
+
+def load_task_payload(results_dir: Path, task_id: str) -> dict | None:
+    store = open_results_store(results_dir)
+    if store is not None:
+        payload = store.get_artifacts(task_id, TASK_FILES)
+        if payload:
+            return payload
+    task_path = results_dir / task_id
+    if not task_path.exists():
+        return None
+    return load_task_data(task_path)
+
+
 def load_task_data(task_path: Path) -> dict:
-    files = [
-        "result.json",
-        "output.txt",
-        "report.txt",
-        "detailed_report.json",
-        "hierarchy.json",
-        "stats.json"
-    ]
     payload: dict = {}
-    for name in files:
+    for name in TASK_FILES:
         file_path = task_path / name
         if not file_path.exists():
             continue
@@ -57,3 +106,13 @@ def load_task_data(task_path: Path) -> dict:
         else:
             payload[name] = file_path.read_text(encoding="utf-8")
     return payload
+
+
+def load_task_events(task_path: Path, after: int = 0, limit: int = 500) -> dict:
+    # Dziennik zdarzeń (events.jsonl) - historia zmian stanu zadań od numeru `after`;
+    # urwany lub uszkodzony wiersz kończy odczyt (jak przy odtwarzaniu dziennika)
+    _import_cad_ai(task_path.parent)
+    from cad_ai.event_log import read_events
+    events = read_events(str(task_path.parent), task_path.name, after, limit)
+    last_seq = events[-1]["seq"] if events else after
+    return {"events": events, "lastSeq": last_seq, "hasMore": len(events) >= limit}
@@ -1,32 +1,35 @@
+import os
 import subprocess
 import sys
-import threading
 from pathlib import Path
-from typing import Iterable
+from typing import Callable, Iterable
 
 
-def run_test_process(script_path: Path, cwd: Path, args: Iterable[str] | None = None) -> None:
+def run_test_process(script_path: Path, cwd: Path, args: Iterable[str] | None = None,
+                     on_start: Callable[[subprocess.Popen], None] | None = None,
+                     on_line: Callable[[str], None] | None = None) -> int | None:
     if not script_path.exists():
-        return
+        return None
     extra_args = list(args or [])
     process = subprocess.Popen(
         [sys.executable, str(script_path), *extra_args],
         cwd=str(cwd),
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+        # Skrypt wypisuje zdarzenia postępu (PROGRESS_EVENTS) bez buforowania wyjścia
+        env={**os.environ, "PROGRESS_EVENTS": "1", "PYTHONUNBUFFERED": "1"}
     )
-    stdout, stderr = process.communicate()
-    if stdout:
-        print("[Python stdout]", stdout)
-    if stderr:
-        print("[Python stderr]", stderr)
-
-
-def start_test_thread(script_path: Path, cwd: Path, args: Iterable[str] | None = None) -> None:
-    thread = threading.Thread(
-        target=run_test_process,
-        args=(script_path, cwd, args),
-        daemon=True
-    )
-    thread.start()
+    # Uchwyt procesu dla wywołującego (np. anulowanie zlecenia przez terminate)
+    if on_start is not None:
+        on_start(process)
+    # Wyjście czytane linia po linii w trakcie przebiegu zamiast communicate() po jego zakończeniu
+    for line in process.stdout:
+        line = line.rstrip("\n")
+        if on_line is not None:
+            on_line(line)
+        else:
+            print("[Python stdout]", line)
+    process.stdout.close()
+    return process.wait()
@@ -2,7 +2,9 @@
 export async function fetchJson(url, options) {
   const res = await fetch(url, options);
   if (!res.ok) {
-    throw new Error(`Błąd ${res.status}`);
+    const error = new Error(`Błąd ${res.status}`);
+    error.status = res.status;
+    throw error;
   }
   return res.json();
 }
@@ -22,13 +24,18 @@ export async function applyRootSelection(path) {
   return path;
 }
 
-export async function loadFileTree() {
-  const data = await fetchJson('/api/fs/tree');
+export async function loadFileTree(path = '.', depth = 1) {
+  // Katalogi poza zasięgiem depth mają children === null i są doczytywane przy rozwinięciu
+  const data = await fetchJson(`/api/fs/tree?path=${encodeURIComponent(path)}&depth=${depth}`);
   return data.tree || [];
 }
 
-export async function loadFile(filePath) {
-  const data = await fetchJson(`/api/fs/file?path=${encodeURIComponent(filePath)}`);
+export async function loadFile(filePath, line = null, lines = null) {
+  // Duże pliki wracają jako okno linii (partial) - kolejne okna przez line/lines
+  const params = new URLSearchParams({ path: filePath });
+  if (line !== null) params.set('line', line);
+  if (lines !== null) params.set('lines', lines);
+  const data = await fetchJson(`/api/fs/file?${params}`);
   return data;
 }
 
@@ -41,9 +48,11 @@ export async function saveFile(filePath, content) {
   return data;
 }
 
-export async function loadTasks() {
-  const data = await fetchJson('/api/results');
-  return { tasks: data.tasks || [], total: data.total || 0 };
+export async function loadTasks(cursor = null, limit = 50) {
+  const params = new URLSearchParams({ limit });
+  if (cursor) params.set('cursor', cursor);
+  const data = await fetchJson(`/api/results?${params}`);
+  return { tasks: data.tasks || [], total: data.total, nextCursor: data.nextCursor || null };
 }
 
 export async function loadTask(taskId) {
@@ -52,13 +61,28 @@ export async function loadTask(taskId) {
 }
 
 export async function runTask(description) {
-  await fetchJson('/api/run', {
+  return fetchJson('/api/run', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ taskDescription: description })
+    body: JSON.stringify({ taskDescription: description, inProcess: true })
   });
 }
 
+const RUN_EVENT_TYPES = [
+  'run_started', 'task_created', 'task_started', 'task_analyzed', 'task_executing', 'task_executed',
+  'token', 'task_verified', 'task_failed', 'run_finished', 'job_finished', 'log'
+];
+
+export function openRunStream(taskId, onEvent, jobId = null) {
+  // Zlecenie w podprocesie nie zna jeszcze id zadania - strumień filtrowany po id zlecenia
+  const query = jobId ? `job_id=${encodeURIComponent(jobId)}` : `task_id=${encodeURIComponent(taskId)}`;
+  const source = new EventSource(`/api/stream?${query}`);
+  RUN_EVENT_TYPES.forEach((type) => {
+    source.addEventListener(type, (event) => onEvent(JSON.parse(event.data)));
+  });
+  return source;
+}
+
 export async function loadModalFolders(path) {
   const data = await fetchJson(`/api/fs/browse?path=${encodeURIComponent(path)}`);
   return data.folders || [];
@@ -35,6 +35,10 @@ function renderFileEditor(editorEl, panelEl) {
     panelEl.textContent = 'No data';
     return;
   }
+  if (file.partial) {
+    renderFileWindow(editorEl, panelEl, file);
+    return;
+  }
   const content = file.draft ?? file.content ?? '';
   const isDirty = file.isDirty ?? content !== (file.content ?? '');
   editorEl.innerHTML = `
@@ -85,6 +89,49 @@ function renderFileEditor(editorEl, panelEl) {
   panelEl.innerHTML = fileDetailsHtml(file);
 }
 
+const WINDOW_LINES = 1000;
+
+function renderFileWindow(editorEl, panelEl, file) {
+  // Duży plik - tylko do odczytu, przeglądany oknami linii pobieranymi z serwera
+  const { line, lines, eof } = file.window;
+  editorEl.innerHTML = `
+    <div class="flex h-full flex-col gap-0 overflow-hidden bg-[#1e1e1e]">
+      <div class="flex items-center justify-between border-b border-[#3c3c3c] bg-[#252526] px-3 py-2 text-xs flex-shrink-0">
+        <div class="text-[#8a8a8a]">${file.path}</div>
+        <div class="flex items-center gap-2">
+          <span class="rounded-full bg-sky-500/20 px-2 py-0.5 text-[10px] text-sky-300">READ-ONLY</span>
+          <span class="text-[#8a8a8a]">Lines ${line + 1}–${line + lines}</span>
+          <button id="window-start-btn" class="rounded border border-[#3c3c3c] bg-[#1e1e1e] px-2 py-1 hover:bg-white/10" ${line > 0 ? '' : 'disabled'}>⇤</button>
+          <button id="window-prev-btn" class="rounded border border-[#3c3c3c] bg-[#1e1e1e] px-2 py-1 hover:bg-white/10" ${line > 0 ? '' : 'disabled'}>Prev</button>
+          <button id="window-next-btn" class="rounded border border-[#3c3c3c] bg-[#1e1e1e] px-2 py-1 hover:bg-white/10" ${eof ? 'disabled' : ''}>Next</button>
+        </div>
+      </div>
+      <textarea id="editor-textarea" readonly rows="20" cols="200" class="flex-1 w-full resize-none bg-[#111] p-3 text-[13px] leading-6 text-[#d4d4d4] outline-none overflow-auto"></textarea>
+    </div>
+  `;
+  const textarea = editorEl.querySelector('#editor-textarea');
+  if (textarea) textarea.value = file.content ?? '';
+  editorEl.querySelector('#window-start-btn')?.addEventListener('click', () => loadFileWindow(file, 0));
+  editorEl.querySelector('#window-prev-btn')?.addEventListener('click', () => loadFileWindow(file, Math.max(0, line - WINDOW_LINES)));
+  editorEl.querySelector('#window-next-btn')?.addEventListener('click', () => loadFileWindow(file, line + lines));
+  panelEl.innerHTML = fileDetailsHtml(file);
+}
+
+async function loadFileWindow(file, line) {
+  try {
+    setStatus(`Loading ${file.path} from line ${line + 1}...`);
+    const data = await loadFile(file.path, line, WINDOW_LINES);
+    file.content = data.content;
+    file.draft = data.content;
+    file.size = data.size;
+    file.window = { line: data.line, lines: data.lines, offset: data.offset, end: data.end, eof: data.eof };
+    setStatus(`Showing ${file.path}`);
+    render();
+  } catch (err) {
+    setStatus(`Load failed: ${err.message}`);
+  }
+}
+
 function fileContentHtml(content) {
   return `<div class="rounded border border-[#3c3c3c] bg-[#111] p-3 text-[13px] leading-6 whitespace-pre-wrap">${content}</div>`;
 }
@@ -93,6 +140,7 @@ function fileDetailsHtml(file) {
   return `
     <div><strong>${file.path}</strong></div>
     <div class="mt-1 text-[#8a8a8a]">Size: ${file.size} B</div>
+    ${file.partial ? `<div class="mt-1 text-[#8a8a8a]">Window: bytes ${file.window.offset}–${file.window.end}</div>` : ''}
   `;
 }
 
@@ -110,6 +158,10 @@ async function saveActiveFile() {
   if (!state.selectedFilePath) return;
   const file = state.openFiles.find((f) => f.path === state.selectedFilePath);
   if (!file) return;
+  if (file.partial) {
+    setStatus('Large files are read-only');
+    return;
+  }
   const draft = file.draft ?? file.content ?? '';
   if (draft === (file.content ?? '')) {
     setStatus('No changes to save');
@@ -140,6 +192,8 @@ async function reloadActiveFile() {
     file.draft = data.content;
     file.isDirty = false;
     file.size = data.size;
+    file.partial = data.partial;
+    file.window = data.partial ? { line: data.line, lines: data.lines, offset: data.offset, end: data.end, eof: data.eof } : null;
     setStatus(`Reloaded ${file.path}`);
     render();
   } catch (err) {
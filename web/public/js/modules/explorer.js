@@ -27,16 +27,22 @@ export function collapseAllLevels() {
 }
 
 export function expandAllLevels() {
+  // Rozwija tylko już wczytane katalogi - pełny odczyt dużego drzewa byłby kosztowny
   state.collapsedDirs = new Set();
   state.expandLevel = getMaxDepth(state.fileTree) || 1;
   renderFileTree();
 }
 
-export function expandNextLevel() {
-  const maxDepth = getMaxDepth(state.fileTree) || 1;
-  const nextLevel = state.expandLevel >= maxDepth ? 1 : state.expandLevel + 1;
-  state.expandLevel = nextLevel;
-  state.collapsedDirs = new Set(getDirsDeeperThan(state.fileTree, nextLevel));
+export async function expandNextLevel() {
+  // Kolejny poziom może wymagać doczytania katalogów; bez głębszych katalogów wracamy do poziomu 1
+  const nextLevel = state.expandLevel + 1;
+  const unloaded = getUnloadedDirs(state.fileTree, nextLevel);
+  if (unloaded.length) {
+    await Promise.all(unloaded.map(loadChildren));
+  }
+  const level = nextLevel > (getMaxDepth(state.fileTree) || 1) ? 1 : nextLevel;
+  state.expandLevel = level;
+  state.collapsedDirs = new Set(getDirsDeeperThan(state.fileTree, level));
   renderFileTree();
 }
 
@@ -58,13 +64,13 @@ function renderTreeNode(node, container, depth) {
 
 function renderDirNode(node, container, depth) {
   const row = createTreeRow(depth, node.path);
-  const isCollapsed = state.collapsedDirs.has(node.path);
+  const isCollapsed = state.collapsedDirs.has(node.path) || node.children === null;
   row.innerHTML = `
     <span class="w-3 text-[#8a8a8a]">${isCollapsed ? '▸' : '▾'}</span>
     <span class="text-[11px] text-[#8a8a8a]">📁</span>
     <span>${node.name || 'root'}</span>
   `;
-  row.onclick = () => toggleDir(node.path);
+  row.onclick = () => toggleDir(node);
   container.appendChild(row);
   if (!isCollapsed && node.children) {
     node.children.forEach((child) => renderTreeNode(child, container, depth + 1));
@@ -93,8 +99,12 @@ function createTreeRow(depth, path) {
   return row;
 }
 
-function toggleDir(path) {
-  if (state.collapsedDirs.has(path)) {
+async function toggleDir(node) {
+  const path = node.path;
+  if (state.collapsedDirs.has(path) || node.children === null) {
+    if (node.children === null) {
+      await loadChildren(node);
+    }
     state.collapsedDirs.delete(path);
   } else {
     state.collapsedDirs.add(path);
@@ -103,6 +113,26 @@ function toggleDir(path) {
   renderFileTree();
 }
 
+async function loadChildren(node) {
+  // Zawartość katalogu pobierana przy pierwszym rozwinięciu; podkatalogi wracają zwinięte
+  setStatus(`Loading ${node.path}...`);
+  node.children = await loadFileTree(node.path, 0);
+  getAllDirPaths(node.children).forEach((path) => state.collapsedDirs.add(path));
+  setStatus(`Loaded ${node.path}`);
+}
+
+function getUnloadedDirs(nodes, level, depth = 0, acc = []) {
+  nodes.forEach((node) => {
+    if (node.type !== 'dir' || depth >= level) return;
+    if (node.children === null) {
+      acc.push(node);
+    } else if (node.children.length) {
+      getUnloadedDirs(node.children, level, depth + 1, acc);
+    }
+  });
+  return acc;
+}
+
 function getAllDirPaths(nodes, acc = []) {
   nodes.forEach((node) => {
     if (node.type === 'dir') {
@@ -144,7 +174,7 @@ function getExpandedLevel(nodes, depth = 0, parentExpanded = true) {
   let maxLevel = 1;
   nodes.forEach((node) => {
     if (node.type !== 'dir') return;
-    const isExpanded = parentExpanded && !state.collapsedDirs.has(node.path);
+    const isExpanded = parentExpanded && !state.collapsedDirs.has(node.path) && node.children !== null;
     if (isExpanded) {
       maxLevel = Math.max(maxLevel, depth + 1);
     }
@@ -174,7 +204,9 @@ export async function selectFile(filePath) {
     size: data.size,
     content: data.content,
     draft: data.content,
-    isDirty: false
+    isDirty: false,
+    partial: data.partial,
+    window: data.partial ? { line: data.line, lines: data.lines, offset: data.offset, end: data.end, eof: data.eof } : null
   });
   setStatus(`Showing ${filePath}`);
   render();
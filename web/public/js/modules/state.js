@@ -1,6 +1,8 @@
 // State Management Module
 export const state = {
   tasks: [],
+  tasksTotal: 0,
+  tasksCursor: null,
   selectedTaskId: null,
   selectedTab: 'output.txt',
   taskData: {},
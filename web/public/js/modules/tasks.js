@@ -1,13 +1,15 @@
 // Tasks Component
 import { state, setStatus, render } from './state.js';
-import { loadTasks, loadTask, runTask } from './api.js';
+import { loadTasks, loadTask, runTask, openRunStream } from './api.js';
 
 export async function initTasks() {
   setStatus('Loading tasks...');
-  const { tasks, total } = await loadTasks();
+  const { tasks, total, nextCursor } = await loadTasks();
   state.tasks = tasks;
+  state.tasksTotal = total || 0;
+  state.tasksCursor = nextCursor;
   renderTaskList();
-  setStatus(`Ready • ${total} tasks`);
+  setStatus(`Ready • ${state.tasksTotal} tasks`);
   render();
   
   if (!state.selectedTaskId && state.tasks.length) {
@@ -31,6 +33,20 @@ export function renderTaskList() {
     item.onclick = () => selectTask(task.id);
     taskListEl.appendChild(item);
   });
+  if (state.tasksCursor) {
+    const more = document.createElement('button');
+    more.className = 'w-full rounded border border-[#3c3c3c] py-1 text-[11px] text-[#8a8a8a] hover:bg-white/5';
+    more.textContent = `Load more (${state.tasks.length}/${state.tasksTotal})`;
+    more.onclick = loadMoreTasks;
+    taskListEl.appendChild(more);
+  }
+}
+
+async function loadMoreTasks() {
+  const { tasks, nextCursor } = await loadTasks(state.tasksCursor);
+  state.tasks = state.tasks.concat(tasks);
+  state.tasksCursor = nextCursor;
+  renderTaskList();
 }
 
 function taskCardClass(taskId) {
@@ -79,8 +95,142 @@ export async function handleRunTask() {
   runHint.textContent = '';
   setStatus('Running task...');
   
-  await runTask(description);
+  let run;
+  try {
+    run = await runTask(description);
+  } catch (error) {
+    // 429 - kolejka zleceń pełna, zlecenie nie zostało przyjęte
+    runHint.textContent = error.status === 429 ? 'Server is busy. Try again in a moment.' : error.message;
+    setStatus('Ready');
+    return;
+  }
   taskInput.value = '';
-  runHint.textContent = 'Task started. Refresh in a moment.';
-  setTimeout(initTasks, 4000);
+  runHint.textContent = `Task queued (job ${run.jobId}).`;
+  followRun(run.taskId, run.jobId);
+}
+
+const NODE_STATUS_CLASS = {
+  created: 'text-[#8a8a8a]',
+  started: 'text-amber-300',
+  analyzed: 'text-amber-300',
+  executing: 'text-sky-300',
+  executed: 'text-sky-300',
+  verified: 'text-emerald-300',
+  failed: 'text-rose-300'
+};
+
+const NODE_STATUS = {
+  task_created: 'created',
+  task_started: 'started',
+  task_analyzed: 'analyzed',
+  task_executing: 'executing',
+  task_executed: 'executed',
+  task_verified: 'verified',
+  task_failed: 'failed'
+};
+
+function escapeHtml(text) {
+  return String(text ?? '').replace(/[&<>"]/g, (ch) => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;' }[ch]));
+}
+
+function updateRunNode(nodes, event) {
+  // Węzeł drzewa przebiegu aktualizowany na podstawie zdarzeń cyklu życia zadania
+  const node = nodes.get(event.task_id) || { id: event.task_id, children: [] };
+  if (!nodes.has(event.task_id)) {
+    nodes.set(event.task_id, node);
+  }
+  const parentId = event.parent_id ?? node.parentId;
+  if (parentId && node.parentId !== parentId) {
+    node.parentId = parentId;
+    const parent = nodes.get(parentId) || { id: parentId, children: [] };
+    nodes.set(parentId, parent);
+    if (!parent.children.includes(node.id)) parent.children.push(node.id);
+  }
+  if (event.description) node.description = event.description;
+  if (event.level !== undefined) node.level = event.level;
+  if (event.elapsed !== undefined) node.elapsed = event.elapsed;
+  if (event.type === 'task_analyzed') node.decomposed = event.decomposed;
+  if (event.type === 'task_verified' || event.type === 'task_failed') node.score = event.score;
+  if (event.type === 'task_verified' && event.skipped) node.skipped = true;
+  node.status = NODE_STATUS[event.type] || node.status;
+}
+
+function renderRunTree(container, nodes, rootId) {
+  const lines = [];
+  const visit = (id, depth) => {
+    const node = nodes.get(id);
+    if (!node) return;
+    const score = node.score !== undefined && node.score !== null ? ` ${node.score}/10` : '';
+    const elapsed = node.elapsed !== undefined ? ` • ${node.elapsed.toFixed(1)}s` : '';
+    const status = `${node.status || 'created'}${node.skipped ? ' (skipped)' : ''}${score}${elapsed}`;
+    lines.push(`
+      <div class="truncate" style="padding-left: ${depth * 12}px" title="${escapeHtml(node.description)}">
+        <span class="font-semibold">${escapeHtml(node.id)}</span>
+        <span class="${NODE_STATUS_CLASS[node.status] || 'text-[#8a8a8a]'}">${escapeHtml(status)}</span>
+        <span class="text-[#8a8a8a]">${escapeHtml(node.description)}</span>
+      </div>
+    `);
+    node.children.forEach((childId) => visit(childId, depth + 1));
+  };
+  visit(rootId, 0);
+  container.innerHTML = lines.join('');
+}
+
+function followRun(taskId, jobId) {
+  const runOutput = document.getElementById('run-output');
+  const runHint = document.getElementById('run-hint');
+  const runTree = document.getElementById('run-tree');
+  if (runOutput) {
+    runOutput.textContent = '';
+    runOutput.classList.remove('hidden');
+  }
+  if (runTree) {
+    runTree.innerHTML = '';
+    runTree.classList.remove('hidden');
+  }
+  const nodes = new Map();
+  let rootId = taskId;
+  let currentTaskId = null;
+  let finished = false;
+  const appendOutput = (text) => {
+    if (!runOutput) return;
+    runOutput.textContent += text;
+    runOutput.scrollTop = runOutput.scrollHeight;
+  };
+  const finish = (success) => {
+    if (finished) return;
+    finished = true;
+    source.close();
+    const label = rootId || `job ${jobId}`;
+    setStatus(success ? `Finished ${label}` : `Failed ${label}`);
+    initTasks();
+  };
+  const source = openRunStream(taskId, (event) => {
+    if (event.type === 'run_started') {
+      rootId = rootId || event.task_id;
+      updateRunNode(nodes, { ...event, type: 'task_created', level: 0 });
+    } else if (NODE_STATUS[event.type]) {
+      updateRunNode(nodes, event);
+      if (event.type === 'task_started') {
+        setStatus(`Processing ${event.task_id} (level ${event.level})...`);
+      } else if ((event.type === 'task_verified' || event.type === 'task_failed') && runHint) {
+        const passed = event.type === 'task_verified';
+        runHint.textContent = `${event.task_id}: ${passed ? 'OK' : 'failed'} (${event.score ?? 0}/10)`;
+      }
+    } else if (event.type === 'token') {
+      if (event.task_id !== currentTaskId) {
+        currentTaskId = event.task_id;
+        appendOutput(`\n[${event.task_id}] `);
+      }
+      appendOutput(event.delta);
+    } else if (event.type === 'log') {
+      currentTaskId = null;
+      appendOutput(`${event.line}\n`);
+    } else if (event.type === 'run_finished' || event.type === 'job_finished') {
+      finish(event.success);
+    }
+    if (runTree && rootId) {
+      renderRunTree(runTree, nodes, rootId);
+    }
+  }, jobId);
 }